@@ -7,6 +7,8 @@
 # - Varredura Mach 0.1 → 0.8
 # - Calcular CL, CDi, Di, L
 # - Plotar curvas vs velocidade
+# - Modelo e malha preparados uma vez por projeto: a malha sai do
+#   cache de geometria (geom_cache.py) e os 20 Mach vão direto ao solver
 # ============================================================
 
 import numpy as np
@@ -14,6 +16,10 @@ import matplotlib.pyplot as plt
 import time
 import os
 from openvsp import openvsp as vsp
+from solver_wait import wait_for_file
+from vspaero_results import read_last_row
+from vsp_results import sweep_last_rows
+from geom_cache import get_geometry_cache, remove_geometry
 
 # ============================================================
 # CONFIGURAÇÃO
@@ -34,12 +40,29 @@ mach_list = np.linspace(0.1, 0.8, 20)
 # Alpha fixo
 alpha_fixed = 0.0
 
+# Cache das saídas de geometria (.vspgeom/.vkey/.csf) por projeto
+GEOM_CACHE_DIR = os.path.join(base_dir, "cache_geometria")
+RUN_STEM = "mach_sweep"
+
+# Projeto cujo modelo está carregado no OpenVSP (chave da geometria)
+_modelo = {"chave": None, "gid": None}
+
 
 # ============================================================
 # FUNÇÃO: roda 1 caso VSPAERO em um Mach específico
 # ============================================================
 
-def run_case(x, M):
+def prepare_geometry(x):
+    """
+    Carrega o modelo base, aplica x e deixa <RUN_STEM>.vsp3 e a malha
+    prontos em base_dir. Só refaz o trabalho quando x muda; a malha vem
+    do cache de geometria quando o projeto já foi tesselado.
+    Retorna o ID da asa.
+    """
+    cache = get_geometry_cache(GEOM_CACHE_DIR, sources=[VSP3_FILE])
+    chave = cache.key(x)
+    if _modelo["chave"] == chave:
+        return _modelo["gid"]
 
     # --------------------------------------------------------
     # 1) Limpa modelo e carrega o arquivo base
@@ -77,11 +100,30 @@ def run_case(x, M):
     # --------------------------------------------------------
     # 3) Salva o modelo atualizado com novo nome
     # --------------------------------------------------------
-    updated_vsp3 = os.path.join(base_dir, "mach_sweep.vsp3")
+    updated_vsp3 = os.path.join(base_dir, RUN_STEM + ".vsp3")
     vsp.WriteVSPFile(updated_vsp3)
 
+    # --------------------------------------------------------
+    # 4) Compute Geometry (só se o projeto não estiver no cache)
+    # --------------------------------------------------------
+    if not cache.link(chave, base_dir, RUN_STEM):
+        remove_geometry(base_dir, RUN_STEM)
+        vsp.SetAnalysisInputDefaults("VSPAEROComputeGeometry")
+        vsp.SetIntAnalysisInput("VSPAEROComputeGeometry", "GeomSet", [vsp.SET_ALL])
+        vsp.ExecAnalysis("VSPAEROComputeGeometry")
+        cache.store(chave, base_dir, RUN_STEM)
+
+    _modelo["chave"] = chave
+    _modelo["gid"] = gid
+    return gid
+
+
+def run_case(x, M):
+
+    gid = prepare_geometry(x)
+
     # Caminho do history correspondente
-    hist_path = os.path.join(base_dir, "mach_sweep.history")
+    hist_path = os.path.join(base_dir, RUN_STEM + ".history")
 
     # Remove qualquer .history antigo
     for f in os.listdir(base_dir):
@@ -91,13 +133,6 @@ def run_case(x, M):
             except:
                 pass
 
-    # --------------------------------------------------------
-    # 4) Compute Geometry
-    # --------------------------------------------------------
-    vsp.SetAnalysisInputDefaults("VSPAEROComputeGeometry")
-    vsp.SetIntAnalysisInput("VSPAEROComputeGeometry", "GeomSet", [vsp.SET_ALL])
-    vsp.ExecAnalysis("VSPAEROComputeGeometry")
-
     # --------------------------------------------------------
     # 5) Condições de voo
     # --------------------------------------------------------
@@ -134,31 +169,25 @@ def run_case(x, M):
     # --------------------------------------------------------
     # 7) Executa solver
     # --------------------------------------------------------
-    vsp.ExecAnalysis(solver_id)
-
-    # Espera criação do .history
-    for _ in range(60):
-        if os.path.exists(hist_path):
-            break
-        time.sleep(0.2)
-
-    if not os.path.exists(hist_path):
-        raise RuntimeError("History file não encontrado — solver não gerou saída!")
+    res_id = vsp.ExecAnalysis(solver_id)
 
     # --------------------------------------------------------
-    # 8) Lê resultados do history
+    # 8) Lê resultados (gerenciador de resultados; history como fallback)
     # --------------------------------------------------------
-    with open(hist_path, "r") as f:
-        lines = [
-            l.strip() for l in f.readlines()
-            if l.strip() and not l.startswith("#")
-        ]
-
-    last = lines[-1].split()
-
-    cl  = float(last[6])
-    cd0 = float(last[7])
-    cdi = float(last[8])
+    rows = sweep_last_rows(res_id)
+    if rows is not None and len(rows):
+        last = rows[-1]
+    else:
+        # Espera o .history ser fechado (retorno imediato se já existe;
+        # senão inotify, com o tempo esperado na mensagem de erro)
+        wait_for_file(hist_path, timeout=12.0)
+
+        # Só a última linha (lida do fim do arquivo), colunas pelo nome
+        last = read_last_row(hist_path)
+
+    cl  = float(last["CLtot"])
+    cd0 = float(last["CDo"])
+    cdi = float(last["CDi"])
 
     # Forças
     L  = q * Sref * cl
@@ -16,6 +16,8 @@ AR_TARGET = None
 # === OpenVSP Python API ===
 sys.path.insert(0, OPENVSP_PY)
 import openvsp.vsp as v
+from vspaero_results import read_last_row, HISTORY_FIRST, POLAR_FIRST
+from vsp_results import sweep_last_rows
 
 # === UTIL ===
 def ensure_dir(p): os.makedirs(p, exist_ok=True)
@@ -38,109 +40,38 @@ def delete_old_results(prefix_base):
         except Exception as e:
             print(f"[warn] Não removi {path}: {e}")
 
+def _ld_from_row(last):
+    """Registro do vspaero_results → dict com alpha, CLtot, CDtot e L/D."""
+    out = {"alpha": float(last["AoA"]),
+           "CLtot": float(last["CLtot"]),
+           "CDtot": float(last["CDtot"])}
+    if out["CDtot"] == 0.0:
+        return None
+    out["L_over_D"] = out["CLtot"] / out["CDtot"]
+    return out
+
 def parse_history_generic(history_path):
     """
-    Parser robusto do .history:
-    - encontra header (linha que contém nomes das colunas)
-    - identifica índices de Alpha, CL, CD e L/D (se houver)
-    - retorna última linha numérica com dict padronizado
+    Lê a última linha do .history (colunas pelo nome do cabeçalho,
+    vspaero_results.read_last_row) e retorna alpha, CLtot, CDtot e L/D.
     """
     if not os.path.exists(history_path):
         return None
-
-    header = None
-    data_rows = []
     try:
-        with open(history_path, "r") as f:
-            for ln in f:
-                ln = ln.strip()
-                if not ln or ln.startswith("#"):
-                    continue
-                parts = ln.split()
-                # heurística: header costuma ter textos não-numéricos típicos (Alpha, CLtot, etc.)
-                # e linhas de dados só números
-                is_numeric = True
-                for p in parts:
-                    try:
-                        float(p)
-                    except ValueError:
-                        is_numeric = False
-                        break
-                if not is_numeric and header is Non
-                    header = parts
-                elif is_numeric:
-                    data_rows.append([float(p) for p in parts])
-
-        if header is None or not data_rows:
-            return None
-
-        # mapeia colunas de interesse (flexível quanto ao nome)
-        def find_col(*candidates):
-            for name in candidates:
-                if name in header:
-                    return header.index(name)
-            return None
-
-        idx_alpha = find_col("Alpha", "alpha")
-        idx_cl    = find_col("CLtot", "CL", "CLTotal", "CL_tot")
-        idx_cd    = find_col("CDtot", "CD", "CDTotal", "CD_tot")
-        idx_ld    = find_col("L/D", "L_over_D", "LoverD", "L_D")
-
-        last = data_rows[-1]
-        out = {}
-        if idx_alpha is not None: out["alpha"] = last[idx_alpha]
-        if idx_cl    is not None: out["CLtot"] = last[idx_cl]
-        if idx_cd    is not None: out["CDtot"] = last[idx_cd]
-
-        if idx_ld is not None:
-            out["L_over_D"] = last[idx_ld]
-        else:
-            # calcula se não existir
-            if ("CLtot" in out) and ("CDtot" in out) and out["CDtot"] != 0.0:
-                out["L_over_D"] = out["CLtot"] / out["CDtot"]
-
-        # válido se tiver L/D
-        return out if ("L_over_D" in out) else None
-
+        return _ld_from_row(read_last_row(history_path, HISTORY_FIRST))
     except Exception as e:
         print(f"[erro leitura history] {e}")
         return None
 
 def read_polar_last_ld(polar_path):
     """
-    Lê a última linha numérica do .polar e retorna L/D = CL/CD.
+    Lê a última linha do .polar e retorna L/D = CLtot/CDtot.
     Útil como fallback se o .history não estiver no formato esperado.
     """
     if not os.path.exists(polar_path):
         return None
     try:
-        last = None
-        with open(polar_path, "r") as f:
-            for ln in f:
-                ln = ln.strip()
-                if not ln or ln.startswith("#"):
-                    continue
-                parts = ln.split()
-                # aceita linhas numéricas com pelo menos Alpha, CL, CD...
-                is_numeric = True
-                for p in parts:
-                    try: float(p)
-                    except ValueError:
-                        is_numeric = False
-                        break
-                if is_numeric:
-                    last = [float(p) for p in parts]
-        if last is None:
-            return None
-
-        # Heurística comum: colunas no .polar costumam vir como:
-        # Alpha, CL, CD, CM, ... (varia conforme versão, mas CL/CD nas pos. 1 e 2 é frequente)
-        # Vamos identificar pelo header? Nem sempre há header — então tentamos índices padrão.
-        CL = last[1] if len(last) > 1 else None
-        CD = last[2] if len(last) > 2 else None
-        if CL is None or CD in (None, 0.0):
-            return None
-        return {"L_over_D": CL / CD, "CLtot": CL, "CDtot": CD}
+        return _ld_from_row(read_last_row(polar_path, POLAR_FIRST))
     except Exception as e:
         print(f"[erro leitura polar] {e}")
         return None
@@ -257,9 +188,14 @@ def run_vspaero(base_name, mach, aoa_deg, beta_deg=0.0, ncpu=4, rho=None, timeou
     v.SetStringAnalysisInput("VSPAEROSweep", "RedirectFile", ["vspaero_run.log"])
 
     # Executa
-    v.ExecAnalysis("VSPAEROSweep")
+    res_id = v.ExecAnalysis("VSPAEROSweep")
+
+    # Resultado em memória (gerenciador de resultados do OpenVSP)
+    rows = sweep_last_rows(res_id)
+    if rows is not None and len(rows):
+        return {"api": rows[-1], "history": None, "polar": None}
 
-    # Espera .history e/ou .polar
+    # Fallback: espera .history e/ou .polar
     wd = os.getcwd()
     history_path = os.path.join(wd, f"{base_name}.history")
     polar_path   = os.path.join(wd, f"{base_name}.polar")
@@ -269,7 +205,8 @@ def run_vspaero(base_name, mach, aoa_deg, beta_deg=0.0, ncpu=4, rho=None, timeou
         time.sleep(0.5)
         waited += 0.5
 
-    paths = {"history": history_path if os.path.exists(history_path) else None,
+    paths = {"api": None,
+             "history": history_path if os.path.exists(history_path) else None,
              "polar":   polar_path   if os.path.exists(polar_path)   else None}
 
     if not paths["history"] and not paths["polar"]:
@@ -321,9 +258,12 @@ def avaliar_objetivo(x):
         if not paths:
             return 1e6
 
-        # 7) Lê resultado: prioriza .history (mais rico), senão .polar
+        # 7) Lê resultado: gerenciador de resultados, senão .history
+        #    (mais rico), senão .polar
         res = None
-        if paths["history"]:
+        if paths["api"] is not None:
+            res = _ld_from_row(paths["api"])
+        if not res and paths["history"]:
             res = parse_history_generic(paths["history"])
         if not res and paths["polar"]:
             res = read_polar_last_ld(paths["polar"])
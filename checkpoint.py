@@ -0,0 +1,63 @@
+# ============================================================
+# checkpoint.py
+# ------------------------------------------------------------
+# Checkpoint do estado completo do otimizador em disco.
+#
+#   - gravação atômica: arquivo temporário na mesma pasta +
+#     os.replace (um processo morto no meio da escrita deixa o
+#     checkpoint anterior intacto)
+#   - pickle do dicionário de estado do driver (ParticleSwarm com o
+#     seu gerador, históricos, geração atual, resultados parciais)
+#   - os estados dos geradores globais (random e np.random) são
+#     guardados junto e restaurados na leitura
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import os
+import pickle
+import random
+import tempfile
+
+import numpy as np
+
+VERSAO = 1
+
+
+def save_checkpoint(path, estado):
+    """Grava 'estado' (dict) de forma atômica em 'path'."""
+    pasta = os.path.dirname(os.path.abspath(path))
+    os.makedirs(pasta, exist_ok=True)
+
+    dados = {
+        "versao": VERSAO,
+        "estado": estado,
+        "rng_python": random.getstate(),
+        "rng_numpy": np.random.get_state(),
+    }
+
+    fd, tmp = tempfile.mkstemp(dir=pasta, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(dados, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_checkpoint(path):
+    """Lê o checkpoint, restaura os geradores globais e retorna o estado."""
+    with open(path, "rb") as f:
+        dados = pickle.load(f)
+
+    if dados.get("versao") != VERSAO:
+        raise ValueError(f"Checkpoint {path} com versão {dados.get('versao')} "
+                         f"(esperada {VERSAO})")
+
+    random.setstate(dados["rng_python"])
+    np.random.set_state(dados["rng_numpy"])
+    return dados["estado"]
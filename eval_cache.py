@@ -0,0 +1,273 @@
+# ============================================================
+# eval_cache.py
+# ------------------------------------------------------------
+# Cache persistente (SQLite) das avaliações do FCN.
+#
+# O clip nos limites do PSO empilha partículas nos mesmos cantos
+# do espaço de projeto (AR=6, taper=1, sweep=20, ...) e cada
+# repetição custa um loop de trim completo no VSPAERO. O cache
+# fica na frente do FCN e sobrevive entre execuções.
+#
+# Chave = vetor [AR, span, taper, sweep, twist] quantizado
+#       + hash da configuração (condição de voo, solver,
+#         constantes do objetivo → v15_cessna_opt.config_signature)
+#
+# Valor = fobj + dicionário completo do FCN em JSON (CL, CD_total,
+#         NSolves, V_ft, Y_ClMax, tempos, ...). get() devolve o registro
+#         RESULT_FIELDS, o mesmo que todo evaluator devolve;
+#         get(x, full=True) devolve o dicionário gravado.
+#
+# Eviction: por número máximo de entradas (LRU) e/ou por idade.
+# Estatísticas de hit/miss acumuladas no próprio arquivo.
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from v15_cessna_opt import pack_results, result_record, HIGH_FIDELITY, PENALTY
+
+# Passo de quantização por variável [AR, span, taper, sweep, twist]
+QUANTUM_PADRAO = np.array([1e-3, 1e-3, 1e-4, 1e-3, 1e-3])
+
+
+def config_hash(signature):
+    """Hash estável de um dicionário de configuração."""
+    texto = json.dumps(signature, sort_keys=True, default=float)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _to_builtin(obj):
+    """Converte escalares numpy para tipos nativos (json)."""
+    if isinstance(obj, dict):
+        return {k: _to_builtin(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_builtin(v) for v in obj]
+    if isinstance(obj, np.void) and obj.dtype.names:
+        return {n: _to_builtin(obj[n]) for n in obj.dtype.names}
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+class EvalCache:
+    """
+    Cache em disco das avaliações do FCN.
+
+    path        : arquivo .sqlite (criado se não existir)
+    signature   : dicionário de configuração (ver config_signature)
+    quantum     : passo de quantização por variável (escalar ou vetor)
+    max_entries : limite de entradas (None = sem limite); remove as
+                  usadas há mais tempo
+    max_age_s   : idade máxima de uma entrada em segundos (None = sem limite)
+    """
+
+    def __init__(self, path, signature, quantum=QUANTUM_PADRAO,
+                 max_entries=None, max_age_s=None):
+        pasta = os.path.dirname(os.path.abspath(path))
+        os.makedirs(pasta, exist_ok=True)
+
+        self.path = path
+        self.config = config_hash(signature)
+        self.quantum = np.asarray(quantum, dtype=float)
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+
+        # Contadores desta execução (os acumulados ficam no arquivo)
+        self.hits = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS avaliacoes (
+                chave   TEXT PRIMARY KEY,
+                config  TEXT NOT NULL,
+                x       TEXT NOT NULL,
+                fobj    REAL NOT NULL,
+                data    TEXT NOT NULL,
+                criado  REAL NOT NULL,
+                usado   REAL NOT NULL
+            )""")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS estatisticas (
+                config  TEXT PRIMARY KEY,
+                hits    INTEGER NOT NULL DEFAULT 0,
+                misses  INTEGER NOT NULL DEFAULT 0
+            )""")
+        self._db.execute(
+            "INSERT OR IGNORE INTO estatisticas (config) VALUES (?)", (self.config,))
+        self._db.commit()
+
+        self.evict()
+
+    # ------------------------------------------------------------
+    # Chave
+    # ------------------------------------------------------------
+    def key(self, x):
+        """Chave textual: configuração + vetor quantizado."""
+        q = np.rint(np.asarray(x, dtype=float) / self.quantum).astype(np.int64)
+        return self.config + ":" + ",".join(str(v) for v in q)
+
+    # ------------------------------------------------------------
+    # Leitura / escrita
+    # ------------------------------------------------------------
+    def get(self, x, full=False):
+        """
+        Retorna (fobj, registro RESULT_FIELDS) se x estiver no cache, senão
+        None. full=True → (fobj, dicionário completo gravado por put()).
+        """
+        chave = self.key(x)
+        row = self._db.execute(
+            "SELECT fobj, data, criado FROM avaliacoes WHERE chave = ?",
+            (chave,)).fetchone()
+
+        agora = time.time()
+        if row is not None and self.max_age_s is not None and agora - row[2] > self.max_age_s:
+            self._db.execute("DELETE FROM avaliacoes WHERE chave = ?", (chave,))
+            row = None
+
+        if row is None:
+            self.misses += 1
+            self._db.execute(
+                "UPDATE estatisticas SET misses = misses + 1 WHERE config = ?",
+                (self.config,))
+            self._db.commit()
+            return None
+
+        self.hits += 1
+        self._db.execute("UPDATE avaliacoes SET usado = ? WHERE chave = ?", (agora, chave))
+        self._db.execute(
+            "UPDATE estatisticas SET hits = hits + 1 WHERE config = ?", (self.config,))
+        self._db.commit()
+        data = json.loads(row[1])
+        return row[0], (data if full else result_record(data))
+
+    def put(self, x, fobj, data):
+        """
+        Grava o resultado de uma avaliação. data é o dicionário do FCN
+        (gravado inteiro) ou um registro RESULT_DTYPE.
+        """
+        agora = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO avaliacoes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.key(x), self.config, json.dumps(_to_builtin(list(x))),
+             float(fobj), json.dumps(_to_builtin(data)), agora, agora))
+        self._db.commit()
+        self.evict()
+
+    # ------------------------------------------------------------
+    # Eviction e estatísticas
+    # ------------------------------------------------------------
+    def evict(self):
+        """Aplica os limites de idade e de tamanho."""
+        if self.max_age_s is not None:
+            self._db.execute("DELETE FROM avaliacoes WHERE criado < ?",
+                             (time.time() - self.max_age_s,))
+
+        if self.max_entries is not None:
+            self._db.execute("""
+                DELETE FROM avaliacoes WHERE chave IN (
+                    SELECT chave FROM avaliacoes
+                    ORDER BY usado DESC LIMIT -1 OFFSET ?
+                )""", (int(self.max_entries),))
+        self._db.commit()
+
+    def stats(self):
+        """Hits/misses desta execução e acumulados para a configuração atual."""
+        hits_tot, misses_tot = self._db.execute(
+            "SELECT hits, misses FROM estatisticas WHERE config = ?",
+            (self.config,)).fetchone()
+        n = self._db.execute("SELECT COUNT(*) FROM avaliacoes").fetchone()[0]
+        consultas = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / consultas if consultas else 0.0,
+            "hits_total": hits_tot,
+            "misses_total": misses_tot,
+            "entradas": n,
+        }
+
+    def close(self):
+        self._db.close()
+
+
+class CachedEvaluator:
+    """
+    Envolve outro evaluator (série ou paralelo) com o EvalCache.
+
+    Só as partículas ausentes do cache vão para o evaluator interno;
+    partículas repetidas dentro da mesma geração (mesma chave) são
+    avaliadas uma única vez. Retorna (fobj, registros) como o FCN_batch:
+    hits e avaliações novas têm os mesmos campos (RESULT_FIELDS).
+
+    O cache vale para um nível de fidelidade (config_signature(fidelity)),
+    fixado aqui: evaluate() com outro nível é erro. Com vários níveis, um
+    CachedEvaluator por nível sobre o mesmo evaluator interno, e
+    close_inner=False em todos menos um.
+    """
+
+    def __init__(self, inner, cache, fidelity=HIGH_FIDELITY, close_inner=True):
+        self.inner = inner
+        self.cache = cache
+        self.fidelity = fidelity
+        self.close_inner = close_inner
+
+    def evaluate(self, X, on_result=None, fidelity=None):
+        if fidelity is not None and fidelity != self.fidelity:
+            raise ValueError(f"CachedEvaluator do nível '{self.fidelity}' "
+                             f"chamado com fidelity='{fidelity}'")
+        X = [np.asarray(x, dtype=float) for x in X]
+        resultados = [None] * len(X)
+
+        pendentes = {}          # chave → índices das partículas
+        for i, x in enumerate(X):
+            chave = self.cache.key(x)
+            if chave in pendentes:
+                pendentes[chave].append(i)
+                continue
+            hit = self.cache.get(x)
+            if hit is not None:
+                resultados[i] = hit
+                if on_result is not None:
+                    on_result(i, hit)
+            else:
+                pendentes[chave] = [i]
+
+        if pendentes:
+            grupos = list(pendentes.values())
+
+            def novo(j, res):
+                # Grava no cache assim que a partícula termina (a penalidade
+                # de uma avaliação que travou/falhou não entra)
+                if res[0] != PENALTY:
+                    self.cache.put(X[grupos[j][0]], *res)
+                for i in grupos[j]:
+                    resultados[i] = res
+                    if on_result is not None:
+                        on_result(i, res)
+
+            self.inner.evaluate([X[ids[0]] for ids in grupos], on_result=novo,
+                                fidelity=self.fidelity)
+
+        print(f"[cache] {len(X) - sum(len(v) for v in pendentes.values())} hits, "
+              f"{len(pendentes)} avaliações novas")
+        return pack_results(resultados)
+
+    def close(self):
+        if self.close_inner:
+            self.inner.close()
+        s = self.cache.stats()
+        print(f"[cache] hits={s['hits']} misses={s['misses']} "
+              f"(taxa={s['hit_rate'] * 100:.1f}%) | acumulado: "
+              f"hits={s['hits_total']} misses={s['misses_total']} | "
+              f"entradas={s['entradas']}")
+        self.cache.close()
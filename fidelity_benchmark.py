@@ -0,0 +1,337 @@
+# ============================================================
+# fidelity_benchmark.py
+# ------------------------------------------------------------
+# Custo x precisão dos ajustes do solver: nós e iterações de esteira,
+# tesselagem da asa e NCPU.
+#
+# Um painel fixo de projetos (asa base, cantos dos limites do PSO e
+# pontos internos sorteados) é avaliado pelo FCN em cada combinação da
+# grade. Para cada configuração:
+#
+#   - tempo de parede médio por avaliação e pico de RSS
+#   - CLtot, CDi e L/D de cada projeto
+#   - erro relativo máximo no painel contra a referência (a
+#     configuração mais fina da grade: mais nós e iterações de esteira,
+#     tesselagem mais densa)
+#
+# Cada configuração roda num processo novo: o pico de RSS é o dela e o
+# carregamento do modelo base fica fora do tempo medido. Caches de
+# geometria e RETENTION ficam desligados.
+#
+# Saídas (pasta --saida):
+#   fidelidade_projetos.csv → uma linha por configuração e projeto
+#   fidelidade_pareto.csv   → uma linha por configuração, com a coluna
+#                             Pareto (não dominada em tempo x erro de L/D)
+#   fidelidade_pareto.png   → tempo x erro de L/D com a fronteira
+#
+#   python fidelity_benchmark.py --wake 8 16 24 64 --ncpu 1 4
+#   python fidelity_benchmark.py --comparar antigo/fidelidade_pareto.csv
+#
+# O --comparar aponta configurações mais lentas ou com resultado
+# diferente do relatório anterior (p.ex. depois de trocar a versão do
+# OpenVSP): erro de L/D contra a referência e, pelo
+# fidelidade_projetos.csv ao lado de cada relatório, CLtot/CDi/L/D
+# absolutos de cada projeto.
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from mem_usage import peak_rss_mb
+
+# Grade padrão
+WAKE_NODES = (8, 16, 24, 32, 64)
+WAKE_ITERS = (3, 5)
+TESSELLATIONS = ("12x17", "base", "30x45")     # Tess_U x Tess_W ("base" → 22 x 33)
+NCPUS = (1, 2, 4, 8)
+
+# Painel de projetos [AR, span, taper, sweep, twist]
+BASELINE = np.array([7.5, 36.0, 1.0, 0.0, 0.0])
+XMIN = np.array([6.0, 34.0, 0.5, 0.0, -4.0])        # limites do v15_cessna_pso
+XMAX = np.array([10.0, 38.0, 1.0, 10.0, 0.0])
+CORNERS = ("00000", "11111", "01010", "10101")      # 0 → xmin, 1 → xmax por variável
+N_RANDOM = 3
+SEED = 0
+
+# Regressão (--comparar): tempo relativo e diferença de resultado toleradas
+REGRESSION_TIME = 0.20
+REGRESSION_RESULT = 1e-3
+
+OUTPUT_DIR = os.path.join("resultados_variaveis", "benchmark_fidelidade")
+
+# Nível registrado em v15_cessna_opt.FIDELITY_LEVELS pelo processo filho
+_NIVEL = "benchmark"
+
+_COLUNAS = ("NumWakeNodes", "WakeIters", "Tess", "NCPU", "T_medio", "T_solver_medio",
+            "RSS_pico_MB", "Erro_CL", "Erro_CDi", "Erro_LD", "Pareto")
+
+
+def benchmark_panel(n_random=N_RANDOM, seed=SEED):
+    """Asa base + cantos CORNERS + n_random pontos internos sorteados."""
+    linhas = [BASELINE]
+    for canto in CORNERS:
+        linhas.append(np.where(np.array([c == "1" for c in canto]), XMAX, XMIN))
+    rng = np.random.default_rng(seed)
+    linhas.extend(XMIN + (XMAX - XMIN) * rng.random((n_random, len(XMIN))))
+    return np.array(linhas, dtype=float)
+
+
+def parse_tess(texto):
+    """"30x45" → (30, 45); "base" → (None, None)."""
+    if texto == "base":
+        return None, None
+    u, w = texto.lower().split("x")
+    return int(u), int(w)
+
+
+def benchmark_grid(wake=WAKE_NODES, iters=WAKE_ITERS, tess=TESSELLATIONS, ncpus=NCPUS):
+    """Lista de configurações (dicionários) da grade completa."""
+    return [{"NumWakeNodes": int(n), "WakeIters": int(it), "Tess": t, "NCPU": int(c)}
+            for n in wake for it in iters for t in tess for c in ncpus]
+
+
+def _tess_ordem(t):
+    """Densidade da tesselagem para escolher a referência (base = 22 x 33)."""
+    u, w = parse_tess(t)
+    return (22 if u is None else u) * (33 if w is None else w)
+
+
+def reference_config(grid):
+    """Configuração mais fina da grade (a de maior NCPU entre as iguais)."""
+    return max(grid, key=lambda c: (c["NumWakeNodes"], c["WakeIters"],
+                                    _tess_ordem(c["Tess"]), c["NCPU"]))
+
+
+# ------------------------------------------------------------
+# Execução (processo filho)
+# ------------------------------------------------------------
+def _run_config(config, X):
+    """Avalia o painel X numa configuração. Executado num processo novo."""
+    import v15_cessna_opt as opt
+    from vsp_session import get_session
+
+    tess_u, tess_w = parse_tess(config["Tess"])
+    opt.FIDELITY_LEVELS[_NIVEL] = {
+        "NumWakeNodes": config["NumWakeNodes"], "WakeIters": config["WakeIters"],
+        "Tess_U": tess_u, "Tess_W": tess_w, "TolCL": opt.TOL_CL}
+    opt.NCPU = config["NCPU"]
+    opt.GEOMETRY_CACHE_DIR = None
+    opt.RETENTION = None
+
+    # Modelo base carregado antes de medir
+    get_session(os.path.join(opt.BASE_DIR, "cessna210.vsp3"))
+
+    linhas = []
+    for x in X:
+        t0 = time.perf_counter()
+        _, data = opt.FCN(np.asarray(x, dtype=float), fidelity=_NIVEL)
+        linhas.append((time.perf_counter() - t0, data["T_solver"],
+                       data["CL"], data["CDi"], data["LD"]))
+    rss = np.nanmax([peak_rss_mb(), peak_rss_mb(children=True)])
+    return np.array(linhas), float(rss)
+
+
+def run_benchmark(grid, X, verbose=True):
+    """
+    Roda o painel X em cada configuração da grade (um processo por
+    configuração). Retorna a lista de resultados na ordem da grade:
+    dicionários com config, t (n,), t_solver, CL, CDi, LD e RSS_pico_MB.
+    """
+    resultados = []
+    for k, config in enumerate(grid):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            linhas, rss = pool.submit(_run_config, config, X).result()
+        r = {"config": config, "t": linhas[:, 0], "t_solver": linhas[:, 1],
+             "CL": linhas[:, 2], "CDi": linhas[:, 3], "LD": linhas[:, 4],
+             "RSS_pico_MB": rss}
+        resultados.append(r)
+        if verbose:
+            print(f"[benchmark] {k + 1}/{len(grid)} {_rotulo(config)}: "
+                  f"t={r['t'].mean():.2f} s/avaliação, RSS={rss:.0f} MB")
+    return resultados
+
+
+def _rotulo(config):
+    return (f"wake={config['NumWakeNodes']} it={config['WakeIters']} "
+            f"tess={config['Tess']} ncpu={config['NCPU']}")
+
+
+# ------------------------------------------------------------
+# Relatório
+# ------------------------------------------------------------
+def pareto_mask(custo, erro):
+    """Configurações não dominadas (menor custo e menor erro)."""
+    custo = np.asarray(custo, dtype=float)
+    erro = np.asarray(erro, dtype=float)
+    mascara = np.ones(len(custo), dtype=bool)
+    for i in range(len(custo)):
+        domina = ((custo <= custo[i]) & (erro <= erro[i]) &
+                  ((custo < custo[i]) | (erro < erro[i])))
+        mascara[i] = not domina.any()
+    return mascara
+
+
+def summarize(resultados, referencia):
+    """Uma linha por configuração: custo médio, RSS e erros máximos no painel."""
+    ref = next(r for r in resultados if r["config"] == referencia)
+    linhas = []
+    for r in resultados:
+        erro = {c: float(np.max(np.abs(r[c] - ref[c]) / np.abs(ref[c])))
+                for c in ("CL", "CDi", "LD")}
+        linhas.append({**r["config"],
+                       "T_medio": float(r["t"].mean()),
+                       "T_solver_medio": float(r["t_solver"].mean()),
+                       "RSS_pico_MB": r["RSS_pico_MB"],
+                       "Erro_CL": erro["CL"], "Erro_CDi": erro["CDi"], "Erro_LD": erro["LD"]})
+    pareto = pareto_mask([l["T_medio"] for l in linhas], [l["Erro_LD"] for l in linhas])
+    for linha, p in zip(linhas, pareto):
+        linha["Pareto"] = int(p)
+    return linhas
+
+
+def write_reports(resultados, linhas, X, pasta=OUTPUT_DIR):
+    """Grava os CSVs e o gráfico. Retorna o caminho do fidelidade_pareto.csv."""
+    os.makedirs(pasta, exist_ok=True)
+
+    with open(os.path.join(pasta, "fidelidade_projetos.csv"), "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["NumWakeNodes", "WakeIters", "Tess", "NCPU", "projeto",
+                    "AR", "span", "taper", "sweep", "twist",
+                    "T_parede", "T_solver", "CLtot", "CDi", "LD"])
+        for r in resultados:
+            c = r["config"]
+            for j, x in enumerate(X):
+                w.writerow([c["NumWakeNodes"], c["WakeIters"], c["Tess"], c["NCPU"], j,
+                            *(f"{v:.6g}" for v in x),
+                            f"{r['t'][j]:.4f}", f"{r['t_solver'][j]:.4f}",
+                            f"{r['CL'][j]:.6f}", f"{r['CDi'][j]:.6f}", f"{r['LD'][j]:.5f}"])
+
+    caminho = os.path.join(pasta, "fidelidade_pareto.csv")
+    with open(caminho, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=_COLUNAS)
+        w.writeheader()
+        for linha in sorted(linhas, key=lambda l: l["T_medio"]):
+            w.writerow({k: (f"{v:.6g}" if isinstance(v, float) else v)
+                        for k, v in linha.items()})
+
+    t = np.array([l["T_medio"] for l in linhas])
+    e = np.array([l["Erro_LD"] for l in linhas]) * 100.0
+    p = np.array([l["Pareto"] for l in linhas], dtype=bool)
+    ordem = np.argsort(t[p])
+
+    plt.figure(figsize=(8, 5))
+    plt.scatter(t[~p], e[~p], color="gray", alpha=0.5, s=25, label="dominadas")
+    plt.plot(t[p][ordem], e[p][ordem], "r-o", lw=1.5, label="fronteira de Pareto")
+    for l, ti, ei in zip([l for l, pi in zip(linhas, p) if pi], t[p], e[p]):
+        plt.annotate(f"{l['NumWakeNodes']}/{l['WakeIters']}/{l['Tess']}/{l['NCPU']}",
+                     (ti, ei), fontsize=7, xytext=(3, 3), textcoords="offset points")
+    plt.xlabel("Tempo médio por avaliação [s]")
+    plt.ylabel("Erro máx. de L/D no painel [%]")
+    plt.title("Custo x precisão (wake nodes / iters / tess / NCPU)")
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(os.path.join(pasta, "fidelidade_pareto.png"))
+    plt.close()
+    return caminho
+
+
+def print_pareto(linhas):
+    print("\n================ FRONTEIRA CUSTO x PRECISÃO ================")
+    print(f"{'wake':>5} {'iters':>5} {'tess':>7} {'ncpu':>4} {'t [s]':>8} "
+          f"{'RSS MB':>8} {'eCL %':>7} {'eCDi %':>7} {'eLD %':>7}")
+    for l in sorted((l for l in linhas if l["Pareto"]), key=lambda l: l["T_medio"]):
+        print(f"{l['NumWakeNodes']:>5} {l['WakeIters']:>5} {l['Tess']:>7} {l['NCPU']:>4} "
+              f"{l['T_medio']:8.2f} {l['RSS_pico_MB']:8.0f} {100 * l['Erro_CL']:7.3f} "
+              f"{100 * l['Erro_CDi']:7.3f} {100 * l['Erro_LD']:7.3f}")
+
+
+def compare_reports(antigo, novo, tol_tempo=REGRESSION_TIME, tol_resultado=REGRESSION_RESULT):
+    """
+    Compara dois fidelidade_pareto.csv configuração a configuração.
+    Retorna a lista de regressões (texto); tempo acima de (1 + tol_tempo)
+    vezes o anterior, erro de L/D que mudou mais que tol_resultado ou,
+    com o fidelidade_projetos.csv da mesma pasta nos dois relatórios,
+    CLtot/CDi/L/D de um projeto com variação relativa acima de
+    tol_resultado (projetos com AR, span, ... diferentes são ignorados).
+    """
+    def ler(caminho):
+        with open(caminho, newline="") as f:
+            return {(l["NumWakeNodes"], l["WakeIters"], l["Tess"], l["NCPU"]): l
+                    for l in csv.DictReader(f)}
+
+    def ler_projetos(caminho):
+        caminho = os.path.join(os.path.dirname(caminho), "fidelidade_projetos.csv")
+        if not os.path.exists(caminho):
+            return {}
+        with open(caminho, newline="") as f:
+            return {(l["NumWakeNodes"], l["WakeIters"], l["Tess"], l["NCPU"],
+                     l["projeto"]): l for l in csv.DictReader(f)}
+
+    a, b = ler(antigo), ler(novo)
+    regressoes = []
+    for chave in sorted(set(a) & set(b)):
+        ta, tb = float(a[chave]["T_medio"]), float(b[chave]["T_medio"])
+        ea, eb = float(a[chave]["Erro_LD"]), float(b[chave]["Erro_LD"])
+        rotulo = "wake={} it={} tess={} ncpu={}".format(*chave)
+        if tb > (1.0 + tol_tempo) * ta:
+            regressoes.append(f"{rotulo}: tempo {ta:.2f} → {tb:.2f} s")
+        if abs(eb - ea) > tol_resultado:
+            regressoes.append(f"{rotulo}: erro de L/D {100 * ea:.3f} → {100 * eb:.3f} %")
+
+    pa, pb = ler_projetos(antigo), ler_projetos(novo)
+    for chave in sorted(set(pa) & set(pb)):
+        la, lb = pa[chave], pb[chave]
+        xa = np.array([float(la[n]) for n in ("AR", "span", "taper", "sweep", "twist")])
+        xb = np.array([float(lb[n]) for n in ("AR", "span", "taper", "sweep", "twist")])
+        if not np.allclose(xa, xb, rtol=1e-5):
+            continue
+        rotulo = "wake={} it={} tess={} ncpu={} projeto {}".format(*chave)
+        for campo in ("CLtot", "CDi", "LD"):
+            va, vb = float(la[campo]), float(lb[campo])
+            if abs(vb - va) > tol_resultado * max(abs(va), 1e-12):
+                regressoes.append(f"{rotulo}: {campo} {va:.6g} → {vb:.6g}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo x precisão dos ajustes do VSPAERO")
+    parser.add_argument("--wake", type=int, nargs="+", default=WAKE_NODES)
+    parser.add_argument("--iters", type=int, nargs="+", default=WAKE_ITERS)
+    parser.add_argument("--tess", nargs="+", default=TESSELLATIONS,
+                        help='Tess_U x Tess_W, p.ex. "30x45", ou "base"')
+    parser.add_argument("--ncpu", type=int, nargs="+", default=NCPUS)
+    parser.add_argument("--aleatorios", type=int, default=N_RANDOM,
+                        help="pontos internos sorteados no painel")
+    parser.add_argument("--saida", default=OUTPUT_DIR)
+    parser.add_argument("--comparar", metavar="CSV",
+                        help="fidelidade_pareto.csv anterior para checar regressões")
+    args = parser.parse_args()
+
+    X = benchmark_panel(args.aleatorios)
+    grid = benchmark_grid(args.wake, args.iters, args.tess, args.ncpu)
+    print(f"[benchmark] {len(grid)} configurações x {len(X)} projetos")
+
+    resultados = run_benchmark(grid, X)
+    linhas = summarize(resultados, reference_config(grid))
+    caminho = write_reports(resultados, linhas, X, args.saida)
+    print_pareto(linhas)
+    print(f"\n✅ Relatório salvo em: {os.path.abspath(args.saida)}")
+
+    if args.comparar:
+        regressoes = compare_reports(args.comparar, caminho)
+        print(f"\n[regressão] {len(regressoes)} diferença(s) contra {args.comparar}")
+        for r in regressoes:
+            print(f"  - {r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# ============================================================
+# geom_cache.py
+# ------------------------------------------------------------
+# Cache endereçado por conteúdo das saídas da etapa de geometria
+# do VSPAERO (.vspgeom, .vkey, .csf).
+#
+# A malha só depende da geometria aplicada ao modelo, não da condição
+# de voo. Uma avaliação em outro Mach/alpha/rho de um projeto já
+# tesselado liga os arquivos do cache na sua pasta e vai direto para o
+# solver, sem VSPAEROComputeGeometry.
+#
+#   chave = hash( conteúdo dos arquivos de origem (cessna210.vsp3, ...)
+#               + valores dos parms da XSec_1 aplicados (%.12g)
+#               + variante da malha (p.ex. "openvsp" ou "morph") )
+#
+#   - cada entrada é uma pasta <raiz>/<chave>/ com geom.vspgeom,
+#     geom.vkey e geom.csf; a gravação é feita numa pasta temporária e
+#     renomeada, então vários processos podem compartilhar a raiz
+#   - os arquivos entram na pasta da avaliação por hard link (mesmo
+#     sistema de arquivos), link simbólico ou cópia, nessa ordem; o
+#     .vkey é sempre reescrito, porque guarda o caminho absoluto do
+#     .vspgeom
+#   - max_entries limita o número de entradas (remove as usadas há
+#     mais tempo, pela data de modificação da pasta); a entrada removida
+#     é antes renomeada para .tmp_*, e um link() que perca a corrida
+#     para a remoção conta como miss
+#
+#   cache = GeometryCache("cache_geometria", sources=["cessna210.vsp3"])
+#   chave = cache.key(x)
+#   if not cache.link(chave, run_dir, stem):
+#       vsp.ExecAnalysis("VSPAEROComputeGeometry")
+#       cache.store(chave, run_dir, stem)
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from planform import planform_from_x, XSEC_PARMS
+from vspgeom_morph import write_vkey
+
+# Saídas da etapa de geometria, na ordem em que são ligadas
+GEOMETRY_EXTS = (".vspgeom", ".vkey", ".csf")
+
+
+def _digest_files(paths):
+    """Hash do conteúdo de uma lista de arquivos."""
+    h = hashlib.sha1()
+    for p in paths:
+        with open(p, "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloco)
+    return h.hexdigest()
+
+
+def _liga(origem, destino):
+    """Hard link → link simbólico → cópia."""
+    if os.path.lexists(destino):
+        os.remove(destino)
+    try:
+        os.link(origem, destino)
+        return
+    except OSError:
+        pass
+    try:
+        os.symlink(os.path.abspath(origem), destino)
+        return
+    except OSError:
+        pass
+    shutil.copyfile(origem, destino)
+
+
+class GeometryCache:
+    """
+    Cache das saídas de geometria do VSPAERO, compartilhável entre
+    processos.
+
+    root        : pasta do cache (criada se não existir)
+    sources     : arquivos que definem o modelo base (entram na chave)
+    variant     : texto que distingue malhas geradas de formas diferentes
+    max_entries : limite de entradas (None = sem limite)
+    """
+
+    def __init__(self, root, sources=(), variant="", max_entries=None):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.variant = variant
+        self.max_entries = max_entries
+        self._origem = _digest_files(sources)
+
+        # Contadores desta execução
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------
+    def key(self, x, variant=None):
+        """Chave da geometria do vetor x = [AR, span, taper, sweep, twist]."""
+        valores, _, _ = planform_from_x(x)
+        texto = ";".join(f"{n}={valores[n]:.12g}" for n in XSEC_PARMS)
+        texto += f"|{self.variant if variant is None else variant}|{self._origem}"
+        return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:20]
+
+    def _pasta(self, chave):
+        return os.path.join(self.root, chave)
+
+    def has(self, chave):
+        return os.path.exists(os.path.join(self._pasta(chave), "geom.vspgeom"))
+
+    # ------------------------------------------------------------
+    def link(self, chave, run_dir, stem):
+        """
+        Coloca os arquivos da entrada em run_dir como <stem>.vspgeom etc.
+        Retorna False (e conta um miss) se a chave não estiver no cache
+        ou se a entrada sumir no meio (evict() de outro processo).
+        """
+        pasta = self._pasta(chave)
+        if not self.has(chave):
+            self.misses += 1
+            return False
+
+        destino = os.path.join(run_dir, stem)
+        try:
+            for ext in GEOMETRY_EXTS:
+                origem = os.path.join(pasta, "geom" + ext)
+                if not os.path.exists(origem):
+                    continue
+                if ext == ".vkey":
+                    write_vkey(origem, destino + ext, destino + ".vspgeom")
+                else:
+                    _liga(origem, destino + ext)
+        except OSError:
+            remove_geometry(run_dir, stem)   # não deixa a malha pela metade
+            self.misses += 1
+            return False
+
+        try:
+            os.utime(pasta)                  # marca de uso para o limite LRU
+        except OSError:
+            pass
+        self.hits += 1
+        return True
+
+    def store(self, chave, run_dir, stem):
+        """Copia as saídas de geometria de <run_dir>/<stem> para o cache."""
+        if self.has(chave):
+            return
+        origem = os.path.join(run_dir, stem)
+        if not os.path.exists(origem + ".vspgeom"):
+            raise FileNotFoundError(f"{origem}.vspgeom não encontrado para o cache")
+
+        tmp = tempfile.mkdtemp(prefix=".tmp_", dir=self.root)
+        try:
+            for ext in GEOMETRY_EXTS:
+                if os.path.exists(origem + ext):
+                    shutil.copyfile(origem + ext, os.path.join(tmp, "geom" + ext))
+            os.rename(tmp, self._pasta(chave))
+        except OSError:
+            # Outro processo gravou a mesma chave antes
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    # ------------------------------------------------------------
+    def evict(self):
+        """
+        Aplica o limite de entradas (remove as usadas há mais tempo).
+        Só lê as datas quando a contagem passa do limite; cada entrada
+        removida é renomeada para .tmp_* antes do rmtree, então dois
+        processos não apagam a mesma pasta e has() já a vê como ausente.
+        """
+        if self.max_entries is None:
+            return
+        nomes = [n for n in os.listdir(self.root) if not n.startswith(".tmp_")]
+        if len(nomes) <= int(self.max_entries):
+            return
+        entradas = []
+        for nome in nomes:
+            p = os.path.join(self.root, nome)
+            try:
+                if os.path.isdir(p):
+                    entradas.append((os.path.getmtime(p), nome))
+            except OSError:
+                continue
+        entradas.sort(reverse=True)
+        for _, nome in entradas[int(self.max_entries):]:
+            lixo = os.path.join(self.root, f".tmp_evict_{os.getpid()}_{nome}")
+            try:
+                os.rename(os.path.join(self.root, nome), lixo)
+            except OSError:              # outro processo já removeu
+                continue
+            shutil.rmtree(lixo, ignore_errors=True)
+
+    def stats(self):
+        """Hits/misses desta execução e entradas na raiz."""
+        consultas = self.hits + self.misses
+        n = sum(1 for nome in os.listdir(self.root) if not nome.startswith(".tmp_"))
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / consultas if consultas else 0.0,
+                "entradas": n}
+
+
+def remove_geometry(run_dir, stem):
+    """
+    Apaga <stem>.vspgeom/.vkey/.csf de run_dir antes de gerar a malha:
+    se forem links para o cache, o OpenVSP não grava por cima da entrada.
+    """
+    for ext in GEOMETRY_EXTS:
+        p = os.path.join(run_dir, stem + ext)
+        if os.path.lexists(p):
+            os.remove(p)
+
+
+_CACHES = {}
+
+
+def get_geometry_cache(root, sources=(), variant="", max_entries=None):
+    """Cache de geometria por processo (um por raiz)."""
+    if root not in _CACHES:
+        _CACHES[root] = GeometryCache(root, sources=sources, variant=variant,
+                                      max_entries=max_entries)
+    return _CACHES[root]
@@ -0,0 +1,124 @@
+# ============================================================
+# history_monitor.py
+# ------------------------------------------------------------
+# Acompanha o .history enquanto o VSPAERO roda (backend
+# "subprocess") e decide quando o solve pode ser interrompido.
+#
+#   - HistoryTail lê só o que foi acrescentado desde a última
+#     leitura (offset do arquivo) e separa as linhas por
+#     "Solver Case"
+#   - ConvergenceMonitor compara CLtot e CDi entre iterações de
+#     esteira consecutivas; quando o ÚLTIMO caso da varredura muda
+#     menos que as tolerâncias, o solve pode ser morto e os valores
+#     convergidos usados
+#
+# Os casos de uma varredura são resolvidos em sequência dentro do
+# mesmo processo: matar o processo só economiza as iterações que
+# faltam do último caso. Os casos anteriores rodam todas as WakeIters.
+# O processo morto não grava o .lod: as métricas de carga dessa
+# avaliação ficam NaN (campo SemLod do registro do FCN).
+#
+# A 1ª iteração de cada caso não tem esteira (CLi = CDi = 0) e não
+# entra na comparação.
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+from vspaero_results import HISTORY_FIRST, parse_header
+
+
+class HistoryTail:
+    """Leitura incremental de um .history que ainda está sendo escrito."""
+
+    def __init__(self, path):
+        self.path = path
+        self.casos = []           # lista de casos; cada caso = lista de linhas
+        self.colunas = None       # nome → índice (do cabeçalho "Iter ...")
+        self._offset = 0
+        self._resto = ""          # linha incompleta da última leitura
+
+    def poll(self):
+        """Lê as linhas novas. Retorna o número de linhas de dados novas."""
+        try:
+            with open(self.path, "r") as f:
+                f.seek(self._offset)
+                texto = f.read()
+                self._offset = f.tell()
+        except FileNotFoundError:
+            return 0
+
+        if not texto:
+            return 0
+
+        texto = self._resto + texto
+        linhas = texto.split("\n")
+        self._resto = linhas.pop()        # pode estar pela metade
+
+        novas = 0
+        for ln in linhas:
+            partes = ln.split()
+            if not partes:
+                continue
+            if partes[0] == "Solver" and len(partes) > 1 and partes[1] == "Case:":
+                self.casos.append([])
+                continue
+            if partes[0] == HISTORY_FIRST:
+                if self.colunas is None:
+                    self.colunas = {n: i for i, n in enumerate(parse_header(partes))}
+                continue
+            if not self.casos or self.colunas is None or len(partes) != len(self.colunas):
+                continue
+            try:
+                self.casos[-1].append([float(p) for p in partes])
+            except ValueError:
+                continue
+            novas += 1
+        return novas
+
+
+class ConvergenceMonitor:
+    """
+    Critério de parada antecipada para um solve de n_cases casos.
+
+    tol_cl  : variação absoluta máxima de CLtot entre iterações
+    tol_cdi : variação absoluta máxima de CDi entre iterações
+    wake_iters : iterações de esteira por caso (WakeIters do .vspaero)
+    """
+
+    def __init__(self, hist_path, n_cases, tol_cl=1e-4, tol_cdi=1e-5, wake_iters=5):
+        self.tail = HistoryTail(hist_path)
+        self.n_cases = n_cases
+        self.tol_cl = tol_cl
+        self.tol_cdi = tol_cdi
+        self.wake_iters = wake_iters
+
+        self.convergido = False
+        self.iter_parada = None
+
+    def __call__(self):
+        """Chamado periodicamente pelo runner. True → pode parar o solve."""
+        if self.convergido:
+            return True
+        if not self.tail.poll() or len(self.tail.casos) < self.n_cases:
+            return False
+
+        col = self.tail.colunas
+        i_iter, i_cl, i_cdi = col["Iter"], col["CLtot"], col["CDi"]
+
+        linhas = [l for l in self.tail.casos[self.n_cases - 1] if l[i_iter] >= 2]
+        if len(linhas) < 2:
+            return False
+
+        ant, ult = linhas[-2], linhas[-1]
+        if (abs(ult[i_cl] - ant[i_cl]) < self.tol_cl and
+                abs(ult[i_cdi] - ant[i_cdi]) < self.tol_cdi):
+            self.convergido = True
+            self.iter_parada = int(ult[i_iter])
+        return self.convergido
+
+    @property
+    def iters_saved(self):
+        """Iterações de esteira do último caso que deixaram de rodar."""
+        if not self.convergido:
+            return 0
+        return max(0, self.wake_iters - self.iter_parada)
@@ -0,0 +1,148 @@
+# ============================================================
+# mem_usage.py
+# ------------------------------------------------------------
+# Memória residente (RSS) do processo, sem dependências obrigatórias.
+#
+#   - Linux/macOS: resource.getrusage (ru_maxrss em KB no Linux e em
+#     bytes no macOS)
+#   - outros sistemas: psutil, se instalado; senão NaN
+#
+# RUSAGE_CHILDREN cobre o executável vspaero do backend "subprocess"
+# (o maior pico entre os filhos já encerrados).
+#
+# RSS atual: /proc/self/statm no Linux, psutil nos outros sistemas.
+# MemoryTrend guarda o RSS antes/depois de cada avaliação por processo
+# worker e diz quando um worker deve ser reciclado (número de
+# avaliações ou crescimento da memória desde a primeira avaliação):
+#
+#   trend = MemoryTrend(max_evals=200, max_growth_mb=500)
+#   trend.record(pid, antes, depois)
+#   if trend.needs_recycle(): ...       # reinicia os workers
+#   trend.export_csv("memoria.csv")
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import csv
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:          # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_MB = 1024.0 * 1024.0
+
+
+def _maxrss_mb(quem):
+    kb = resource.getrusage(quem).ru_maxrss
+    return kb / _MB if sys.platform == "darwin" else kb / 1024.0
+
+
+def peak_rss_mb(children=False):
+    """
+    Pico de RSS [MB] do processo (children=True → dos processos filhos
+    já encerrados). NaN se não houver como medir.
+    """
+    if resource is not None:
+        return _maxrss_mb(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    if psutil is not None and not children:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / _MB
+    return float("nan")
+
+
+def current_rss_mb():
+    """RSS atual [MB] deste processo. NaN se não houver como medir."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / _MB
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / _MB
+    return float("nan")
+
+
+class MemoryTrend:
+    """
+    RSS antes/depois de cada avaliação, por processo.
+
+    max_evals     : avaliações por worker antes de reciclar (None = sem limite)
+    max_growth_mb : crescimento do RSS desde a 1ª avaliação do worker que
+                    pede reciclagem (None = sem limite)
+    """
+
+    def __init__(self, max_evals=None, max_growth_mb=None):
+        self.max_evals = max_evals
+        self.max_growth_mb = max_growth_mb
+        self.rows = []             # (t, pid, n do worker, antes, depois)
+        self._n = {}               # pid → avaliações
+        self._base = {}            # pid → RSS antes da 1ª avaliação
+        self._ultimo = {}          # pid → RSS depois da última avaliação
+        self.recycles = 0
+
+    def record(self, pid, antes, depois):
+        n = self._n.get(pid, 0) + 1
+        self._n[pid] = n
+        self._base.setdefault(pid, antes)
+        self._ultimo[pid] = depois
+        self.rows.append((time.time(), pid, n, antes, depois))
+
+    def growth(self, pid):
+        """Crescimento do RSS [MB] do worker desde a 1ª avaliação."""
+        return self._ultimo[pid] - self._base[pid]
+
+    def needs_recycle(self, pids=None):
+        """
+        Motivo para reciclar os workers atuais (None se nenhum); pids
+        restringe a verificação a um grupo de workers (uma etapa do
+        pipeline). O próprio processo (avaliação em série) só é registrado.
+        """
+        for pid, n in list(self._n.items()):
+            if pid == os.getpid() or (pids is not None and pid not in pids):
+                continue
+            if self.max_evals is not None and n >= self.max_evals:
+                return f"worker {pid} com {n} avaliações"
+            if self.max_growth_mb is not None and self.growth(pid) > self.max_growth_mb:
+                return f"worker {pid} cresceu {self.growth(pid):.0f} MB"
+        return None
+
+    def reset(self, pids=None):
+        """
+        Workers reciclados (todos ou só os de pids): as contagens
+        recomeçam (o histórico fica).
+        """
+        for pid in list(self._n) if pids is None else pids:
+            for d in (self._n, self._base, self._ultimo):
+                d.pop(pid, None)
+        self.recycles += 1
+
+    def summary(self):
+        if not self.rows:
+            return {"avaliacoes": 0, "reciclagens": self.recycles}
+        delta = [d - a for _, _, _, a, d in self.rows]
+        return {"avaliacoes": len(self.rows), "reciclagens": self.recycles,
+                "rss_max_mb": max(d for *_, d in self.rows),
+                "delta_medio_mb": sum(delta) / len(delta)}
+
+    def export_csv(self, path):
+        """Uma linha por avaliação: tempo, pid, n no worker, RSS antes/depois."""
+        pasta = os.path.dirname(os.path.abspath(path))
+        os.makedirs(pasta, exist_ok=True)
+        with open(path, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["avaliacao", "t", "pid", "n_worker", "RSS_antes_MB",
+                        "RSS_depois_MB", "delta_MB"])
+            for k, (t, pid, n, antes, depois) in enumerate(self.rows):
+                w.writerow([k, f"{t:.3f}", pid, n, f"{antes:.1f}", f"{depois:.1f}",
+                            f"{depois - antes:.2f}"])
+        return path
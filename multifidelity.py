@@ -0,0 +1,176 @@
+# ============================================================
+# multifidelity.py
+# ------------------------------------------------------------
+# Triagem de baixa fidelidade com promoção dos projetos promissores.
+#
+# Cada geração do PSO é avaliada primeiro no nível mais barato de
+# v15_cessna_opt.FIDELITY_LEVELS (poucos nós/iterações de esteira,
+# tesselagem grossa). Só é reavaliada no nível de produção ("alta") a
+# partícula que:
+#
+#   - melhoraria o seu lbest (f_baixa < lbest)
+#   - melhoraria o gbest (f_baixa < gbest)
+#   - fica dentro de margin·|gbest| do gbest (ou do melhor valor da
+#     triagem, quando este é menor)
+#
+# f_baixa já vem corrigido pelo viés médio entre os níveis (mediana de
+# f_alta - f_baixa das partículas promovidas até agora): menos esteira
+# e malha grossa erram o CDi sempre para o mesmo lado e, sem correção,
+# a triagem nunca pareceria melhor que um lbest de alta fidelidade.
+#
+# Depois da promoção, uma triagem abaixo do melhor valor de alta
+# fidelidade também sobe de nível (o erro da baixa pode inverter a
+# ordem), até nenhuma sobrar: o gbest que o ParticleSwarm guarda vem
+# sempre de um solve de alta fidelidade. Partículas não promovidas
+# ficam com o valor da triagem, que não altera lbest nem gbest. A
+# exceção é a população inicial (lbest = inf): fora da faixa do gbest,
+# o lbest começa com o valor de baixa fidelidade até a partícula
+# melhorar.
+#
+# O campo "Fidelity" dos registros (posição em FIDELITY_ORDER) diz de
+# que nível veio cada resultado.
+#
+# Retomada: on_result(nivel, i, resultado) é chamado ao fim de cada
+# avaliação (triagem e promoções) e screen(..., done=...) não refaz as
+# avaliações já feitas da geração. As diferenças que dão o viés
+# (atributo diffs) só crescem ao fim da triagem e podem ser guardadas no
+# checkpoint do driver: a geração retomada repete as mesmas promoções.
+#
+#   avaliadores = {"baixa": CachedEvaluator(...), "alta": CachedEvaluator(...)}
+#   mf = MultiFidelityEvaluator(avaliadores)
+#   mf.diffs = estado.setdefault("fidelidade_dif", [])   # vai no checkpoint
+#   fobj, dados = mf.screen(X, enxame.lbest, enxame.gbest)
+#   enxame.tell(fobj)
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import numpy as np
+
+from v15_cessna_opt import FIDELITY_ORDER, HIGH_FIDELITY, pack_results
+
+# Faixa relativa em torno do gbest promovida para alta fidelidade
+PROMOTION_MARGIN = 0.02
+
+
+class MultiFidelityEvaluator:
+    """
+    Triagem + promoção sobre evaluators por nível de fidelidade.
+
+    evaluators : nível → evaluator (SerialEvaluator, ParallelEvaluator,
+                 CachedEvaluator com o cache daquele nível, ...); o mesmo
+                 objeto pode servir aos dois níveis
+    screen     : nível da triagem (padrão: o mais barato)
+    high       : nível de produção (padrão: HIGH_FIDELITY)
+    margin     : faixa relativa em torno do gbest que também é promovida
+    diffs      : lista f_alta - f_baixa das promoções anteriores (retomada)
+    """
+
+    def __init__(self, evaluators, screen=FIDELITY_ORDER[0], high=HIGH_FIDELITY,
+                 margin=PROMOTION_MARGIN, diffs=None):
+        faltando = [n for n in (screen, high) if n not in evaluators]
+        if faltando:
+            raise ValueError(f"sem evaluator para o(s) nível(is) {faltando}")
+        self.evaluators = evaluators
+        self.screen_level = screen
+        self.high_level = high
+        self.margin = margin
+
+        # Contadores desta execução
+        self.n_screen = 0
+        self.n_promoted = 0
+        # f_alta - f_baixa das partículas promovidas
+        self.diffs = [] if diffs is None else diffs
+
+    def bias(self):
+        """Viés estimado f_alta - f_baixa (0 antes da primeira promoção)."""
+        return float(np.median(self.diffs)) if self.diffs else 0.0
+
+    def evaluate(self, X, on_result=None, fidelity=None):
+        """Avaliação direta num nível (padrão: alta), sem triagem."""
+        nivel = self.high_level if fidelity is None else fidelity
+        return self.evaluators[nivel].evaluate(X, on_result=on_result, fidelity=nivel)
+
+    def _evaluate_missing(self, X, idx, nivel, done, on_result):
+        """
+        Resultados do nível 'nivel' para as linhas idx de X: os que já
+        estão em done são reaproveitados, os demais avaliados (on_result a
+        cada avaliação concluída).
+        """
+        faltando = [i for i in idx if (nivel, i) not in done]
+        if faltando:
+            def novo(j, res):
+                done[(nivel, faltando[j])] = res
+                if on_result is not None:
+                    on_result(nivel, faltando[j], res)
+
+            self.evaluate(X[faltando], on_result=novo, fidelity=nivel)
+        return pack_results([done[(nivel, i)] for i in idx])
+
+    def screen(self, X, lbest, gbest, on_result=None, done=None):
+        """
+        Triagem da geração X (n, 5) e promoção dos projetos promissores.
+
+        lbest : (n,) melhores valores atuais das partículas de X
+        gbest : melhor valor global atual (inf antes do primeiro tell)
+        done  : {(nivel, i): (fobj, registro)} avaliações desta geração já
+                feitas (geração interrompida); não são refeitas e o dict
+                recebe as novas
+
+        Retorna (fobj (n,), registros (n,)) como o FCN_batch, com o
+        resultado de alta fidelidade nas partículas promovidas e, nas
+        demais, o registro da triagem e o fobj corrigido pelo viés.
+        on_result(nivel, i, (fobj, registro)) é chamado ao fim de cada
+        avaliação, da triagem e das promoções.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        lbest = np.asarray(lbest, dtype=float)
+        gbest = float(gbest)
+        done = {} if done is None else done
+
+        f_triagem, rec = self._evaluate_missing(X, range(len(X)), self.screen_level,
+                                                done, on_result)
+        f_baixa = f_triagem + self.bias()
+        f = f_baixa.copy()
+        rec = rec.copy()
+        promovida = np.zeros(len(X), dtype=bool)
+        dif = []
+
+        ref = min(gbest, float(f_baixa.min()))
+        alvo = ((f_baixa <= ref + self.margin * abs(ref)) |
+                (np.isfinite(gbest) & (f_baixa < gbest)) |
+                (np.isfinite(lbest) & (f_baixa < lbest)))
+
+        while alvo.any():
+            idx = np.flatnonzero(alvo)
+            f_alta, rec_alta = self._evaluate_missing(X, idx.tolist(), self.high_level,
+                                                      done, on_result)
+            f[idx] = f_alta
+            rec[idx] = rec_alta
+            promovida[idx] = True
+            dif.extend((f_alta - f_triagem[idx]).tolist())
+
+            # gbest só de alta fidelidade: triagens abaixo do melhor valor
+            # de alta também sobem
+            melhor = min(gbest, float(f[promovida].min()))
+            alvo = ~promovida & (f_baixa < melhor)
+
+        # O viés só muda ao fim da geração (retomada repete as promoções)
+        self.diffs.extend(dif)
+        self.n_screen += len(X)
+        self.n_promoted += int(promovida.sum())
+        print(f"[fidelidade] {len(X)} triadas em {self.screen_level}, "
+              f"{int(promovida.sum())} promovidas para {self.high_level} "
+              f"(viés={self.bias():+.4f})")
+        return f, rec
+
+    def stats(self):
+        return {"triadas": self.n_screen, "promovidas": self.n_promoted,
+                "vies": self.bias(),
+                "taxa_promocao": self.n_promoted / self.n_screen if self.n_screen else 0.0}
+
+    def close(self):
+        # Um mesmo evaluator pode atender aos dois níveis: fecha cada um uma vez
+        for ev in {id(e): e for e in self.evaluators.values()}.values():
+            ev.close()
+        print(f"[fidelidade] {self.stats()}")
@@ -0,0 +1,414 @@
+# ============================================================
+# parallel_eval.py
+# ------------------------------------------------------------
+# Avaliação das partículas do PSO em série ou em paralelo.
+#
+# Modo paralelo:
+#   - N processos worker (ProcessPoolExecutor)
+#   - cada worker tem a sua própria instância do OpenVSP
+#     (uma sessão do vsp_session por processo)
+#   - cada avaliação roda numa pasta de rascunho própria (scratch.py),
+#     com prefixo de arquivo único por worker (cessna_w<pid>.*)
+#   - o driver envia a geração inteira e recebe os resultados
+#     na ordem das partículas
+#   - evaluate(X, fidelity=...) escolhe o nível de fidelidade do FCN
+#     (v15_cessna_opt.FIDELITY_LEVELS) para o lote inteiro
+#
+# Ex.: nó de 32 núcleos com NCPU=4 por solve → n_workers=8
+#
+# Supervisão: prazo por avaliação derivado dos tempos recentes,
+# reinício de workers travados e cópia especulativa da avaliação
+# mais lenta da geração (solver_watchdog.py). Os timeouts/retries/falhas
+# do watchdog de cada solve voltam nos registros e o total é impresso
+# no close().
+#
+# Memória (mem_usage.py): cada worker mede o RSS antes e depois de cada
+# avaliação; os workers são reciclados depois de max_evals_per_worker
+# avaliações ou quando o RSS cresce mais que max_growth_mb (o OpenVSP
+# vaza memória entre avaliações). A reciclagem espera as avaliações em
+# andamento terminarem; o estado do otimizador fica no driver. A
+# tendência vai para memory_csv no close().
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import multiprocessing
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import v15_cessna_opt
+from v15_cessna_opt import FCN_batch, failed_result, pack_results, HIGH_FIDELITY
+from solver_watchdog import RunTimeBudget, SolveCounts
+from mem_usage import MemoryTrend, current_rss_mb
+from scratch import remove_dirs_with_prefix
+
+# Estado do processo worker (preenchido pelo initializer)
+_WORKER = {}
+
+
+# Sinal para matar um worker travado (SIGTERM → TerminateProcess no Windows)
+_KILL = getattr(signal, "SIGKILL", signal.SIGTERM)
+
+
+def _worker_stem(pid):
+    """Prefixo dos arquivos (e das pastas de rascunho) do worker 'pid'."""
+    return f"cessna_w{pid}"
+
+
+def _init_worker(scratch_root, ncpu, pids=None):
+    """
+    Prefixo de arquivo único deste worker e raiz das pastas de rascunho.
+    O pid vai para a fila 'pids' do driver (reinício de workers travados).
+    """
+    _WORKER["stem"] = _worker_stem(os.getpid())
+    if pids is not None:
+        pids.put(os.getpid())
+
+    if scratch_root is not None:
+        v15_cessna_opt.SCRATCH_ROOT = scratch_root
+    if ncpu is not None:
+        v15_cessna_opt.NCPU = ncpu
+
+
+def _eval_particle(x, fidelity=HIGH_FIDELITY):
+    """
+    Executado no worker: FCN_batch de uma linha (pasta de rascunho
+    própria). Retorna (fobj, data, (pid, RSS antes, RSS depois)), com o
+    dicionário completo do FCN.
+    """
+    antes = current_rss_mb()
+    res = []
+    FCN_batch(np.asarray(x, dtype=float)[None, :], stem=_WORKER["stem"],
+              on_result=lambda i, r: res.append(r), fidelity=fidelity)
+    fobj, data = res[0]
+    return float(fobj), data, (os.getpid(), antes, current_rss_mb())
+
+
+def _close_report(memory, memory_csv, solves):
+    """Totais do watchdog, resumo da tendência de memória e exportação do CSV."""
+    print(f"[watchdog] {solves.summary()}")
+    if memory_csv is not None and memory.rows:
+        memory.export_csv(memory_csv)
+    print(f"[memoria] {memory.summary()}")
+
+
+class SerialEvaluator:
+    """
+    Avalia as partículas uma a uma no próprio processo (modo original).
+    O RSS de cada avaliação é registrado; não há reciclagem.
+    scratch_root e ncpu_per_solve trocam o SCRATCH_ROOT e o NCPU do
+    próprio processo, como _init_worker nos workers (None → mantém).
+    """
+
+    def __init__(self, memory_csv=None, scratch_root=None, ncpu_per_solve=None):
+        if scratch_root is not None:
+            v15_cessna_opt.SCRATCH_ROOT = scratch_root
+        if ncpu_per_solve is not None:
+            v15_cessna_opt.NCPU = ncpu_per_solve
+        self.memory = MemoryTrend()
+        self.memory_csv = memory_csv
+        self.solves = SolveCounts()
+
+    def evaluate(self, X, on_result=None, fidelity=HIGH_FIDELITY):
+        antes = [current_rss_mb()]
+
+        def registra(i, res):
+            depois = current_rss_mb()
+            self.memory.record(os.getpid(), antes[0], depois)
+            antes[0] = depois
+            self.solves.add(res[1])
+            if on_result is not None:
+                on_result(i, res)
+
+        return FCN_batch(X, on_result=registra, fidelity=fidelity)
+
+    def close(self):
+        _close_report(self.memory, self.memory_csv, self.solves)
+
+
+class ParallelEvaluator:
+    """
+    Avalia uma geração inteira em n_workers processos.
+
+    evaluate(X) recebe a matriz (n, 5) de posições e devolve, como o
+    FCN_batch, (fobj (n,), registros (n,)) na ordem das linhas de X.
+    on_result(i, (fobj, data)), se dado, é chamado assim que cada
+    partícula termina (em qualquer ordem), com o dicionário do FCN.
+
+    Supervisão (solver_watchdog.RunTimeBudget):
+      - no máximo n_workers avaliações em voo, então o tempo desde o
+        envio é o tempo de execução
+      - avaliação acima do prazo → workers reiniciados (kill) e as
+        avaliações pendentes reenviadas (a travada até max_retries vezes,
+        com o prazo dobrando a cada tentativa); esgotadas as tentativas,
+        ou se o FCN levantar exceção, a partícula recebe failed_result()
+        (fobj = PENALTY) e a geração continua
+      - quando não há mais nada na fila e sobra worker livre, a
+        avaliação mais antiga em andamento ganha uma cópia especulativa;
+        vale o primeiro resultado que chegar
+
+    Reciclagem (mem_usage.MemoryTrend): com max_evals_per_worker ou
+    max_growth_mb atingido, nenhuma avaliação nova é enviada até as em
+    andamento terminarem; então o pool é recriado.
+    """
+
+    def __init__(self, n_workers, scratch_root=None, ncpu_per_solve=None,
+                 budget=None, max_retries=2, especulativo=True, poll_s=1.0,
+                 max_evals_per_worker=None, max_growth_mb=None, memory_csv=None):
+        self.n_workers = n_workers
+        self.scratch_root = scratch_root
+        self.ncpu_per_solve = ncpu_per_solve
+        self.budget = budget or RunTimeBudget()
+        self.max_retries = max_retries
+        self.especulativo = especulativo
+        self.poll_s = poll_s
+
+        self.timeouts = 0
+        self.retries = 0
+        self.falhas = 0
+        self.especulativas = 0
+        self.especulativas_vencedoras = 0
+
+        self.memory = MemoryTrend(max_evals_per_worker, max_growth_mb)
+        self.memory_csv = memory_csv
+        self.solves = SolveCounts()
+
+        self._pool = None
+        self._pids = set()          # workers do pool atual (avisados no initializer)
+        self._fila_pids = None
+        self._orfas = {}            # cópias perdedoras ainda rodando → t_envio
+        self._start_pool()
+
+        print(f"[parallel] {n_workers} workers, rascunho em "
+              f"{scratch_root or v15_cessna_opt.SCRATCH_ROOT}")
+
+    def _start_pool(self):
+        # Fila nova por pool: pids atrasados de um pool morto não se misturam.
+        # SimpleQueue grava direto no pipe (sem thread de envio no worker)
+        if self._fila_pids is not None:
+            self._fila_pids.close()
+        self._fila_pids = multiprocessing.SimpleQueue()
+        self._pids = set()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            initializer=_init_worker,
+            initargs=(self.scratch_root, self.ncpu_per_solve, self._fila_pids),
+        )
+
+    def _worker_pids(self):
+        """Pids dos workers do pool atual que já passaram pelo initializer."""
+        while not self._fila_pids.empty():
+            self._pids.add(self._fila_pids.get())
+        return self._pids
+
+    def _kill_workers(self):
+        """
+        Mata os workers do pool atual (inclusive os travados) e apaga as
+        pastas de rascunho que eles deixaram (o rmtree do FCN não roda).
+        """
+        pids = list(self._worker_pids())
+        for pid in pids:
+            try:
+                os.kill(pid, _KILL)
+            except OSError:          # já terminou
+                pass
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        n = remove_dirs_with_prefix(self.scratch_root or v15_cessna_opt.SCRATCH_ROOT,
+                                    [_worker_stem(pid) for pid in pids])
+        if n:
+            print(f"[scratch] {n} pasta(s) de workers mortos apagada(s)")
+
+    def _restart_pool(self):
+        """Mata os workers e cria um pool novo."""
+        self._kill_workers()
+        self._orfas.clear()
+        self.memory.reset()
+        self._start_pool()
+
+    def _recycle_pool(self, motivo):
+        """Workers novos sem avaliações em andamento (cópias órfãs são mortas)."""
+        print(f"[memoria] reciclando workers: {motivo}")
+        if self._orfas:
+            self._restart_pool()
+            return
+        self._pool.shutdown(wait=True)
+        self.memory.reset()
+        self._start_pool()
+
+    def evaluate(self, X, on_result=None, fidelity=HIGH_FIDELITY):
+        X = [np.asarray(x) for x in X]
+        n = len(X)
+        resultados = [None] * n
+        fila = deque(range(n))
+        em_voo = {}                 # future → (índice, t_envio, cópia?)
+        tentativas = [0] * n
+        duplicados = set()
+
+        def ocupados():
+            # Workers em uso: avaliações em voo + cópias órfãs
+            return len(em_voo) + len(self._orfas)
+
+        def aceita(i, res):
+            resultados[i] = res
+            self.solves.add(res[1])
+            if on_result is not None:
+                on_result(i, res)
+
+        while any(r is None for r in resultados):
+
+            # Cópias perdedoras ainda ocupam um worker até terminarem
+            for fut in [f for f in self._orfas if f.done()]:
+                del self._orfas[fut]
+
+            # Reciclagem pendente: espera as avaliações em andamento
+            reciclar = self.memory.needs_recycle()
+            if reciclar and not em_voo:
+                self._recycle_pool(reciclar)
+                reciclar = None
+
+            # Completa os workers livres com a fila
+            while fila and not reciclar and ocupados() < self.n_workers:
+                i = fila.popleft()
+                em_voo[self._pool.submit(_eval_particle, X[i], fidelity)] = (
+                    i, time.perf_counter(), False)
+
+            # Fila vazia e worker livre: cópia especulativa da mais lenta
+            if (self.especulativo and not fila and not reciclar and
+                    ocupados() < self.n_workers):
+                abertas = [(t, i) for i, t, dup in em_voo.values()
+                           if not dup and resultados[i] is None and i not in duplicados]
+                tipico = self.budget.typical()
+                if abertas and tipico is not None:
+                    t_envio, i = min(abertas)
+                    if time.perf_counter() - t_envio > tipico:
+                        duplicados.add(i)
+                        self.especulativas += 1
+                        print(f"[watchdog] cópia especulativa da partícula {i + 1}")
+                        em_voo[self._pool.submit(_eval_particle, X[i], fidelity)] = (
+                            i, time.perf_counter(), True)
+
+            prontos, _ = wait(list(em_voo), timeout=self.poll_s,
+                              return_when=FIRST_COMPLETED)
+
+            perdidas = []
+            for fut in prontos:
+                i, t_envio, dup = em_voo.pop(fut)
+                try:
+                    fobj, data, mem = fut.result()
+                except BrokenProcessPool:
+                    perdidas.append(i)
+                    continue
+                except Exception as e:
+                    # Erro numa cópia com a outra ainda rodando: vale a outra
+                    if resultados[i] is not None or any(j == i for j, _, _ in em_voo.values()):
+                        print(f"[watchdog] cópia da partícula {i + 1} falhou ({e!r}); "
+                              f"a outra continua")
+                        continue
+                    self.falhas += 1
+                    print(f"[watchdog] partícula {i + 1} falhou ({e!r}): fobj de penalidade")
+                    aceita(i, failed_result(fidelity, Retries=tentativas[i]))
+                    continue
+                self.memory.record(*mem)
+                if resultados[i] is None:
+                    self.budget.record(time.perf_counter() - t_envio)
+                    if dup:
+                        self.especulativas_vencedoras += 1
+                    aceita(i, (fobj, data))
+
+            # A outra cópia de uma partícula já resolvida vira órfã
+            for fut, (i, t_envio, _) in list(em_voo.items()):
+                if resultados[i] is not None:
+                    del em_voo[fut]
+                    self._orfas[fut] = t_envio
+
+            # Avaliações acima do prazo → reinicia os workers
+            agora = time.perf_counter()
+            prazo = self.budget.budget()
+            # o prazo dobra a cada nova tentativa da mesma partícula
+            travadas = {i for i, t, _ in em_voo.values()
+                        if agora - t > prazo * 2 ** tentativas[i]}
+            orfa_travada = any(agora - t > prazo for t in self._orfas.values())
+
+            if travadas or perdidas or orfa_travada:
+                self.timeouts += len(travadas) + int(orfa_travada)
+                pendentes = sorted({i for i, _, _ in em_voo.values()} |
+                                   {i for i in perdidas if resultados[i] is None})
+                if perdidas:
+                    motivo = "worker perdido"
+                elif travadas:
+                    motivo = f"{len(travadas)} avaliação(ões) acima do prazo de {prazo:.0f} s"
+                else:
+                    motivo = "cópia especulativa órfã travada"
+                print(f"[watchdog] {motivo}: reiniciando workers")
+                self._restart_pool()
+                em_voo.clear()
+                # Só a travada (ou a do worker perdido) gasta tentativa; as
+                # outras em andamento são só reenviadas
+                reenviar = []
+                for i in pendentes:
+                    if i in travadas or i in perdidas:
+                        tentativas[i] += 1
+                    if tentativas[i] > self.max_retries:
+                        self.falhas += 1
+                        print(f"[watchdog] partícula {i + 1} travou {tentativas[i]} vezes: "
+                              f"fobj de penalidade")
+                        aceita(i, failed_result(fidelity, Timeouts=tentativas[i],
+                                                Retries=tentativas[i] - 1))
+                        continue
+                    self.retries += 1
+                    duplicados.discard(i)
+                    reenviar.append(i)
+                fila = deque(reenviar + [i for i in fila if i not in pendentes])
+
+        return pack_results(resultados)
+
+    def stats(self):
+        return {
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "falhas": self.falhas,
+            "especulativas": self.especulativas,
+            "especulativas_vencedoras": self.especulativas_vencedoras,
+            "prazo_atual_s": self.budget.budget(),
+            "reciclagens": self.memory.recycles,
+        }
+
+    def close(self):
+        # Cópia especulativa perdedora ainda rodando seguraria a saída
+        if any(not f.done() for f in self._orfas):
+            self._kill_workers()
+        else:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._fila_pids.close()
+        print(f"[parallel] {self.stats()}")
+        _close_report(self.memory, self.memory_csv, self.solves)
+
+
+def make_evaluator(n_workers=1, scratch_root=None, ncpu_per_solve=None, pipeline=False,
+                   max_evals_per_worker=None, max_growth_mb=None, memory_csv=None):
+    """
+    n_workers <= 1 → avaliação em série (pipeline=True → geometria da
+    próxima partícula adiantada num worker, pipeline_eval.py); caso
+    contrário, pool de processos.
+
+    Com reciclagem pedida (max_evals_per_worker / max_growth_mb), a
+    avaliação em série roda num único worker reciclável, fora do
+    processo do driver.
+    """
+    reciclar = dict(max_evals_per_worker=max_evals_per_worker,
+                    max_growth_mb=max_growth_mb, memory_csv=memory_csv)
+    if n_workers is None or n_workers <= 1:
+        if pipeline:
+            from pipeline_eval import PipelineEvaluator
+            return PipelineEvaluator(scratch_root=scratch_root,
+                                     ncpu_per_solve=ncpu_per_solve, **reciclar)
+        if max_evals_per_worker is None and max_growth_mb is None:
+            return SerialEvaluator(memory_csv, scratch_root, ncpu_per_solve)
+        n_workers = 1
+    return ParallelEvaluator(n_workers, scratch_root, ncpu_per_solve, **reciclar)
@@ -0,0 +1,254 @@
+# ============================================================
+# pipeline_eval.py
+# ------------------------------------------------------------
+# Avaliação em pipeline: a geometria da partícula i+1 é preparada
+# enquanto a partícula i está no solver.
+#
+# Dentro do FCN as etapas rodam em sequência (apply → Update → .vsp3 →
+# VSPAEROComputeGeometry → solve → leitura), e só o solver usa as NCPU
+# threads. O pipeline separa o FCN em três etapas ligadas por filas
+# limitadas:
+#
+#   geometria (processo worker, sessão OpenVSP própria)
+#       v15_cessna_opt.prepare_geometry(x, pasta)
+#           │  fila (depth)
+#           ▼
+#   solver (outro processo worker, sessão OpenVSP própria)
+#       v15_cessna_opt.FCN(x, run_dir=pasta, geom=...): só apply + solve
+#           │  fila (depth)
+#           ▼
+#   retenção (thread do driver): RETENTION.retain + remoção da pasta
+#
+#   - a fila de geometria limita quantas malhas ficam prontas à frente
+#     do solver (memória do tmpfs)
+#   - as pastas de rascunho (SCRATCH_ROOT) são criadas pelo driver e
+#     compartilhadas pelos dois processos
+#   - ao fim de cada lote é impressa a utilização de cada etapa (tempo
+#     ocupado / tempo de parede) e a espera do solver por geometria
+#   - o RSS antes/depois de cada etapa de geometria e de cada solve é
+#     registrado (mem_usage.MemoryTrend); cada worker é reciclado entre
+#     duas tarefas ao atingir max_evals_per_worker ou max_growth_mb. O
+#     OpenVSP do driver não é usado: o vazamento fica nos workers.
+#
+# Sem paralelismo entre processos completo: um solver por vez, com a
+# etapa de geometria preenchendo os intervalos entre solves. Para
+# vários solves simultâneos, ParallelEvaluator (parallel_eval.py).
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import v15_cessna_opt
+from v15_cessna_opt import FCN, prepare_geometry, pack_results, HIGH_FIDELITY
+from mem_usage import MemoryTrend, current_rss_mb
+from solver_watchdog import SolveCounts
+from scratch import discard_failed
+
+STAGES = ("geometria", "solver", "retencao")
+WORKER_STAGES = ("geometria", "solver")
+
+
+def _init_stage(scratch_root, ncpu):
+    """
+    Raiz de rascunho e threads do VSPAERO no worker (o initializer vale
+    também com spawn; o cache de geometria segue o SCRATCH_ROOT).
+    """
+    v15_cessna_opt.SCRATCH_ROOT = scratch_root
+    if ncpu is not None:
+        v15_cessna_opt.NCPU = ncpu
+
+
+def _prepare(x, pasta, stem, fidelity):
+    """Executado no worker de geometria: (geom, (pid, RSS antes, depois))."""
+    antes = current_rss_mb()
+    geom = prepare_geometry(np.asarray(x, dtype=float), pasta, stem, fidelity)
+    return geom, (os.getpid(), antes, current_rss_mb())
+
+
+def _solve(x, pasta, stem, fidelity, geom):
+    """Executado no worker do solver: ((fobj, data), (pid, RSS antes, depois))."""
+    antes = current_rss_mb()
+    res = FCN(np.asarray(x, dtype=float), run_dir=pasta, stem=stem,
+              fidelity=fidelity, geom=geom)
+    return res, (os.getpid(), antes, current_rss_mb())
+
+
+class PipelineEvaluator:
+    """
+    Avalia um lote com a etapa de geometria adiantada num processo
+    worker. evaluate(X) devolve, como o FCN_batch, (fobj (n,),
+    registros (n,)) na ordem das linhas de X; on_result(i, (fobj,
+    data)) é chamado ao fim do solve de cada linha (dicionário do FCN).
+
+    depth          : tamanho das filas entre as etapas
+    scratch_root   : raiz das pastas de rascunho (None → SCRATCH_ROOT)
+    ncpu_per_solve : threads do VSPAERO por solve (None → NCPU do módulo)
+    max_evals_per_worker, max_growth_mb : reciclagem dos workers de
+                     geometria e do solver
+    memory_csv     : CSV da tendência de memória escrito no close()
+    """
+
+    def __init__(self, depth=2, scratch_root=None, ncpu_per_solve=None,
+                 stem=v15_cessna_opt.RUN_STEM, max_evals_per_worker=None,
+                 max_growth_mb=None, memory_csv=None):
+        self.depth = depth
+        self.scratch_root = scratch_root or v15_cessna_opt.SCRATCH_ROOT
+        self.stem = stem
+        self.ncpu_per_solve = ncpu_per_solve
+
+        # Um worker por etapa; pids vistos nos resultados de cada um
+        self._pools = {e: self._new_pool() for e in WORKER_STAGES}
+        self._pids = {e: set() for e in WORKER_STAGES}
+        self.memory = MemoryTrend(max_evals_per_worker, max_growth_mb)
+        self.memory_csv = memory_csv
+        self.solves = SolveCounts()
+
+        # Acumulados de todos os lotes
+        self.ocupado = dict.fromkeys(STAGES, 0.0)
+        self.espera_solver = 0.0
+        self.t_parede = 0.0
+        self.n_evals = 0
+
+        print(f"[pipeline] geometria e solver em processos separados, filas de {depth}, "
+              f"rascunho em {self.scratch_root}")
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=1, initializer=_init_stage,
+                                   initargs=(self.scratch_root, self.ncpu_per_solve))
+
+    def _run(self, etapa, fn, *args):
+        """
+        Uma tarefa no worker da etapa, reciclado antes se a memória ou o
+        número de avaliações pedir. Retorna o resultado sem o RSS.
+        """
+        motivo = self.memory.needs_recycle(self._pids[etapa])
+        if motivo:
+            print(f"[memoria] reciclando worker de {etapa}: {motivo}")
+            self._pools[etapa].shutdown(wait=True)
+            self._pools[etapa] = self._new_pool()
+            self.memory.reset(self._pids[etapa])
+            self._pids[etapa].clear()
+        res, mem = self._pools[etapa].submit(fn, *args).result()
+        self._pids[etapa].add(mem[0])
+        self.memory.record(*mem)
+        return res
+
+    # ------------------------------------------------------------
+    def evaluate(self, X, on_result=None, fidelity=HIGH_FIDELITY):
+        X = [np.asarray(x, dtype=float) for x in X]
+        n = len(X)
+        os.makedirs(self.scratch_root, exist_ok=True)
+
+        fila_geom = queue.Queue(maxsize=self.depth)
+        fila_ret = queue.Queue(maxsize=self.depth)
+        parar = threading.Event()
+        ocupado = dict.fromkeys(STAGES, 0.0)
+
+        def geometria():
+            # Uma malha por vez no worker; put() bloqueia com a fila cheia
+            for i, x in enumerate(X):
+                if parar.is_set():
+                    break
+                pasta = tempfile.mkdtemp(prefix=self.stem + "_", dir=self.scratch_root)
+                try:
+                    geom = self._run("geometria", _prepare, x, pasta, self.stem, fidelity)
+                    ocupado["geometria"] += geom["t_prep"]
+                except BaseException as e:
+                    fila_geom.put((i, pasta, e))
+                    return
+                fila_geom.put((i, pasta, geom))
+
+        def retencao():
+            while True:
+                item = fila_ret.get()
+                if item is None:
+                    return
+                pasta, fobj = item
+                t0 = time.perf_counter()
+                if fobj is not None and v15_cessna_opt.RETENTION is not None:
+                    v15_cessna_opt.RETENTION.retain(pasta, self.stem, fobj)
+                shutil.rmtree(pasta, ignore_errors=True)
+                ocupado["retencao"] += time.perf_counter() - t0
+
+        t_inicio = time.perf_counter()
+        threads = [threading.Thread(target=geometria, daemon=True),
+                   threading.Thread(target=retencao, daemon=True)]
+        for t in threads:
+            t.start()
+
+        resultados = [None] * n
+        espera = 0.0
+        try:
+            for _ in range(n):
+                t0 = time.perf_counter()
+                i, pasta, geom = fila_geom.get()
+                espera += time.perf_counter() - t0
+                if isinstance(geom, BaseException):
+                    discard_failed(pasta)
+                    raise geom
+
+                t0 = time.perf_counter()
+                try:
+                    fobj, data = self._run("solver", _solve, X[i], pasta, self.stem,
+                                           fidelity, geom)
+                except BaseException:
+                    discard_failed(pasta)
+                    raise
+                ocupado["solver"] += time.perf_counter() - t0
+                self.solves.add(data)
+
+                fila_ret.put((pasta, fobj))
+                resultados[i] = (fobj, data)
+                if on_result is not None:
+                    on_result(i, resultados[i])
+        finally:
+            parar.set()
+            # Libera a thread de geometria se estiver presa na fila cheia e
+            # apaga as pastas de geometrias que não chegaram ao solver
+            while threads[0].is_alive() or not fila_geom.empty():
+                try:
+                    _, pasta, _ = fila_geom.get(timeout=0.1)
+                    fila_ret.put((pasta, None))
+                except queue.Empty:
+                    pass
+            fila_ret.put(None)
+            threads[1].join()
+
+        t_parede = time.perf_counter() - t_inicio
+        for etapa in STAGES:
+            self.ocupado[etapa] += ocupado[etapa]
+        self.espera_solver += espera
+        self.t_parede += t_parede
+        self.n_evals += n
+
+        print(f"[pipeline] {n} avaliações em {t_parede:.2f} s | " +
+              " | ".join(f"{e}={100 * ocupado[e] / t_parede:.0f}%" for e in STAGES) +
+              f" | solver esperando geometria={espera:.2f} s")
+        return pack_results(resultados)
+
+    # ------------------------------------------------------------
+    def stats(self):
+        """Utilização acumulada de cada etapa (fração do tempo de parede)."""
+        t = self.t_parede or 1.0
+        return {**{f"utilizacao_{e}": self.ocupado[e] / t for e in STAGES},
+                "espera_solver_s": self.espera_solver,
+                "avaliacoes": self.n_evals,
+                "reciclagens": self.memory.recycles}
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=True, cancel_futures=True)
+        print(f"[pipeline] {self.stats()}")
+        print(f"[watchdog] {self.solves.summary()}")
+        if self.memory_csv is not None and self.memory.rows:
+            self.memory.export_csv(self.memory_csv)
+        print(f"[memoria] {self.memory.summary()}")
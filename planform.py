@@ -0,0 +1,39 @@
+# ============================================================
+# planform.py
+# ------------------------------------------------------------
+# Vetor do PSO [AR, span, taper, sweep, twist] → parâmetros da
+# XSec_1 da asa no OpenVSP.
+#
+# Sem dependências além do Python: usado tanto pela sessão do OpenVSP
+# (vsp_session.py) quanto pelos módulos que só mexem em texto e
+# NumPy (vsp3_template.py, vspgeom_morph.py, geom_cache.py), que assim
+# rodam em máquinas sem os bindings do OpenVSP.
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+# Parâmetros da XSec_1 alterados pelo PSO (ordem de aplicação importa:
+# é a mesma usada desde o v10 para o driver de seção da asa)
+XSEC_PARMS = ("Span", "Root_Chord", "Tip_Chord", "Taper", "Sweep", "Twist")
+
+
+def planform_from_x(x):
+    """
+    Converte o vetor do PSO [AR, span, taper, sweep, twist] nos valores
+    dos seis parâmetros da XSec_1 (OpenVSP usa semi-envergadura).
+    Retorna (valores, croot, ctip).
+    """
+    AR, span, taper, sweep, twist = x
+
+    croot = 2 * span / (AR * (1.0 + taper))
+    ctip = taper * croot
+
+    valores = {
+        "Span": span / 2.0,
+        "Root_Chord": croot,
+        "Tip_Chord": ctip,
+        "Taper": taper,
+        "Sweep": sweep,
+        "Twist": twist,
+    }
+    return valores, croot, ctip
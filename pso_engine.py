@@ -0,0 +1,123 @@
+# ============================================================
+# pso_engine.py
+# ------------------------------------------------------------
+# Motor do PSO com estado em arrays e interface ask/tell.
+#
+#   enxame = ParticleSwarm(xmin, xmax, pop, omega, lambda1, lambda2)
+#   while ...:
+#       X = enxame.ask()              # (pop, nrvar) posições a avaliar
+#       f = avaliar(X)                # série, paralelo, cache, ...
+#       enxame.tell(f)                # atualiza lbest / gbest
+#
+# A atualização de velocidade e posição é a mesma dos scripts
+# v11–v15 (inércia + termos cognitivo e social, clip nos limites),
+# só que feita para o enxame inteiro em uma operação NumPy:
+#
+#   v = omega*v + lambda1*r1*(xlbest - x) + lambda2*r2*(xgbest - x)
+#   x = clip(x + v, xmin, xmax)
+#
+# Atualização síncrona: a geração inteira usa o xgbest do início
+# da iteração, o que permite avaliar todas as partículas de uma vez.
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import numpy as np
+
+
+class ParticleSwarm:
+    """
+    Enxame de partículas com estado vetorizado.
+
+    xmin, xmax : limites por variável
+    pop        : número de partículas
+    omega      : inércia
+    lambda1    : peso cognitivo (melhor posição da própria partícula)
+    lambda2    : peso social (melhor posição global)
+    seed       : semente do gerador (np.random.default_rng)
+    x0         : posições iniciais fixas (linhas de uma matriz); as
+                 primeiras partículas recebem essas posições e as
+                 demais são sorteadas uniformemente nos limites
+    """
+
+    def __init__(self, xmin, xmax, pop, omega=0.4, lambda1=2.02, lambda2=2.02,
+                 seed=None, x0=None):
+        self.xmin = np.asarray(xmin, dtype=float)
+        self.xmax = np.asarray(xmax, dtype=float)
+        self.pop = int(pop)
+        self.nrvar = len(self.xmin)
+        self.omega = omega
+        self.lambda1 = lambda1
+        self.lambda2 = lambda2
+        self.rng = np.random.default_rng(seed)
+
+        self.x = self.xmin + (self.xmax - self.xmin) * self.rng.random((self.pop, self.nrvar))
+        if x0 is not None:
+            x0 = np.atleast_2d(np.asarray(x0, dtype=float))
+            self.x[:len(x0)] = np.clip(x0, self.xmin, self.xmax)
+        self.v = np.zeros((self.pop, self.nrvar))
+
+        self.lbest = np.full(self.pop, np.inf)
+        self.xlbest = self.x.copy()
+        self.gbest = np.inf
+        self.xgbest = None
+
+        self.iteration = 0        # gerações já avaliadas (tell)
+        self.n_evals = 0
+        self.ibest = None         # partícula que melhorou o gbest no último tell
+        self._pendente = True     # posições atuais ainda não avaliadas
+
+    # ------------------------------------------------------------
+    # ask / tell
+    # ------------------------------------------------------------
+    def ask(self):
+        """Posições (pop, nrvar) a avaliar. Avança o enxame se necessário."""
+        if not self._pendente:
+            self.step()
+        return self.x.copy()
+
+    def tell(self, f):
+        """
+        Recebe os valores da função objetivo das posições do último ask().
+        Retorna True se o gbest melhorou.
+        """
+        f = np.asarray(f, dtype=float).reshape(self.pop)
+
+        melhorou = f < self.lbest
+        self.lbest[melhorou] = f[melhorou]
+        self.xlbest[melhorou] = self.x[melhorou]
+
+        i = int(np.argmin(f))
+        self.ibest = None
+        if f[i] < self.gbest:
+            self.gbest = float(f[i])
+            self.xgbest = self.x[i].copy()
+            self.ibest = i
+
+        self.iteration += 1
+        self.n_evals += self.pop
+        self._pendente = False
+        return self.ibest is not None
+
+    # ------------------------------------------------------------
+    # Atualização do enxame
+    # ------------------------------------------------------------
+    def step(self):
+        """Nova velocidade e posição de todas as partículas."""
+        if self.xgbest is None:
+            raise RuntimeError("step() antes do primeiro tell()")
+
+        r1 = self.rng.random((self.pop, self.nrvar))
+        r2 = self.rng.random((self.pop, self.nrvar))
+
+        self.v = (self.omega * self.v +
+                  self.lambda1 * r1 * (self.xlbest - self.x) +
+                  self.lambda2 * r2 * (self.xgbest - self.x))
+        self.x = np.clip(self.x + self.v, self.xmin, self.xmax)
+        self._pendente = True
+
+    def minimize(self, fcn_batch, itermax):
+        """Laço simples para funções baratas: fcn_batch(X) → (pop,) valores."""
+        for _ in range(itermax):
+            self.tell(fcn_batch(self.ask()))
+        return self.xgbest, self.gbest
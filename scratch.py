@@ -0,0 +1,173 @@
+# ============================================================
+# scratch.py
+# ------------------------------------------------------------
+# Pastas de rascunho por avaliação e política de retenção dos
+# arquivos do VSPAERO.
+#
+#   - cada avaliação do FCN roda numa pasta nova em memória
+#     (/dev/shm por padrão; pasta temporária do sistema se não
+#     existir), apagada inteira ao fim da avaliação — sem os.listdir
+#     para limpar arquivos de avaliações anteriores
+#   - avaliação que falhou: a pasta fica para diagnóstico só fora do
+#     tmpfs (em /dev/shm ocuparia RAM até o fim da execução); pastas de
+#     workers mortos pelo watchdog são apagadas pelo prefixo do worker
+#   - antes de apagar, a RetentionPolicy copia para o disco só os
+#     arquivos pedidos: p.ex. .history + .lod de toda avaliação e o
+#     conjunto completo (.adb, quad .dat, .slc, ...) quando a
+#     avaliação melhora o melhor fobj visto
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import contextlib
+import fnmatch
+import os
+import shutil
+import tempfile
+
+
+def default_scratch_root():
+    """/dev/shm (tmpfs) se existir; senão a pasta temporária do sistema."""
+    raiz = os.environ.get("PSO_SCRATCH")
+    if raiz:
+        return raiz
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def on_tmpfs(path):
+    """True se 'path' estiver num tmpfs (ponto de montagem mais longo do /proc/mounts)."""
+    path = os.path.realpath(path)
+    melhor, tipo = "", None
+    try:
+        with open("/proc/mounts", "r") as f:
+            for ln in f:
+                partes = ln.split()
+                if len(partes) < 3:
+                    continue
+                ponto = partes[1]
+                dentro = path == ponto or path.startswith(ponto.rstrip("/") + "/")
+                if dentro and len(ponto) > len(melhor):
+                    melhor, tipo = ponto, partes[2]
+    except OSError:
+        return False
+    return tipo == "tmpfs"
+
+
+def discard_failed(pasta, keep=None):
+    """
+    Pasta de uma avaliação que falhou: mantida para diagnóstico (o
+    caminho é impresso) ou apagada. keep=None → mantida só fora do tmpfs.
+    """
+    if keep is None:
+        keep = not on_tmpfs(pasta)
+    if keep:
+        print(f"[scratch] avaliação falhou; arquivos mantidos em {pasta}")
+    else:
+        shutil.rmtree(pasta, ignore_errors=True)
+        print(f"[scratch] avaliação falhou; {pasta} apagada (tmpfs)")
+
+
+def remove_dirs_with_prefix(root, prefixes):
+    """
+    Apaga as pastas de rascunho de 'root' criadas com um dos prefixos
+    (scratch_dir(prefix=...) → "<prefixo>_xxxx"), p.ex. as de workers
+    mortos que não chegaram ao rmtree. Retorna quantas foram apagadas.
+    """
+    prefixos = tuple(p + "_" for p in prefixes)
+    if not prefixos or not os.path.isdir(root):
+        return 0
+    n = 0
+    with os.scandir(root) as it:
+        for entrada in it:
+            if entrada.is_dir(follow_symlinks=False) and entrada.name.startswith(prefixos):
+                shutil.rmtree(entrada.path, ignore_errors=True)
+                n += 1
+    return n
+
+
+@contextlib.contextmanager
+def scratch_dir(root=None, prefix="eval", keep_on_error=None):
+    """
+    Cria uma pasta de rascunho única em 'root' e a apaga na saída.
+    Se a avaliação lançar exceção, a pasta fica para diagnóstico com
+    keep_on_error (None → só fora do tmpfs, ver discard_failed).
+    """
+    root = root or default_scratch_root()
+    os.makedirs(root, exist_ok=True)
+    pasta = tempfile.mkdtemp(prefix=prefix + "_", dir=root)
+    try:
+        yield pasta
+    except BaseException:
+        discard_failed(pasta, keep_on_error)
+        raise
+    shutil.rmtree(pasta, ignore_errors=True)
+
+
+class RetentionPolicy:
+    """
+    Decide quais arquivos de uma avaliação são copiados para dest_dir.
+
+    always         : padrões (fnmatch sobre o sufixo após o stem, p.ex.
+                     ".history", ".lod", ".case.*.quad.*.dat") mantidos
+                     em toda avaliação
+    on_improvement : padrões mantidos quando fobj melhora o melhor valor
+                     visto por esta política ("*" = tudo)
+
+    Com workers paralelos cada processo tem a sua política: o melhor de
+    um worker não é o gbest, então o conjunto mantido é um superconjunto
+    das melhorias do gbest (toda melhoria global também é local).
+    """
+
+    def __init__(self, dest_dir, always=(".history", ".lod"), on_improvement=("*",)):
+        self.dest_dir = dest_dir
+        self.always = tuple(always)
+        self.on_improvement = tuple(on_improvement)
+
+        self.best = float("inf")
+        self.n_evals = 0
+        self.bytes_total = 0
+        self.bytes_kept = 0
+
+    def _selecionar(self, run_dir, stem, padroes):
+        arquivos, total = [], 0
+        with os.scandir(run_dir) as it:
+            for entrada in it:
+                if not entrada.is_file():
+                    continue
+                total += entrada.stat().st_size
+                if not entrada.name.startswith(stem):
+                    continue
+                sufixo = entrada.name[len(stem):]
+                if any(fnmatch.fnmatch(sufixo, p) for p in padroes):
+                    arquivos.append(entrada)
+        return arquivos, total
+
+    def retain(self, run_dir, stem, fobj):
+        """Copia os arquivos mantidos de run_dir. Retorna a pasta de destino (ou None)."""
+        self.n_evals += 1
+        melhorou = fobj < self.best
+        if melhorou:
+            self.best = fobj
+
+        padroes = self.always + (self.on_improvement if melhorou else ())
+        arquivos, total = self._selecionar(run_dir, stem, padroes)
+        self.bytes_total += total
+        if not arquivos:
+            return None
+
+        nome = f"{stem}_{self.n_evals:05d}" + ("_best" if melhorou else "")
+        destino = os.path.join(self.dest_dir, nome)
+        os.makedirs(destino, exist_ok=True)
+        for entrada in arquivos:
+            shutil.copyfile(entrada.path, os.path.join(destino, entrada.name))
+            self.bytes_kept += entrada.stat().st_size
+        return destino
+
+    def stats(self):
+        return {
+            "avaliacoes": self.n_evals,
+            "mb_gerados": self.bytes_total / 2**20,
+            "mb_mantidos": self.bytes_kept / 2**20,
+        }
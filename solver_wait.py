@@ -0,0 +1,125 @@
+# ============================================================
+# solver_wait.py
+# ------------------------------------------------------------
+# Espera por arquivos de resultado do VSPAERO sem sleep-polling.
+#
+#   - ExecAnalysis() só retorna depois que o solver terminou: se o
+#     arquivo já existe nesse momento, ele está completo e a espera
+#     termina na hora (o retorno da chamada é o sinal de término)
+#   - Se ainda não existe, no Linux usa inotify (IN_CLOSE_WRITE /
+#     IN_MOVED_TO): a espera termina assim que o arquivo é fechado
+#   - Em outros sistemas cai para polling com backoff curto
+#     (1 ms → 50 ms), em vez de passos fixos de 0,1–0,2 s
+#
+# Em caso de timeout a exceção informa quanto tempo se esperou.
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+# Máscaras do inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+_EVENT_HDR = struct.Struct("iIII")    # wd, mask, cookie, len
+
+_libc = None
+if sys.platform.startswith("linux"):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        _libc.inotify_init1
+    except (OSError, AttributeError):
+        _libc = None
+
+
+class SolverWaitTimeout(RuntimeError):
+    """Arquivo de resultado não apareceu dentro do prazo."""
+
+    def __init__(self, path, waited):
+        super().__init__(f"{os.path.basename(path)} não encontrado após "
+                         f"{waited:.3f} s de espera ({path})")
+        self.path = path
+        self.waited = waited
+
+
+def _wait_inotify(path, timeout):
+    """Espera o fechamento de 'path' via inotify. Retorna True/False."""
+    pasta = os.path.dirname(os.path.abspath(path)) or "."
+    nome = os.path.basename(path).encode()
+
+    fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    try:
+        wd = _libc.inotify_add_watch(fd, pasta.encode(), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            return None
+
+        # O arquivo pode ter sido fechado entre a checagem e o add_watch
+        if os.path.exists(path):
+            return True
+
+        fim = time.perf_counter() + timeout
+        while True:
+            resta = fim - time.perf_counter()
+            if resta <= 0:
+                return False
+            prontos, _, _ = select.select([fd], [], [], resta)
+            if not prontos:
+                return False
+            try:
+                buf = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            pos = 0
+            while pos + _EVENT_HDR.size <= len(buf):
+                _, _, _, n = _EVENT_HDR.unpack_from(buf, pos)
+                ev_nome = buf[pos + _EVENT_HDR.size:pos + _EVENT_HDR.size + n].rstrip(b"\0")
+                pos += _EVENT_HDR.size + n
+                if ev_nome == nome:
+                    return True
+    finally:
+        os.close(fd)
+
+
+def _wait_polling(path, timeout):
+    """Polling com backoff exponencial curto."""
+    fim = time.perf_counter() + timeout
+    passo = 0.001
+    while not os.path.exists(path):
+        resta = fim - time.perf_counter()
+        if resta <= 0:
+            return False
+        time.sleep(min(passo, resta))
+        passo = min(passo * 2.0, 0.05)
+    return True
+
+
+def wait_for_file(path, timeout=3.0):
+    """
+    Espera 'path' existir (completo). Retorna o tempo esperado [s].
+    Lança SolverWaitTimeout (com o tempo esperado) se não aparecer.
+    """
+    t0 = time.perf_counter()
+
+    # Caso normal: o solver já retornou e o arquivo está pronto
+    if os.path.exists(path):
+        return 0.0
+
+    ok = None
+    if _libc is not None:
+        ok = _wait_inotify(path, timeout)
+    if ok is None:
+        ok = _wait_polling(path, timeout)
+
+    waited = time.perf_counter() - t0
+    if not ok:
+        raise SolverWaitTimeout(path, waited)
+    return waited
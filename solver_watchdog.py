@@ -0,0 +1,133 @@
+# ============================================================
+# solver_watchdog.py
+# ------------------------------------------------------------
+# Supervisão das execuções do VSPAERO.
+#
+#   RunTimeBudget : prazo de parede derivado dos tempos recentes
+#                   (fator x mediana das últimas execuções, com piso;
+#                   prazo inicial fixo enquanto não há amostras)
+#   SolveWatchdog : roda um solve com esse prazo; se travar (timeout,
+#                   processo morto) ou falhar, tenta de novo até
+#                   max_retries vezes. Conta timeouts e retries.
+#   SolveCounts   : soma, no driver, os timeouts/retries/falhas que o FCN
+#                   devolve em cada avaliação (campos WATCHDOG_FIELDS),
+#                   inclusive das avaliações feitas nos workers
+#
+# O ParallelEvaluator (parallel_eval.py) usa o RunTimeBudget no nível
+# da geração: reinicia workers travados e lança cópias especulativas
+# da avaliação mais lenta quando o resto da geração já terminou.
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+from collections import deque
+
+import numpy as np
+
+# Campos do FCN com os eventos do watchdog durante a avaliação
+WATCHDOG_FIELDS = ("Timeouts", "Retries", "Falhas")
+
+
+class RunTimeBudget:
+    """
+    Prazo de parede para uma execução, a partir das execuções recentes.
+
+    prazo = max(min_s, factor * mediana(últimos 'window' tempos))
+    Com menos de 'min_samples' amostras usa initial_s.
+    """
+
+    def __init__(self, factor=4.0, min_s=30.0, initial_s=900.0,
+                 window=50, min_samples=3):
+        self.factor = factor
+        self.min_s = min_s
+        self.initial_s = initial_s
+        self.min_samples = min_samples
+        self.tempos = deque(maxlen=window)
+
+    def record(self, wall_time):
+        self.tempos.append(float(wall_time))
+
+    def typical(self):
+        """Mediana dos tempos recentes (None se não há amostras)."""
+        if not self.tempos:
+            return None
+        return float(np.median(self.tempos))
+
+    def budget(self):
+        if len(self.tempos) < self.min_samples:
+            return self.initial_s
+        return max(self.min_s, self.factor * self.typical())
+
+
+class SolveWatchdog:
+    """
+    Executa solves com prazo e repetição.
+
+    attempt(timeout) deve rodar o solve e devolver um objeto com
+    .ok, .timed_out, .wall_time e .check() (vspaero_runner.SolveResult).
+    """
+
+    def __init__(self, budget=None, max_retries=2, fixed_timeout=None):
+        self.budget = budget or RunTimeBudget()
+        self.max_retries = max_retries
+        self.fixed_timeout = fixed_timeout
+
+        self.n_solves = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.falhas = 0
+
+    def run(self, attempt):
+        for tentativa in range(self.max_retries + 1):
+            prazo = self.fixed_timeout or self.budget.budget()
+            res = attempt(prazo)
+            self.n_solves += 1
+
+            if res.ok:
+                self.budget.record(res.wall_time)
+                return res
+
+            if res.timed_out:
+                self.timeouts += 1
+                print(f"[watchdog] solve travado: morto após {res.wall_time:.1f} s "
+                      f"(prazo {prazo:.1f} s)")
+            else:
+                self.falhas += 1
+                print(f"[watchdog] solve falhou (código {res.returncode})")
+
+            if tentativa < self.max_retries:
+                self.retries += 1
+                print(f"[watchdog] nova tentativa {tentativa + 1}/{self.max_retries}")
+
+        return res.check()
+
+    def stats(self):
+        return {
+            "solves": self.n_solves,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "falhas": self.falhas,
+            "prazo_atual_s": self.fixed_timeout or self.budget.budget(),
+        }
+
+    def counts(self):
+        """Contadores na ordem de WATCHDOG_FIELDS (diferença → por avaliação)."""
+        return (self.timeouts, self.retries, self.falhas)
+
+
+class SolveCounts:
+    """Totais dos campos WATCHDOG_FIELDS das avaliações de um evaluator."""
+
+    def __init__(self):
+        self.avaliacoes = 0
+        self.totais = dict.fromkeys(WATCHDOG_FIELDS, 0)
+
+    def add(self, data):
+        """data: dicionário do FCN ou registro RESULT_DTYPE."""
+        self.avaliacoes += 1
+        for c in WATCHDOG_FIELDS:
+            self.totais[c] += int(data[c])
+
+    def summary(self):
+        return {"avaliacoes": self.avaliacoes,
+                **{c.lower(): n for c, n in self.totais.items()}}
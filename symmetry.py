@@ -0,0 +1,126 @@
+# ============================================================
+# symmetry.py
+# ------------------------------------------------------------
+# Solve de meia asa com simetria no plano x-z.
+#
+# A asa é simétrica e os casos da otimização são todos com Beta = 0:
+# o VSPAERO pode resolver só a semi-asa y >= 0 (Symmetry ligado) com
+# metade dos painéis. O modelo completo volta automaticamente quando o
+# caso deixa de ser simétrico:
+#
+#   - derrapagem (Beta != 0)
+#   - grupos de superfícies de controle (deflexões podem ser
+#     assimétricas, p.ex. ailerons)
+#   - velocidades de rolamento/guinada (p, r) ou cálculo de derivadas
+#     de estabilidade (VSP_StabilityType != 0), que perturbam p e r
+#
+# A meia malha sai de vspgeom_morph.half_mesh(); Sref, Cref e Bref
+# passados ao solver continuam os da asa inteira (o VSPAERO espelha a
+# semi-asa) e as integrais do .lod, que só têm as faixas de um lado,
+# usam metade da área de referência (lod_metrics(symmetric=True)).
+#
+#   motivos = symmetry_blockers(beta=BETA)      # [] → pode usar meia asa
+#   python symmetry.py                          # validação meia x completa
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import numpy as np
+
+# Valor da chave Symmetry do .vspaero com o plano de simetria x-z
+SYMMETRY_FLAG = "Y"
+
+# Projetos usados na validação: asa base e cantos do espaço do PSO
+# [AR, span, taper, sweep, twist]
+VALIDATION_DESIGNS = np.array([
+    [7.5, 36.0, 1.0, 0.0, 0.0],
+    [7.5, 36.0, 1.0, 5.0, -2.0],
+    [6.0, 34.0, 0.5, 0.0, -4.0],
+    [10.0, 38.0, 0.5, 10.0, 0.0],
+])
+
+
+def symmetry_blockers(beta=0.0, p=0.0, r=0.0, control_groups=0, stability_type=0,
+                      tol=1e-9):
+    """
+    Motivos que impedem o solve de meia asa (lista vazia → simétrico).
+    beta em graus (escalar ou lista de valores do caso); p, r em rad/s.
+    """
+    motivos = []
+    if np.any(np.abs(np.atleast_1d(np.asarray(beta, dtype=float))) > tol):
+        motivos.append("derrapagem (Beta != 0)")
+    if abs(p) > tol or abs(r) > tol:
+        motivos.append("velocidade de rolamento/guinada")
+    if int(control_groups) > 0:
+        motivos.append(f"{int(control_groups)} grupo(s) de superfícies de controle")
+    if int(stability_type) != 0:
+        motivos.append(f"derivadas de estabilidade (VSP_StabilityType={int(stability_type)})")
+    return motivos
+
+
+def case_symmetry_blockers(template, **valores):
+    """
+    symmetry_blockers() para um caso .vspaero gerado a partir de template
+    (vspaero_runner.CaseTemplate) com as chaves de valores substituídas.
+    """
+    def valor(chave, padrao):
+        v = valores.get(chave, template.get(chave))
+        if v is None:
+            return padrao
+        if isinstance(v, str):
+            return [float(t) for t in v.split(",") if t.strip()] or padrao
+        return v
+
+    def escalar(chave, padrao=0.0):
+        return float(np.atleast_1d(valor(chave, padrao))[0])
+
+    return symmetry_blockers(beta=valor("Beta", 0.0),
+                             control_groups=escalar("NumberOfControlGroups"),
+                             stability_type=escalar("VSP_StabilityType"))
+
+
+def validate_symmetry(X=VALIDATION_DESIGNS):
+    """
+    Avalia cada projeto de X com o modelo completo e com meia asa
+    (v15_cessna_opt.FCN) e compara CL, CDi e alpha no trim e o tempo de
+    solver. Retorna um array estruturado com uma linha por projeto.
+    """
+    import v15_cessna_opt as opt
+
+    campos = ("CL_full", "CL_half", "CDi_full", "CDi_half", "Alpha_full", "Alpha_half",
+              "T_full", "T_half")
+    saida = np.zeros(len(X), dtype=[(c, np.float64) for c in campos])
+
+    modo = opt.SYMMETRY_MODE
+    try:
+        for i, x in enumerate(np.atleast_2d(X)):
+            for sufixo, m in (("full", "off"), ("half", "auto")):
+                opt.SYMMETRY_MODE = m
+                _, data = opt.FCN(np.asarray(x, dtype=float))
+                saida[i]["CL_" + sufixo] = data["CL"]
+                saida[i]["CDi_" + sufixo] = data["CDi"]
+                saida[i]["Alpha_" + sufixo] = data["Alpha"]
+                saida[i]["T_" + sufixo] = data["T_solver"]
+    finally:
+        opt.SYMMETRY_MODE = modo
+    return saida
+
+
+def print_validation(res, X=VALIDATION_DESIGNS):
+    """Tabela da validação: erro relativo de CL/CDi, diferença de alpha e speedup."""
+    print("\n================ MEIA ASA x MODELO COMPLETO ================")
+    print(f"{'projeto':<34} {'dCL %':>8} {'dCDi %':>8} {'dAlpha':>8} {'speedup':>8}")
+    for x, r in zip(np.atleast_2d(X), res):
+        dcl = 100.0 * (r["CL_half"] - r["CL_full"]) / r["CL_full"]
+        dcdi = 100.0 * (r["CDi_half"] - r["CDi_full"]) / r["CDi_full"]
+        speedup = r["T_full"] / r["T_half"] if r["T_half"] > 0 else np.nan
+        nome = "[" + ", ".join(f"{v:g}" for v in x) + "]"
+        print(f"{nome:<34} {dcl:8.3f} {dcdi:8.3f} {r['Alpha_half'] - r['Alpha_full']:8.3f} "
+              f"{speedup:8.2f}")
+    speedup = res["T_full"].sum() / res["T_half"].sum() if res["T_half"].sum() > 0 else np.nan
+    err = np.max(np.abs(res["CDi_half"] - res["CDi_full"]) / np.abs(res["CDi_full"]))
+    print(f"\nspeedup total = {speedup:.2f}x | erro máx. CDi = {100.0 * err:.3f} %")
+
+
+if __name__ == "__main__":
+    print_validation(validate_symmetry())
@@ -11,6 +11,54 @@
 #       -> Máx. 4 chamadas ao VSPAERO por avaliação
 #       -> Usa aproximação de CL_alpha ≈ 0.1 / grau
 #   - Mantido o modelo de CD0 parasita com fator F_corr
+#   - Modelo base carregado uma única vez (vsp_session.py):
+#       -> Wing ID e parm IDs da XSec_1 em cache
+#       -> snapshot/restore dos seis parâmetros entre avaliações
+#   - Trim por varredura (TRIM_MODE="varredura"): 1 VSPAEROSweep com
+#     2–3 alphas e interpolação em CL_target; 2º solve só se o
+#     intervalo não contiver o alvo
+#   - Sem sleep fixo: espera do .history por notificação (solver_wait.py);
+#     sem pausa/gc.collect() ao fim: o vazamento de memória do OpenVSP é
+#     tratado reciclando os workers (parallel_eval.py, mem_usage.py)
+#   - Parada antecipada (EARLY_STOP, backend "subprocess"): o .history é
+#     lido durante o solve e o vspaero é morto quando CLtot e CDi do
+#     último caso param de mudar entre iterações de esteira; o solve
+#     interrompido não grava o .lod, então as métricas de carga dessa
+#     avaliação ficam NaN e o registro marca SemLod = 1 (sem solve extra)
+#   - FCN_batch(X): matriz (n, 5) → fobj (n,) + registros (n,) com
+#     CL, CD_total, CDi, ... (RESULT_DTYPE); usado por todos os evaluators
+#   - Cada avaliação roda numa pasta de rascunho própria em memória
+#     (scratch.py, /dev/shm), apagada no fim; só os arquivos pedidos pela
+#     RETENTION são copiados para ARTIFACTS_DIR
+#   - Métricas do .lod já gerado (sem solve extra): momento fletor na
+#     raiz, posição do pico de Cl e CDi integrado nas faixas,
+#     interpoladas no ponto de trim; a eficiência de envergadura usa o
+#     CL e o CDi de Trefftz do trim (.history), não o CDi das faixas
+#   - Backend "api": CL/CD de cada caso lidos do gerenciador de
+#     resultados do OpenVSP (ID do ExecAnalysis, vsp_results.py); o
+#     .history em disco só é lido se o gerenciador não tiver os dados
+#   - .vsp3 da avaliação gerado a partir do texto do modelo base
+#     (vsp3_template.py, só os valores da XSec_1 mudam) em vez de
+#     vsp.WriteVSPFile(); o nome dos arquivos do VSPAERO vem de
+#     vsp.SetVSP3FileName()
+#   - Malha do VSPAERO por morphing (GEOMETRY_MODE="morph",
+#     vspgeom_morph.py): os nós do cessna210.vspgeom são deformados pelo
+#     vetor x e gravados direto no <stem>.vspgeom, sem
+#     VSPAEROComputeGeometry; "validar" regenera a malha no OpenVSP e
+#     imprime a diferença nó a nó para a malha deformada
+#   - Cache das saídas de geometria (geom_cache.py): .vspgeom/.vkey/.csf
+#     guardados por hash dos parms aplicados; um projeto já tesselado
+#     (p.ex. reavaliado em outra condição de voo) vai direto ao solver
+#   - Solve de meia asa (SYMMETRY_MODE="auto", symmetry.py): malha só
+#     com y >= 0 e Symmetry ligado no VSPAERO; volta ao modelo completo
+#     com derrapagem, superfícies de controle ou derivadas de estabilidade
+#   - Níveis de fidelidade (FIDELITY_LEVELS, FCN(x, fidelity=...)): nós e
+#     iterações de esteira, tesselagem da asa e tolerância do trim por
+#     nível; "alta" é a configuração de produção. A triagem/promoção do
+#     PSO fica em multifidelity.py
+#   - Etapa de geometria separada (prepare_geometry): FCN(x, geom=...)
+#     resolve uma geometria preparada em outro processo
+#     (pipeline_eval.py)
 #
 # Autor: Gregori da Maia da Silva
 # ============================================================
@@ -18,9 +66,21 @@
 import os
 import sys
 import time
-import gc
 import numpy as np
 from openvsp import openvsp as vsp
+from vsp_session import get_session
+from solver_wait import wait_for_file
+from vspaero_runner import write_case, run_vspaero, get_template
+from history_monitor import ConvergenceMonitor
+from scratch import scratch_dir, default_scratch_root, RetentionPolicy
+from vspaero_results import history_case_last_rows, read_lod, lod_metrics
+from vsp_results import sweep_last_rows
+from vsp3_template import get_vsp3_template
+from vspgeom_morph import get_morph, compare_meshes, read_vspgeom_nodes
+from geom_cache import get_geometry_cache, remove_geometry
+from vspgeom_morph import write_half_vspgeom
+from symmetry import symmetry_blockers, case_symmetry_blockers, SYMMETRY_FLAG
+from solver_watchdog import SolveWatchdog, WATCHDOG_FIELDS
 
 # Constantes para modelo de arrasto parasita
 CD0_BASE = 0.00843       # CD0 da asa base (obtido no Parasite Drag)
@@ -30,47 +90,246 @@ AR_BASE = 7.5            # alongamento da asa base (Cessna 210 original)
 SREF_BASE = 172.707      # [ft^2] área da asa base (da simulação Parasite Drag)
 E_OSWALD = 0.8           # eficiência típica (mantida constante na correção)
 
+# Pasta do modelo base (cessna210.vsp3)
+BASE_DIR = r"C:\VSP\Development\PSO_PYTHON_WING"
+# Prefixo padrão dos arquivos gerados por avaliação
+RUN_STEM = "cessna_updated"
+
+# Pastas de rascunho por avaliação (tmpfs) e arquivos mantidos em disco:
+# .history + .lod de toda avaliação, conjunto completo quando o fobj melhora
+SCRATCH_ROOT = default_scratch_root()
+ARTIFACTS_DIR = os.path.join(BASE_DIR, "artefatos")
+RETENTION = RetentionPolicy(ARTIFACTS_DIR, always=(".history", ".lod"),
+                            on_improvement=("*",))
+
+# Escrita do .vsp3 de cada avaliação:
+#   "template" → texto do cessna210.vsp3 com os valores da XSec_1 trocados
+#   "openvsp"  → vsp.WriteVSPFile() (serializa o modelo inteiro)
+VSP3_WRITER = "template"
+
+# Malha do VSPAERO (<stem>.vspgeom) de cada avaliação:
+#   "openvsp" → VSPAEROComputeGeometry (re-tesselagem do modelo)
+#   "morph"   → nós do cessna210.vspgeom deformados pelo vetor x
+#   "validar" → VSPAEROComputeGeometry + comparação nó a nó com o morph
+GEOMETRY_MODE = "openvsp"
+
+# Cache das saídas de geometria, compartilhado pelos processos da máquina
+# (None desliga; "auto" → SCRATCH_ROOT/pso_geometria, resolvido no uso,
+# para seguir o SCRATCH_ROOT ativo); no tmpfs, os arquivos entram na
+# pasta da avaliação por hard link
+GEOMETRY_CACHE_DIR = "auto"
+GEOMETRY_CACHE_MAX = 500          # entradas mantidas (LRU)
+
+# Simetria do solve:
+#   "auto" → meia asa (y >= 0, Symmetry no VSPAERO) sempre que o caso for
+#            simétrico; modelo completo caso contrário
+#   "off"  → sempre o modelo completo
+SYMMETRY_MODE = "auto"
+
+# Configuração do solver
+NUM_WAKE_NODES = 24      # 24 → compromisso entre tempo e precisão
+NCPU = 4                 # threads do VSPAERO por solve
+
+# Backend do solver:
+#   "api"        → vsp.ExecAnalysis("VSPAEROSweep") no próprio processo
+#   "subprocess" → executável vspaero (vspaero_runner.py), caso gerado a
+#                  partir do template CASE_TEMPLATE, com timeout/kill
+SOLVER_BACKEND = "api"
+CASE_TEMPLATE = os.path.join(BASE_DIR, "cessna210.vspaero")
+SOLVER_TIMEOUT_S = None      # [s] prazo fixo; None → prazo pelo watchdog
+SOLVER_MAX_RETRIES = 2       # novas tentativas após travamento/falha
+
+# Watchdog do processo (backend "subprocess"): prazo derivado dos tempos
+# recentes, kill + nova tentativa de solves travados
+WATCHDOG = SolveWatchdog(max_retries=SOLVER_MAX_RETRIES, fixed_timeout=SOLVER_TIMEOUT_S)
+
+# Parada antecipada (só backend "subprocess"): tolerâncias absolutas de
+# CLtot e CDi entre iterações de esteira consecutivas do último caso
+EARLY_STOP = False
+EARLY_STOP_TOL_CL = 1e-4
+EARLY_STOP_TOL_CDI = 1e-5
+
+# Condições de voo (imperial)
+W_LBF = 1800.0 * 2.20462  # [lbf]
+RHO = 0.002377            # [slug/ft^3]
+T_K = 288.15              # [K]
+GAMMA = 1.4
+R_AR = 287.05             # [J/(kg K)]
+MACH = 0.30
+BETA = 0.0                # [deg] derrapagem (≠ 0 desliga a meia asa)
+
+# Auto-alpha: parâmetros aproximados do aerofólio (2D) e do loop
+CL0 = 0.50                # CL a 0° (aprox. do NACA 4415)
+CL_ALPHA = 0.10           # [1/deg] inclinação aproximada CL(α)
+MAX_ITER_ALPHA = 4
+TOL_CL = 0.01             # 1% de erro relativo
+
+# Modo de trim:
+#   "varredura" → um único VSPAEROSweep com AlphaNpts pontos em torno do
+#                 chute inicial; alpha/CDi/CL interpolados em CL_target.
+#                 Só roda uma 2ª varredura se o intervalo não contiver CL_target
+#   "iterativo" → loop original (até MAX_ITER_ALPHA solves de 1 alpha)
+TRIM_MODE = "varredura"
+ALPHA_BRACKET_NPTS = 3       # pontos por varredura (2–3)
+ALPHA_BRACKET_HALF = 2.0     # [deg] meia-largura do intervalo
+MAX_SWEEPS = 2               # varreduras máximas por avaliação
+ALPHA_LIM = 10.0             # [deg] limites de alpha
+
+# Níveis de fidelidade do FCN (do mais barato ao de produção):
+#   NumWakeNodes → nós de esteira do VSPAERO
+#   WakeIters    → iterações de esteira (None → padrão do solver/template)
+#   Tess_U       → SectTess_U da XSec_1 (None → modelo base, 22)
+#   Tess_W       → Tess_W da asa (None → modelo base, 33)
+#   TolCL        → tolerância do trim no modo "iterativo"
+# Malha por morphing só existe na tesselagem do modelo base: um nível com
+# Tess_U/Tess_W gera a malha no OpenVSP
+FIDELITY_LEVELS = {
+    "baixa": {"NumWakeNodes": 8, "WakeIters": 2, "Tess_U": 10, "Tess_W": 17, "TolCL": 0.03},
+    "alta": {"NumWakeNodes": NUM_WAKE_NODES, "WakeIters": None, "Tess_U": None,
+             "Tess_W": None, "TolCL": TOL_CL},
+}
+FIDELITY_ORDER = ("baixa", "alta")
+HIGH_FIDELITY = "alta"
+
+# Fonte dos resultados no backend "api":
+#   True  → gerenciador de resultados do OpenVSP (sem esperar o .history)
+#   False → .history em disco (como até o v15)
+RESULTS_API = True
+
+# Espera pelo .history
+HISTORY_TIMEOUT_S = 3.0      # [s] prazo após o retorno do ExecAnalysis
+
+# Penalidade de sustentação (faixa ±2,5% em torno do peso)
+L_FAIXA = 0.025
+PENALTY_GAIN = 1000.0
+
+# fobj de uma avaliação que não terminou (travou ou falhou em todas as
+# tentativas): a partícula segue no enxame, mas nunca vira a melhor
+PENALTY = 1.0e6
+
+
+# Campos do registro devolvido por FCN_batch
+RESULT_FIELDS = ("CL", "CD_total", "CDi", "CD0_parasita", "LD",
+                 "Alpha", "L", "Sref", "Fcorr",
+                 "RBM", "E_span", "Eta_ClMax", "CDi_lod", "SemLod", "Fidelity") + WATCHDOG_FIELDS
+RESULT_DTYPE = np.dtype([(c, np.float64) for c in RESULT_FIELDS])
+
+
+def fidelity_settings(fidelity=HIGH_FIDELITY):
+    """Ajustes do nível de fidelidade (nome em FIDELITY_LEVELS)."""
+    if fidelity not in FIDELITY_LEVELS:
+        raise ValueError(f"nível de fidelidade desconhecido: {fidelity!r} "
+                         f"(disponíveis: {', '.join(FIDELITY_LEVELS)})")
+    return FIDELITY_LEVELS[fidelity]
+
+
+def geometry_cache_dir():
+    """Pasta do cache de geometria (None = desligado)."""
+    if GEOMETRY_CACHE_DIR == "auto":
+        return os.path.join(SCRATCH_ROOT, "pso_geometria")
+    return GEOMETRY_CACHE_DIR
+
+
+def config_signature(fidelity=HIGH_FIDELITY):
+    """
+    Tudo o que, além do vetor x, altera o resultado do FCN:
+    condição de voo, ajustes do solver e constantes do objetivo.
+    Usado para invalidar caches quando alguma constante muda; cada
+    nível de fidelidade tem a sua assinatura.
+    """
+    return {
+        "FIDELITY": fidelity, "FIDELITY_SETTINGS": fidelity_settings(fidelity),
+        "vsp3": "cessna210.vsp3",
+        "W_LBF": W_LBF, "RHO": RHO, "T_K": T_K, "GAMMA": GAMMA,
+        "R_AR": R_AR, "MACH": MACH, "BETA": BETA,
+        "NUM_WAKE_NODES": NUM_WAKE_NODES, "SOLVER_BACKEND": SOLVER_BACKEND,
+        "SYMMETRY_MODE": SYMMETRY_MODE,
+        "GEOMETRY_MODE": "morph" if GEOMETRY_MODE == "morph" else "openvsp",
+        "EARLY_STOP": EARLY_STOP and SOLVER_BACKEND == "subprocess",
+        "EARLY_STOP_TOL_CL": EARLY_STOP_TOL_CL, "EARLY_STOP_TOL_CDI": EARLY_STOP_TOL_CDI,
+        "CL0": CL0, "CL_ALPHA": CL_ALPHA,
+        "MAX_ITER_ALPHA": MAX_ITER_ALPHA, "TOL_CL": TOL_CL,
+        "TRIM_MODE": TRIM_MODE, "ALPHA_BRACKET_NPTS": ALPHA_BRACKET_NPTS,
+        "ALPHA_BRACKET_HALF": ALPHA_BRACKET_HALF, "MAX_SWEEPS": MAX_SWEEPS,
+        "CD0_BASE": CD0_BASE, "SWEEP_BASE_DEG": SWEEP_BASE_DEG,
+        "AR_BASE": AR_BASE, "SREF_BASE": SREF_BASE, "E_OSWALD": E_OSWALD,
+        "L_FAIXA": L_FAIXA, "PENALTY_GAIN": PENALTY_GAIN,
+        "RESULT_FIELDS": list(RESULT_FIELDS),
+    }
 
-def FCN(x: np.ndarray):
+
+def _lod_case_metrics(lod_path, n_cases, sref, bref, symmetric=False):
     """
-    Função objetivo para o PSO. Recebe um vetor de variáveis geométricas,
-    aplica no modelo OpenVSP, executa VSPAERO e retorna o desempenho aerodinâmico.
+    Métricas do .lod para cada caso da varredura (dicionário de arrays).
+    None se o .lod não existir (p.ex. solve interrompido pela parada
+    antecipada) ou não tiver um bloco por caso.
+    """
+    if not os.path.exists(lod_path):
+        return None
+    casos = read_lod(lod_path)
+    if len(casos) != n_cases:
+        return None
+    metricas = [lod_metrics(c, sref, bref, symmetric) for c in casos]
+    return {k: np.array([m[k] for m in metricas]) for k in metricas[0]}
+
+
+def _pick_loads(cargas, cls, CL_target=None, j=-1):
+    """Métricas do .lod no trim: interpoladas em CL_target ou do caso j."""
+    if cargas is None:
+        return {k: np.nan for k in ("CL_lod", "CDi_lod", "E_span_lod", "CRBM",
+                                    "Y_ClMax", "Eta_ClMax")}
+    if CL_target is None:
+        return {k: float(v[j]) for k, v in cargas.items()}
+    ordem = np.argsort(cls)
+    return {k: float(np.interp(CL_target, cls[ordem], v[ordem])) for k, v in cargas.items()}
+
+
+def _interp_trim(alphas, cls, cdos, cdis, cdtots, CL_target):
+    """
+    Interpola o ponto de trim (CL = CL_target) a partir de uma varredura.
+    alpha e CDo/CDtot: linear entre os dois casos que cercam CL_target.
+    CDi: ajuste quadrático em CL (CDi ~ k CL²) quando há 3+ pontos.
+    """
+    ordem = np.argsort(cls)
+    cls = cls[ordem]
 
-    CDtotal usado no L/D:
-        CD = CDi_vspaero + CD0_parasita
+    alpha = float(np.interp(CL_target, cls, alphas[ordem]))
+    cdo = float(np.interp(CL_target, cls, cdos[ordem]))
+    cdtot = float(np.interp(CL_target, cls, cdtots[ordem]))
+
+    if len(cls) >= 3:
+        coef = np.polyfit(cls, cdis[ordem], 2)
+        cdi = float(np.polyval(coef, CL_target))
+    else:
+        cdi = float(np.interp(CL_target, cls, cdis[ordem]))
+
+    return alpha, CL_target, cdo, cdi, cdtot
+
+
+def prepare_geometry(x, run_dir, stem=RUN_STEM, fidelity=HIGH_FIDELITY):
     """
+    Etapa de geometria do FCN: aplica x no modelo, grava <stem>.vsp3 e
+    gera (ou liga do cache) <stem>.vspgeom/.vkey/.csf em run_dir.
 
-    # ------------------------------------------------------------
-    # Limpa arquivos antigos gerados por simulações anteriores
-    # ------------------------------------------------------------
-    base_dir = r"C:\VSP\Development\PSO_PYTHON_WING"
-    for f in os.listdir(base_dir):
-        if f.startswith("cessna_updated.") or f.startswith("temp_polar."):
-            try:
-                os.remove(os.path.join(base_dir, f))
-            except PermissionError:
-                pass
+    Retorna o dicionário que FCN(..., geom=...) usa para resolver o caso
+    em outro processo (pipeline_eval.py): cordas, Sref/Bref do modelo
+    com x aplicado, meia asa, tempo e origem da malha.
+    """
+    base_dir = BASE_DIR
+    fid = fidelity_settings(fidelity)
+    t_prep = time.perf_counter()
 
     # ============================================================
-    # 1) CARREGAMENTO DO MODELO BASE
+    # 1) SESSÃO DO MODELO BASE (carregada uma vez por processo)
     # ============================================================
     VSP3_FILE = os.path.join(base_dir, "cessna210.vsp3")
+    VSPGEOM_FILE = os.path.join(base_dir, "cessna210.vspgeom")
 
-    vsp.ClearVSPModel()
-    vsp.ReadVSPFile(VSP3_FILE)
-
-    # Busca a asa principal automaticamente
-    geom_ids = vsp.FindGeoms()
-    wing_id = None
-    for gid in geom_ids:
-        if vsp.GetGeomTypeName(gid) == "Wing":
-            wing_id = gid
-            break
-
-    if wing_id is None:
-        raise RuntimeError("ERRO: Nenhuma asa encontrada no modelo!")
-
-    print(f"Wing ID encontrado: {wing_id}")
+    # A sessão lê o cessna210.vsp3 só na primeira chamada e mantém em
+    # cache o Wing ID e os parm IDs da XSec_1
+    sessao = get_session(VSP3_FILE)
+    sessao.restore(update=False)
+    sessao.set_tessellation(fid["Tess_U"], fid["Tess_W"])
 
     # Nome interno do solver usado pelo OpenVSP
     solver_id = "VSPAEROSweep"
@@ -81,20 +340,9 @@ def FCN(x: np.ndarray):
     # Entradas do PSO: AR, envergadura, taper ratio, sweep, twist
     AR, span, taper, sweep, twist = x
 
-    # Calcula cordas coerentes com AR e taper
-    # Croot e Ctip em pés
-    croot = 2 * span / (AR * (1.0 + taper))
-    ctip  = taper * croot
-
-    # OpenVSP usa semi-envergadura
-    vsp.SetParmVal(wing_id, "Span",       "XSec_1", span / 2.0)
-    vsp.SetParmVal(wing_id, "Root_Chord", "XSec_1", croot)
-    vsp.SetParmVal(wing_id, "Tip_Chord",  "XSec_1", ctip)
-    vsp.SetParmVal(wing_id, "Taper",      "XSec_1", taper)
-    vsp.SetParmVal(wing_id, "Sweep",      "XSec_1", sweep)
-    vsp.SetParmVal(wing_id, "Twist",      "XSec_1", twist)
-
-    vsp.Update()
+    # Calcula cordas coerentes com AR e taper (Croot e Ctip em pés)
+    # e aplica na XSec_1 pelos handles em cache (OpenVSP usa semi-envergadura)
+    croot, ctip = sessao.apply(x)
 
     print(f"[geo] AR={AR:.2f}, Span={span:.2f}, Taper={taper:.2f}, Sweep={sweep:.2f}, Twist={twist:.2f}")
     print(f"[geo] Croot={croot:.3f}, Ctip={ctip:.3f}")
@@ -102,24 +350,146 @@ def FCN(x: np.ndarray):
     # ============================================================
     # 3) GERA MALHA + EXECUTA GEOMETRIA DE VSPAERO
     # ============================================================
-    # Salva temporariamente um vsp3 com a geometria atualizada
-    updated_vsp3 = os.path.join(base_dir, "cessna_updated.vsp3")
-    vsp.Update()
-    vsp.WriteVSPFile(updated_vsp3)
+    # Salva temporariamente um vsp3 com a geometria atualizada; o nome
+    # do arquivo define o prefixo das saídas do VSPAERO
+    updated_vsp3 = os.path.join(run_dir, stem + ".vsp3")
+    if VSP3_WRITER == "template":
+        get_vsp3_template(VSP3_FILE).write(updated_vsp3, x)
+        vsp.SetVSP3FileName(updated_vsp3)
+    else:
+        vsp.WriteVSPFile(updated_vsp3)
+
+    # Meia asa só se o caso for simétrico (e o backend aceitar Symmetry)
+    meia = False
+    if SYMMETRY_MODE == "auto":
+        if SOLVER_BACKEND == "subprocess":
+            motivos = case_symmetry_blockers(get_template(CASE_TEMPLATE), Beta=BETA)
+        else:
+            motivos = symmetry_blockers(beta=BETA)
+            if "Symmetry" not in sessao.analysis_inputs(solver_id):
+                motivos.append("VSPAEROSweep sem a entrada Symmetry")
+        meia = not motivos
+        if motivos:
+            print(f"[simetria] modelo completo: {'; '.join(motivos)}")
+
+    # Tesselagem fora da base: a malha vem do OpenVSP (o morph só deforma
+    # a malha do cessna210.vspgeom)
+    tess = [fid[n] for n in ("Tess_U", "Tess_W")]
+    modo_geom = GEOMETRY_MODE
+    if any(t is not None for t in tess):
+        modo_geom = "openvsp"
+
+    vspgeom_path = os.path.join(run_dir, stem + ".vspgeom")
+    t_geom = time.perf_counter()
+    cache_geom = None
+    pasta_cache = geometry_cache_dir()
+    if pasta_cache is not None and modo_geom != "validar":
+        cache_geom = get_geometry_cache(
+            pasta_cache, max_entries=GEOMETRY_CACHE_MAX,
+            sources=[p for p in (VSP3_FILE, VSPGEOM_FILE) if os.path.exists(p)])
+        variante = modo_geom + ("_meia" if meia else "")
+        if modo_geom != GEOMETRY_MODE:
+            variante += "_tess" + "x".join("base" if t is None else str(int(t)) for t in tess)
+        chave_geom = cache_geom.key(x, variante)
+
+    if cache_geom is not None and cache_geom.link(chave_geom, run_dir, stem):
+        geom_origem = "cache"
+    else:
+        remove_geometry(run_dir, stem)
+        if modo_geom == "morph":
+            # Malha base deformada: .vspgeom/.vkey/.csf gravados direto
+            get_morph(VSPGEOM_FILE, VSP3_FILE).write_geometry(run_dir, stem, x, half=meia)
+        else:
+            # Degenerate Geometry (necessária para o VSPAERO)
+            vsp.SetAnalysisInputDefaults("VSPAEROComputeGeometry")
+            vsp.SetIntAnalysisInput("VSPAEROComputeGeometry", "GeomSet", [vsp.SET_ALL])
+            vsp.ExecAnalysis("VSPAEROComputeGeometry")
+
+            if modo_geom == "validar":
+                dif = compare_meshes(get_morph(VSPGEOM_FILE, VSP3_FILE).nodes(x),
+                                     read_vspgeom_nodes(vspgeom_path))
+                print(f"[morph] malha deformada x regenerada ({dif['n']} nós): "
+                      f"máx={dif['max']:.2e} (nó {dif['no_max']}), rms={dif['rms']:.2e}")
+            if meia:
+                write_half_vspgeom(vspgeom_path, vspgeom_path)
+        geom_origem = modo_geom
+        if cache_geom is not None and os.path.exists(vspgeom_path):
+            cache_geom.store(chave_geom, run_dir, stem)
+    t_geom = time.perf_counter() - t_geom
+
+    return {
+        "vsp3": updated_vsp3,
+        "croot": croot,
+        "ctip": ctip,
+        "sref": sessao.wing_area(),     # [ft²]
+        "bref": sessao.wing_span(),     # [ft]
+        "meia": meia,
+        "t_geom": t_geom,
+        "t_prep": time.perf_counter() - t_prep,
+        "origem": geom_origem,
+    }
 
-    # Degenerate Geometry (necessária para o VSPAERO)
-    vsp.SetAnalysisInputDefaults("VSPAEROComputeGeometry")
-    vsp.SetIntAnalysisInput("VSPAEROComputeGeometry", "GeomSet", [vsp.SET_ALL])
-    vsp.ExecAnalysis("VSPAEROComputeGeometry")
+
+def FCN(x: np.ndarray, run_dir=None, stem=RUN_STEM, fidelity=HIGH_FIDELITY, geom=None):
+    """
+    Função objetivo para o PSO. Recebe um vetor de variáveis geométricas,
+    aplica no modelo OpenVSP, executa VSPAERO e retorna o desempenho aerodinâmico.
+
+    CDtotal usado no L/D:
+        CD = CDi_vspaero + CD0_parasita
+
+    stem define o prefixo dos arquivos da simulação. Sem run_dir, a
+    avaliação roda numa pasta de rascunho nova em SCRATCH_ROOT, apagada
+    ao fim depois da RETENTION copiar os arquivos mantidos. Com run_dir,
+    os arquivos ficam nessa pasta.
+
+    fidelity escolhe o nível de FIDELITY_LEVELS (nós/iterações de
+    esteira, tesselagem e tolerância do trim); o resultado leva o nível
+    em data["Fidelity"] (posição em FIDELITY_ORDER; -1 para um nível
+    fora dela, p.ex. o do fidelity_benchmark.py).
+
+    geom, se dado, é o retorno de prepare_geometry(x, run_dir, stem) já
+    executado (p.ex. por outro processo, pipeline_eval.py): o FCN só
+    aplica x no modelo e vai direto ao solver, que lê a malha de
+    <stem>.vspgeom.
+    """
+
+    if run_dir is None:
+        if geom is not None:
+            raise ValueError("FCN(geom=...) exige o run_dir onde a geometria foi preparada")
+        with scratch_dir(SCRATCH_ROOT, prefix=stem) as pasta:
+            fobj, data = FCN(x, run_dir=pasta, stem=stem, fidelity=fidelity)
+            if RETENTION is not None:
+                RETENTION.retain(pasta, stem, fobj)
+        return fobj, data
+
+    t_inicio = time.perf_counter()
+    watchdog0 = WATCHDOG.counts()
+
+    fid = fidelity_settings(fidelity)
+    sessao = get_session(os.path.join(BASE_DIR, "cessna210.vsp3"))
+
+    # Nome interno do solver usado pelo OpenVSP
+    solver_id = "VSPAEROSweep"
+    AR, span, taper, sweep, twist = x
+
+    if geom is None:
+        geom = prepare_geometry(x, run_dir, stem, fidelity)
+    else:
+        # Geometria preparada em outro processo: o modelo deste processo
+        # recebe x (referências coerentes no VSPAEROSweep), mas a malha
+        # já está em <stem>.vspgeom, sem VSPAEROComputeGeometry
+        sessao.restore(update=False)
+        sessao.set_tessellation(fid["Tess_U"], fid["Tess_W"])
+        sessao.apply(x)
+        vsp.SetVSP3FileName(geom["vsp3"])
+    croot = geom["croot"]
+    meia = geom["meia"]
 
     # 3.2) Configuração do Solver Aerodinâmico
     vsp.SetAnalysisInputDefaults(solver_id)
 
-    available_inputs = []
-    try:
-        available_inputs = vsp.GetAnalysisInputNames(solver_id)
-    except Exception:
-        pass
+    available_inputs = sessao.analysis_inputs(solver_id)
 
     if "PolarFileName" in available_inputs:
         vsp.SetStringAnalysisInput(solver_id, "PolarFileName", [""])
@@ -132,19 +502,19 @@ def FCN(x: np.ndarray):
     # 4) CONDIÇÕES DE VOO
     # ============================================================
 
-    sref = vsp.GetParmVal(wing_id, "TotalArea", "WingGeom")   # [ft²]
-    bref = vsp.GetParmVal(wing_id, "TotalSpan", "WingGeom")   # [ft]
+    sref = geom["sref"]         # [ft²] (modelo com x aplicado)
+    bref = geom["bref"]         # [ft]
 
-    # corda média geométrica aproximada (não usada diretamente, mas informativa)
+    # corda média geométrica aproximada (Cref do backend "subprocess")
     cref = (2.0 / 3.0) * croot * ((1.0 + taper + taper**2) / (1.0 + taper))
 
-    # Condições de voo (imperial)
-    W = 1800.0 * 2.20462      # [lbf]
-    rho = 0.002377            # [slug/ft^3]
-    T = 288.15
-    gamma = 1.4
-    R = 287.05
-    M = 0.30
+    # Condições de voo (imperial) — constantes do módulo
+    W = W_LBF                 # [lbf]
+    rho = RHO                 # [slug/ft^3]
+    T = T_K
+    gamma = GAMMA
+    R = R_AR
+    M = MACH
 
     a_SI = (gamma * R * T) ** 0.5   # [m/s]
     V_SI = M * a_SI                 # [m/s]
@@ -152,7 +522,8 @@ def FCN(x: np.ndarray):
     Sref = sref                     # [ft^2]
     q = 0.5 * rho * V_ft**2         # pressão dinâmica [lbf/ft² em unidades consistentes]
 
-    hist_path = os.path.join(base_dir, "cessna_updated.history")
+    hist_path = os.path.join(run_dir, stem + ".history")
+    lod_path = os.path.join(run_dir, stem + ".lod")
 
     print(f"[flight] Mach={M:.2f}  →  V={V_SI:.2f} m/s ({V_ft:.1f} ft/s)")
 
@@ -180,54 +551,106 @@ def FCN(x: np.ndarray):
     cd0_parasita = CD0_BASE * F_corr
 
     # ============================================================
-    # 6) FUNÇÃO PARA RODAR UMA ÚNICA SIMULAÇÃO VSPAERO
+    # 6) FUNÇÕES PARA RODAR O VSPAERO (1 alpha ou varredura de alpha)
     # ============================================================
-    def run_vspaero_case(alpha_deg: float):
-        """Roda o VSPAERO para um dado alpha (graus) e retorna CL, CDo, CDi, CDtot."""
-        # Remove history antigo, se existir
-        if os.path.exists(hist_path):
-            try:
-                os.remove(hist_path)
-            except PermissionError:
-                pass
+    def run_vspaero_sweep(alpha_start: float, alpha_end: float, npts: int):
+        """
+        Roda UM VSPAEROSweep com npts alphas entre alpha_start e alpha_end.
+        Retorna arrays (um valor por caso): alpha, CL, CDo, CDi, CDtot.
+        """
+        # Remove history/lod antigos, se existirem
+        for antigo in (hist_path, lod_path):
+            if os.path.exists(antigo):
+                try:
+                    os.remove(antigo)
+                except PermissionError:
+                    pass
+
+        if SOLVER_BACKEND == "subprocess":
+            # Gera <stem>.vspaero a partir do template e roda o executável
+            write_case(CASE_TEMPLATE, run_dir, stem,
+                       Sref=Sref, Cref=cref, Bref=bref, Mach=M,
+                       AoA=np.linspace(alpha_start, alpha_end, npts),
+                       Vinf=V_ft, Rho=rho, NumWakeNodes=fid["NumWakeNodes"], Beta=BETA,
+                       **({"Symmetry": SYMMETRY_FLAG} if meia else {}),
+                       **({"WakeIters": fid["WakeIters"]} if fid["WakeIters"] else {}))
+            monitores = []
+
+            def tentativa(prazo):
+                # Monitor novo a cada tentativa (o .history recomeça do zero)
+                monitor = None
+                if EARLY_STOP:
+                    monitor = ConvergenceMonitor(
+                        hist_path, npts, EARLY_STOP_TOL_CL, EARLY_STOP_TOL_CDI,
+                        wake_iters=int(fid["WakeIters"] or
+                                       get_template(CASE_TEMPLATE).get("WakeIters")))
+                    monitores.append(monitor)
+                return run_vspaero(stem, run_dir, NCPU, timeout=prazo, monitor=monitor)
+
+            res = WATCHDOG.run(tentativa)
+            t_solver[0] += res.wall_time
+            n_solves[0] += 1
+            parou_cedo[0] = res.stopped_early
+            if res.stopped_early:
+                iters_salvas[0] += monitores[-1].iters_saved
+
+            rows = history_case_last_rows(hist_path)
+            cargas[0] = _lod_case_metrics(lod_path, len(rows), Sref, bref, meia)
+            return rows["AoA"], rows["CLtot"], rows["CDo"], rows["CDi"], rows["CDtot"]
 
         # Configura entradas do solver
-        vsp.SetIntAnalysisInput(solver_id, "NumWakeNodes", [24])   # 24 → compromisso entre tempo e precisão
-        vsp.SetIntAnalysisInput(solver_id, "NCPU", [4])
+        vsp.SetIntAnalysisInput(solver_id, "NumWakeNodes", [fid["NumWakeNodes"]])
+        if fid["WakeIters"] and "WakeNumIter" in available_inputs:
+            vsp.SetIntAnalysisInput(solver_id, "WakeNumIter", [fid["WakeIters"]])
+        vsp.SetIntAnalysisInput(solver_id, "NCPU", [NCPU])
         vsp.SetDoubleAnalysisInput(solver_id, "Sref", [Sref])
         vsp.SetDoubleAnalysisInput(solver_id, "Rho",  [rho])
         vsp.SetDoubleAnalysisInput(solver_id, "Vinf", [V_ft])
         vsp.SetDoubleAnalysisInput(solver_id, "MachStart", [M])
         vsp.SetDoubleAnalysisInput(solver_id, "MachEnd",   [M])
         vsp.SetIntAnalysisInput(solver_id, "MachNpts",  [1])
-        vsp.SetDoubleAnalysisInput(solver_id, "AlphaStart", [alpha_deg])
-        vsp.SetDoubleAnalysisInput(solver_id, "AlphaEnd",   [alpha_deg])
-        vsp.SetIntAnalysisInput(solver_id, "AlphaNpts", [1])
+        vsp.SetDoubleAnalysisInput(solver_id, "AlphaStart", [alpha_start])
+        vsp.SetDoubleAnalysisInput(solver_id, "AlphaEnd",   [alpha_end])
+        vsp.SetIntAnalysisInput(solver_id, "AlphaNpts", [npts])
         vsp.SetIntAnalysisInput(solver_id, "GeomSet", [vsp.SET_ALL])
+        if "BetaStart" in available_inputs:
+            vsp.SetDoubleAnalysisInput(solver_id, "BetaStart", [BETA])
+            vsp.SetDoubleAnalysisInput(solver_id, "BetaEnd",   [BETA])
+            vsp.SetIntAnalysisInput(solver_id, "BetaNpts",  [1])
+        if meia:
+            vsp.SetIntAnalysisInput(solver_id, "Symmetry", [1])
+
+        t0 = time.perf_counter()
+        res_id = vsp.ExecAnalysis(solver_id)
+        t_solver[0] += time.perf_counter() - t0
+        n_solves[0] += 1
+
+        # Resultados em memória pelo ID do ExecAnalysis; o .history só é
+        # lido se o gerenciador não tiver os npts casos
+        rows = sweep_last_rows(res_id) if RESULTS_API else None
+        if rows is not None and len(rows) == npts:
+            n_api[0] += 1
+        else:
+            # O retorno do ExecAnalysis sinaliza o fim do solver; se o history
+            # ainda não estiver fechado, espera por notificação (inotify)
+            t_wait[0] += wait_for_file(hist_path, HISTORY_TIMEOUT_S)
+            rows = history_case_last_rows(hist_path)
+        cargas[0] = _lod_case_metrics(lod_path, len(rows), Sref, bref, meia)
+
+        return rows["AoA"], rows["CLtot"], rows["CDo"], rows["CDi"], rows["CDtot"]
 
-        vsp.ExecAnalysis(solver_id)
-
-        # Espera o history ser criado (deve ser rápido após ExecAnalysis)
-        for _ in range(30):
-            if os.path.exists(hist_path):
-                break
-            time.sleep(0.1)
-
-        if not os.path.exists(hist_path):
-            raise RuntimeError("History file não encontrado após ExecAnalysis!")
-
-        with open(hist_path, "r") as f:
-            lines = [l.strip() for l in f.readlines()
-                     if l.strip() and not l.startswith("#")]
-
-        last_line = lines[-1].split()
-
-        cl = float(last_line[6])
-        cdo_vsp = float(last_line[7])
-        cdi = float(last_line[8])
-        cd_vsp_tot = float(last_line[9])
+    def run_vspaero_case(alpha_deg: float):
+        """Roda o VSPAERO para um dado alpha (graus) e retorna CL, CDo, CDi, CDtot."""
+        _, cls, cdos, cdis, cdtots = run_vspaero_sweep(alpha_deg, alpha_deg, 1)
+        return cls[-1], cdos[-1], cdis[-1], cdtots[-1]
 
-        return cl, cdo_vsp, cdi, cd_vsp_tot
+    n_solves = [0]
+    t_solver = [0.0]
+    t_wait = [0.0]
+    n_api = [0]              # solves lidos do gerenciador de resultados
+    iters_salvas = [0]
+    parou_cedo = [False]     # último solve morto pela parada antecipada
+    cargas = [None]          # métricas do .lod da última varredura
 
     # ============================================================
     # 7) AUTO-ALPHA OTIMIZADO (com Cl0 e dCl/dAlpha)
@@ -237,8 +660,7 @@ def FCN(x: np.ndarray):
     CL_target = W / (q * Sref)
 
     # Parâmetros aerodinâmicos aproximados do aerofólio (2D)
-    CL0 = 0.50           # CL a 0° (aprox. do NACA 4415)
-    CL_alpha = 0.10      # [1/deg] inclinação aproximada CL(α)
+    CL_alpha = CL_ALPHA  # [1/deg] inclinação aproximada CL(α)
 
     # ================================
     # 1) CHUTE INICIAL MELHORADO
@@ -246,49 +668,103 @@ def FCN(x: np.ndarray):
     # Estimativa inicial usando aerofólio fino:
     # CL = CL0 + CL_alpha * alpha
     alpha = (CL_target - CL0) / CL_alpha
-    alpha = np.clip(alpha, -10.0, 10.0)
+    alpha = np.clip(alpha, -ALPHA_LIM, ALPHA_LIM)
 
     print(f"[auto-alpha] Alpha inicial estimado = {alpha:.3f}°")
 
-    # Parâmetros do loop de refinamento
-    max_iter_alpha = 4
-    tol_CL = 0.01         # 1% de erro relativo
-
     cl = 0.0
     cdo_vsp = 0.0
     cdi = 0.0
     cd_vsp_tot = 0.0
     L = 0.0
 
-    # ================================
-    # 2) LOOP DE AJUSTE FINO DO ALPHA
-    # ================================
-    for it in range(max_iter_alpha):
+    if TRIM_MODE == "varredura":
+        # ================================
+        # 2) TRIM POR VARREDURA DE ALPHA
+        # ================================
+        # Um único solve com AlphaNpts pontos em torno do chute inicial.
+        # Se CL_target ficar fora do intervalo, a inclinação medida na
+        # própria varredura recentra o intervalo para um 2º solve.
+        centro = alpha
+        for it in range(MAX_SWEEPS):
+            a0 = float(np.clip(centro - ALPHA_BRACKET_HALF, -ALPHA_LIM, ALPHA_LIM))
+            a1 = float(np.clip(centro + ALPHA_BRACKET_HALF, -ALPHA_LIM, ALPHA_LIM))
+
+            alphas, cls, cdos, cdis, cdtots = run_vspaero_sweep(a0, a1, ALPHA_BRACKET_NPTS)
+
+            print(f"[auto-alpha] varredura {it+1}: alpha=[{a0:.2f}, {a1:.2f}]°, "
+                  f"CL=[{cls.min():.4f}, {cls.max():.4f}], CL_target={CL_target:.4f}")
+
+            if cls.min() <= CL_target <= cls.max():
+                alpha, cl, cdo_vsp, cdi, cd_vsp_tot = _interp_trim(
+                    alphas, cls, cdos, cdis, cdtots, CL_target)
+                carga = _pick_loads(cargas[0], cls, CL_target)
+                print(f"[auto-alpha] CL_target dentro do intervalo → alpha interpolado")
+                break
 
-        # Executa o VSPAERO com o alpha atual
-        cl, cdo_vsp, cdi, cd_vsp_tot = run_vspaero_case(alpha)
+            # Intervalo não contém CL_target: recentra pela inclinação medida
+            slope, cl_0 = np.polyfit(alphas, cls, 1)
+            if slope <= 0.0:
+                slope = CL_alpha
+                cl_0 = cls[0] - slope * alphas[0]
+            centro = float(np.clip((CL_target - cl_0) / slope, -ALPHA_LIM, ALPHA_LIM))
+        else:
+            # Sem intervalo válido: usa o caso resolvido mais próximo do alvo
+            # (valores reais do solver; a penalidade de L cuida do resto)
+            j = int(np.argmin(np.abs(cls - CL_target)))
+            alpha, cl, cdo_vsp, cdi, cd_vsp_tot = (
+                float(alphas[j]), float(cls[j]), float(cdos[j]),
+                float(cdis[j]), float(cdtots[j]))
+            carga = _pick_loads(cargas[0], cls, j=j)
+            print(f"[auto-alpha] CL_target fora das {MAX_SWEEPS} varreduras → caso mais próximo")
 
-        # Sustentação atual
         L = q * Sref * cl
 
-        # Erro relativo
-        error_CL = (cl - CL_target) / CL_target
+    else:
+        # Parâmetros do loop de refinamento
+        max_iter_alpha = MAX_ITER_ALPHA
+        tol_CL = fid["TolCL"]  # erro relativo
 
-        print(f"[auto-alpha] it={it+1}, alpha={alpha:.3f}°, CL={cl:.5f}, erro_CL={error_CL*100:.2f}%")
+        # ================================
+        # 2) LOOP DE AJUSTE FINO DO ALPHA
+        # ================================
+        for it in range(max_iter_alpha):
 
-        # Verifica convergência
-        if abs(error_CL) < tol_CL:
-            print(f"[auto-alpha] Convergência atingida (|erro| < {tol_CL*100:.1f}%) na it={it+1}")
-            break
+            # Executa o VSPAERO com o alpha atual
+            cl, cdo_vsp, cdi, cd_vsp_tot = run_vspaero_case(alpha)
 
-        # Ajuste de alpha usando aproximação linear
-        delta_CL = CL_target - cl
-        delta_alpha = delta_CL / CL_alpha   # graus
+            # Sustentação atual
+            L = q * Sref * cl
 
-        alpha += delta_alpha
-        alpha = np.clip(alpha, -10.0, 10.0)
+            # Erro relativo
+            error_CL = (cl - CL_target) / CL_target
 
-    print(f"[auto-alpha] Alpha final = {alpha:.3f}°, Sustentação = {L:.2f} lbf")
+            print(f"[auto-alpha] it={it+1}, alpha={alpha:.3f}°, CL={cl:.5f}, erro_CL={error_CL*100:.2f}%")
+
+            # Verifica convergência
+            if abs(error_CL) < tol_CL:
+                print(f"[auto-alpha] Convergência atingida (|erro| < {tol_CL*100:.1f}%) na it={it+1}")
+                break
+
+            # Ajuste de alpha usando aproximação linear
+            delta_CL = CL_target - cl
+            delta_alpha = delta_CL / CL_alpha   # graus
+
+            alpha += delta_alpha
+            alpha = np.clip(alpha, -ALPHA_LIM, ALPHA_LIM)
+
+        # Carregamento do último solve (1 caso)
+        carga = _pick_loads(cargas[0], None)
+
+    print(f"[auto-alpha] Alpha final = {alpha:.3f}°, Sustentação = {L:.2f} lbf "
+          f"({n_solves[0]} solves)")
+
+    # O solve interrompido pela parada antecipada não grava o .lod: as
+    # métricas de carga (RBM, Eta_ClMax, ...) ficam NaN e SemLod marca a
+    # avaliação (refazer o solve custaria mais do que a parada economiza)
+    sem_lod = cargas[0] is None
+    if sem_lod and parou_cedo[0]:
+        print("[early-stop] .lod não gravado pelo solve interrompido: métricas de carga NaN")
 
 
     # ============================================================
@@ -302,15 +778,24 @@ def FCN(x: np.ndarray):
     print(f"[coeffs] CL={cl:.5f}, CDi={cdi:.5f}, CD0_parasita={cd0_parasita:.5f}, CD_total={cd_total:.5f}, L/D={ld:.2f}")
     print(f"[raw_vspaero] CDo_vsp={cdo_vsp:.5f}, CDtot_vsp={cd_vsp_tot:.5f}")
 
+    # Métricas do .lod (já gerado pelo solve): momento fletor na raiz
+    # dimensional [lbf·ft] e comparação do CDi das faixas com o de Trefftz.
+    # Eficiência de envergadura com o CL e o CDi de Trefftz do trim
+    e_span = cl ** 2 / (np.pi * (bref ** 2 / Sref) * cdi) if cdi > 0.0 else np.nan
+    rbm = q * carga["CRBM"] * Sref * bref
+    print(f"[lod] RBM={rbm:.1f} lbf·ft, e={e_span:.3f} (faixas: {carga['E_span_lod']:.3f}), "
+          f"pico de Cl em eta={carga['Eta_ClMax']:.3f}, "
+          f"CDi_lod/CDi={(carga['CDi_lod'] / cdi if cdi > 0.0 else np.nan):.3f}")
+
     # Sustentação final
     L = q * Sref * cl
 
     # Faixa de sustentação (±2,5%)
-    L_min = W * 0.975
-    L_max = W * 1.025
+    L_min = W * (1.0 - L_FAIXA)
+    L_max = W * (1.0 + L_FAIXA)
 
     if L < L_min or L > L_max:
-        penalty = 1000.0 * abs((L - W) / W) ** 2
+        penalty = PENALTY_GAIN * abs((L - W) / W) ** 2
         print(f"[penalty] L fora da faixa: {L:.1f} lbf (peso={W:.1f} lbf, penalidade={penalty:.2f})")
     else:
         penalty = 0.0
@@ -324,9 +809,19 @@ def FCN(x: np.ndarray):
     # ============================================================
     fobj = -ld + penalty
 
-    vsp.ClearVSPModel()
-    time.sleep(1.0)
-    gc.collect()
+    # O modelo NÃO é limpo: a sessão é reaproveitada na próxima avaliação
+    # (memória acompanhada e workers reciclados pelo evaluator)
+
+    t_eval = time.perf_counter() - t_inicio
+    print(f"[tempo] total={t_eval:.2f} s | fidelidade={fidelity} | geometria={geom['t_geom']*1000:.1f} ms ({geom['origem']}) | solver={t_solver[0]:.2f} s | "
+          f"espera history={t_wait[0]*1000:.1f} ms | "
+          f"resultados via API={n_api[0]}/{n_solves[0]}")
+    if EARLY_STOP and SOLVER_BACKEND == "subprocess":
+        print(f"[early-stop] {iters_salvas[0]} iterações de esteira economizadas")
+    watchdog = dict(zip(WATCHDOG_FIELDS,
+                        np.subtract(WATCHDOG.counts(), watchdog0).tolist()))
+    if any(watchdog.values()):
+        print(f"[watchdog] nesta avaliação: {watchdog}")
 
     print(f"[done] Iteração finalizada: fobj={fobj:.4f}, L/D={ld:.2f}")
 
@@ -342,10 +837,73 @@ def FCN(x: np.ndarray):
         "Sref": Sref,
         "V_ft": V_ft,
         "rho": rho,
-        "Fcorr": F_corr
+        "Fcorr": F_corr,
+        "NSolves": n_solves[0],
+        "ItersSalvas": iters_salvas[0],
+        "RBM": rbm,
+        "E_span": e_span,
+        "Eta_ClMax": carga["Eta_ClMax"],
+        "Y_ClMax": carga["Y_ClMax"],
+        "CDi_lod": carga["CDi_lod"],
+        "SemLod": int(sem_lod),
+        "T_eval": t_eval,
+        "T_solver": t_solver[0],
+        "T_wait": t_wait[0],
+        "Simetria": meia,
+        "Fidelity": FIDELITY_ORDER.index(fidelity) if fidelity in FIDELITY_ORDER else -1,
+        **watchdog,
     }
 
 
+def result_record(data):
+    """Dicionário do FCN (ou registro) → um registro RESULT_DTYPE."""
+    return np.array(tuple(float(data[c]) for c in RESULT_FIELDS), dtype=RESULT_DTYPE)[()]
+
+
+def failed_result(fidelity=HIGH_FIDELITY, **watchdog):
+    """
+    (PENALTY, registro) de uma avaliação que não terminou: coeficientes
+    NaN, Falhas = 1 e os demais WATCHDOG_FIELDS dados em 'watchdog'.
+    """
+    data = dict.fromkeys(RESULT_FIELDS, np.nan)
+    data.update(dict.fromkeys(WATCHDOG_FIELDS, 0), SemLod=1, Falhas=1,
+                Fidelity=FIDELITY_ORDER.index(fidelity) if fidelity in FIDELITY_ORDER else -1)
+    data.update(watchdog)
+    return PENALTY, result_record(data)
+
+
+def pack_results(resultados):
+    """Lista [(fobj, data), ...] → (fobj (n,), registros (n,) RESULT_DTYPE)."""
+    f = np.array([fobj for fobj, _ in resultados], dtype=float)
+    rec = np.zeros(len(resultados), dtype=RESULT_DTYPE)
+    for i, (_, data) in enumerate(resultados):
+        rec[i] = result_record(data)
+    return f, rec
+
+
+def FCN_batch(X, run_dir=None, stem=RUN_STEM, on_result=None, fidelity=HIGH_FIDELITY):
+    """
+    Avalia uma matriz (n, 5) de projetos [AR, span, taper, sweep, twist].
+
+    Retorna (fobj, registros): fobj (n,) e array estruturado (n,) com os
+    campos RESULT_FIELDS. Cada linha é exatamente o FCN(x) da mesma linha
+    (mesma sessão do modelo base para o lote inteiro).
+    on_result(i, (fobj_i, data_i)) é chamado ao fim de cada linha com o
+    dicionário completo do FCN (o EvalCache grava todos os campos).
+    Todas as linhas usam o mesmo nível de fidelidade.
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    if X.ndim != 2 or X.shape[1] != 5:
+        raise ValueError(f"FCN_batch espera uma matriz (n, 5); recebeu {X.shape}")
+
+    resultados = []
+    for i, x in enumerate(X):
+        resultados.append(FCN(x, run_dir=run_dir, stem=stem, fidelity=fidelity))
+        if on_result is not None:
+            on_result(i, resultados[-1])
+    return pack_results(resultados)
+
+
 # ==================================================================
 # Teste rápido standalone
 # ==================================================================
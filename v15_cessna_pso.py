@@ -1,14 +1,32 @@
 # ============================================================
 # v15_cessna_pso.py (TOTALMENTE AJUSTADO)
+# ------------------------------------------------------------
+# Cada geração é avaliada de uma vez pelo evaluator
+# (parallel_eval.py): em série ou em N_WORKERS processos.
+# Velocidade/posição atualizadas para o enxame inteiro pelo
+# ParticleSwarm (pso_engine.py, interface ask/tell).
+# Checkpoint atômico do estado completo a cada geração (e, se
+# CHECKPOINT_POR_PARTICULA, a cada partícula avaliada);
+# "python v15_cessna_pso.py --resume" continua a execução.
+# Multi-fidelidade (multifidelity.py): geração triada no nível mais
+# barato do FCN e só os candidatos a lbest/gbest reavaliados em alta.
+# Workers reciclados por número de avaliações / crescimento do RSS
+# (mem_usage.py); tendência de memória em MEMORIA_CSV.
 # ============================================================
 
+import argparse
+
 import numpy as np
 import matplotlib.pyplot as plt
-import random
 import os
 import time
-from v15_cessna_opt import FCN     # IMPORTANTE: FCN v13
-from openvsp import openvsp as vsp
+from vsp3_template import get_vsp3_template
+from parallel_eval import make_evaluator
+from eval_cache import EvalCache, CachedEvaluator
+from v15_cessna_opt import config_signature, pack_results, FIDELITY_ORDER, HIGH_FIDELITY
+from multifidelity import MultiFidelityEvaluator, PROMOTION_MARGIN
+from pso_engine import ParticleSwarm
+from checkpoint import save_checkpoint, load_checkpoint
 
 VSP3_FILE = r"C:\VSP\Development\PSO_PYTHON_WING\cessna210.vsp3"
 
@@ -39,240 +57,328 @@ omega = 0.1
 lambda1 = 1
 lambda2 = 1
 
-random.seed(4)
-np.random.seed(4)
-
-
-# ============================================================
-# 2) HISTÓRICO E PASTA DE RESULTADOS
-# ============================================================
-
-output_dir = "resultados_variaveis"
-os.makedirs(output_dir, exist_ok=True)
-
-history_particles = {v: [] for v in var_names}
-history_gbest = {v: [] for v in var_names}
-gbest_history = []
-ld_history = []
-
-
-# ============================================================
-# 3) INICIALIZAÇÃO DAS PARTÍCULAS
-# ============================================================
-
-x = np.zeros((pop, nrvar))
-v = np.zeros((pop, nrvar))
-lbest = np.full(pop, np.inf)
-xlbest = np.zeros((pop, nrvar))
+SEED = 4
+
+# Avaliação paralela: número de processos worker (1 = série, no próprio
+# processo) e threads do VSPAERO por solve. Ex.: 32 núcleos → 8 x NCPU=4
+N_WORKERS = 1
+NCPU_POR_SOLVE = 4
+SCRATCH_ROOT = None      # None → v15_cessna_opt.SCRATCH_ROOT (/dev/shm)
+# Com N_WORKERS = 1: geometria da próxima partícula preparada num worker
+# enquanto a atual está no solver (pipeline_eval.py)
+PIPELINE = False
+
+# Reciclagem dos workers (vazamento de memória do OpenVSP): worker novo a
+# cada RECICLAR_APOS avaliações ou quando o RSS cresce mais que
+# RECICLAR_CRESCIMENTO_MB (None desliga). Com N_WORKERS = 1 sem PIPELINE
+# a reciclagem só vale com RECICLAR_SERIE = True: as avaliações passam a
+# rodar num worker separado em vez do SerialEvaluator no próprio processo.
+# O enxame fica neste processo.
+RECICLAR_APOS = 500
+RECICLAR_CRESCIMENTO_MB = 1024
+RECICLAR_SERIE = False
+MEMORIA_CSV = os.path.join("resultados_variaveis", "memoria_workers.csv")
+
+# Cache persistente das avaliações (compartilhado entre execuções)
+USAR_CACHE = True
+CACHE_FILE = os.path.join("resultados_variaveis", "cache_fcn.sqlite")
+CACHE_MAX_ENTRADAS = 50000
+CACHE_MAX_IDADE_DIAS = None   # None → nunca expira
+
+# Multi-fidelidade: triagem no nível FIDELITY_ORDER[0] e promoção para
+# alta de quem melhoraria lbest/gbest ou fica a MARGEM_PROMOCAO do gbest
+MULTI_FIDELIDADE = True
+MARGEM_PROMOCAO = PROMOTION_MARGIN
+
+# Checkpoint do otimizador (enxame + geradores + históricos)
+CHECKPOINT_FILE = os.path.join("resultados_variaveis", "checkpoint_pso.pkl")
+CHECKPOINT_POR_PARTICULA = True
+
+
+def avaliar_geracao(evaluator, x, estado):
+    """
+    Avalia a geração x pulando as partículas que já estão em
+    estado["parcial"] (geração interrompida). Cada resultado novo entra
+    no estado parcial e, se CHECKPOINT_POR_PARTICULA, vai para o disco.
+    Com multi-fidelidade, o estado parcial guarda cada avaliação por
+    (nível, partícula): triagem e promoções já feitas não são refeitas.
+    Retorna (fobj (n,), registros (n,)) como o FCN_batch.
+    """
+    parcial = estado["parcial"]
+    if parcial:
+        print(f"[checkpoint] {len(parcial)} avaliação(ões) desta geração já feita(s)")
+
+    def salva():
+        if CHECKPOINT_POR_PARTICULA:
+            save_checkpoint(CHECKPOINT_FILE, estado)
+
+    if isinstance(evaluator, MultiFidelityEvaluator):
+        enxame = estado["enxame"]
+        # screen() preenche 'parcial' com as chaves (nível, i)
+        fobj, dados = evaluator.screen(x, enxame.lbest, enxame.gbest,
+                                       on_result=lambda nivel, i, res: salva(),
+                                       done=parcial)
+        estado["parcial"] = {}
+        return fobj, dados
+
+    faltando = [i for i in range(len(x)) if i not in parcial]
+
+    def on_result(j, res):
+        parcial[faltando[j]] = res
+        salva()
+
+    if faltando:
+        evaluator.evaluate(x[faltando], on_result=on_result)
+
+    resultados = [parcial[i] for i in range(len(x))]
+    estado["parcial"] = {}
+    return pack_results(resultados)
+
+
+def main(resume=False):
+
+    reciclar = N_WORKERS > 1 or PIPELINE or RECICLAR_SERIE
+    base = make_evaluator(N_WORKERS, SCRATCH_ROOT, NCPU_POR_SOLVE, pipeline=PIPELINE,
+                          max_evals_per_worker=RECICLAR_APOS if reciclar else None,
+                          max_growth_mb=RECICLAR_CRESCIMENTO_MB if reciclar else None,
+                          memory_csv=MEMORIA_CSV)
+
+    # Um evaluator por nível de fidelidade, todos sobre os mesmos workers
+    # (o cache de cada nível tem a sua assinatura de configuração)
+    niveis = (FIDELITY_ORDER[0], HIGH_FIDELITY) if MULTI_FIDELIDADE else (HIGH_FIDELITY,)
+    avaliadores = {}
+    for nivel in niveis:
+        avaliadores[nivel] = base
+        if USAR_CACHE:
+            max_idade = None if CACHE_MAX_IDADE_DIAS is None else CACHE_MAX_IDADE_DIAS * 86400.0
+            cache = EvalCache(CACHE_FILE, config_signature(nivel),
+                              max_entries=CACHE_MAX_ENTRADAS, max_age_s=max_idade)
+            avaliadores[nivel] = CachedEvaluator(base, cache, fidelity=nivel,
+                                                 close_inner=(nivel == HIGH_FIDELITY))
+
+    if MULTI_FIDELIDADE:
+        evaluator = MultiFidelityEvaluator(avaliadores, margin=MARGEM_PROMOCAO)
+    else:
+        evaluator = avaliadores[HIGH_FIDELITY]
 
-gbest_value = 1e30
-k = 1
+    # ============================================================
+    # 2) PASTA DE RESULTADOS
+    # ============================================================
 
-asa_base = np.array([7.5, 36.0, 1.0, 0.0, 0.0])
+    output_dir = "resultados_variaveis"
+    os.makedirs(output_dir, exist_ok=True)
 
-for i in range(pop):
+    # ============================================================
+    # 3) INICIALIZAÇÃO DAS PARTÍCULAS (ou retomada do checkpoint)
+    # ============================================================
 
-    if i == 0:
-        x[i, :] = asa_base
+    if resume and os.path.exists(CHECKPOINT_FILE):
+        estado = load_checkpoint(CHECKPOINT_FILE)
+        print(f"[checkpoint] Retomando de {CHECKPOINT_FILE}: geração {estado['k'] - 1}")
     else:
-        for j in range(nrvar):
-            x[i, j] = xmin[j] + (xmax[j] - xmin[j]) * random.random()
-
-    y, data = FCN(x[i, :])
-    CL = data["CL"]
-    CD = data["CD_total"]
-    LD = data["LD"]
-    Alpha = data["Alpha"]
-
-    if i == 0:
-        alpha_base = Alpha
+        if resume:
+            print(f"[checkpoint] {CHECKPOINT_FILE} não encontrado: começando do zero")
+
+        # Partícula 0 = asa base; as demais sorteadas nos limites
+        asa_base = np.array([7.5, 36.0, 1.0, 0.0, 0.0])
+
+        estado = {
+            "enxame": ParticleSwarm(xmin, xmax, pop, omega, lambda1, lambda2,
+                                    seed=SEED, x0=asa_base),
+            "k": 1,                 # 1 = população inicial
+            "flag": False,
+            "parcial": {},          # resultados já obtidos da geração atual
+            "history_particles": {v: [] for v in var_names},
+            "history_gbest": {v: [] for v in var_names},
+            "gbest_history": [],
+            "ld_history": [],
+            "best": None,           # CL, CD, L/D do gbest
+            "fidelidade_dif": [],   # f_alta - f_baixa (viés da triagem)
+        }
+
+    enxame = estado["enxame"]
+    if MULTI_FIDELIDADE:
+        # Diferenças do viés da triagem no estado (vão para o checkpoint)
+        evaluator.diffs = estado.setdefault("fidelidade_dif", [])
+    history_particles = estado["history_particles"]
+    history_gbest = estado["history_gbest"]
+    gbest_history = estado["gbest_history"]
+    ld_history = estado["ld_history"]
+
+    if estado["k"] == 1:
+        # Avalia a população inicial inteira (em série ou nos workers)
+        x = enxame.ask()
+        fobj, dados = avaliar_geracao(evaluator, x, estado)
+        enxame.tell(fobj)
+
+        alpha_base = dados["Alpha"][0]
         print(f"[info] Alpha da asa base = {alpha_base:.3f}°")
-        ld_history.append(LD)
+        ld_history.append(dados["LD"][0])
 
-    lbest[i] = y
-    xlbest[i, :] = x[i, :]
+        data_best = dados[enxame.ibest]
+        estado["best"] = (data_best["CL"], data_best["CD_total"], data_best["LD"])
+        gbest_history.append(enxame.gbest)
 
-    if y < gbest_value:
-        gbest_value = y
-        gbest_history.append(gbest_value)
-        xgbest = x[i, :].copy()
-        CL_best = CL
-        CD_best = CD
-        LD_best = LD
+        estado["k"] = 2
+        save_checkpoint(CHECKPOINT_FILE, estado)
 
-plt.pause(0.1)
+    plt.pause(0.1)
 
 
-# ============================================================
-# 4) LOOP PRINCIPAL DO PSO
-# ============================================================
-
-flag = False
-k = 2
+    # ============================================================
+    # 4) LOOP PRINCIPAL DO PSO
+    # ============================================================
 
-while not flag:
-    
-    print(f"\n============================== Iteração {k-1} ==============================")
+    while not estado["flag"]:
 
-    for i in range(pop):
+        k = estado["k"]
 
-        for j in range(nrvar):
+        print(f"\n============================== Iteração {k-1} ==============================")
 
-            r1 = random.random()
-            r2 = random.random()
+        # Nova velocidade e posição de toda a geração com o xgbest do
+        # início da iteração (atualização síncrona: permite avaliar a
+        # geração inteira de uma vez)
+        x = enxame.ask()
 
-            vnew = (omega * v[i, j] +
-                    lambda1 * r1 * (xlbest[i, j] - x[i, j]) +
-                    lambda2 * r2 * (xgbest[j] - x[i, j]))
+        fobj, dados = avaliar_geracao(evaluator, x, estado)
 
-            xnew = np.clip(x[i, j] + vnew, xmin[j], xmax[j])
+        # Resultados chegam na ordem das partículas
+        for i, (ynew, data) in enumerate(zip(fobj, dados)):
+            print(f"[pso] Iter={k-1}, Partícula={i+1}/{pop} → fobj={ynew:.3f}, L/D={data['LD']:.2f}")
 
-            v[i, j] = vnew
-            x[i, j] = xnew
+        if enxame.tell(fobj):
+            data_best = dados[enxame.ibest]
+            estado["best"] = (data_best["CL"], data_best["CD_total"], data_best["LD"])
+        CL_best, CD_best, LD_best = estado["best"]
 
-        ynew, data = FCN(x[i, :])
-        CL = data["CL"]
-        CD = data["CD_total"]
-        LD = data["LD"]
-
-        print(f"[pso] Iter={k-1}, Partícula={i+1}/{pop} → fobj={ynew:.3f}, L/D={LD:.2f}")
+        gbest_value = enxame.gbest
+        xgbest = enxame.xgbest
+        gbest_history.append(gbest_value)
 
-        if ynew < lbest[i]:
-            lbest[i] = ynew
-            xlbest[i, :] = x[i, :]
+        for idx, var in enumerate(var_names):
+            history_particles[var].append(x[:, idx].copy())
+            history_gbest[var].append(xgbest[idx])
 
-        if ynew < gbest_value:
-            gbest_value = ynew
-            xgbest = x[i, :].copy()
-            CL_best = CL
-            CD_best = CD
-            LD_best = LD
+        if k >= itermax:
+            estado["flag"] = True
 
-    gbest_history.append(gbest_value)
+        if len(gbest_history) >= 10:
+            prev_win = gbest_history[-10:-5]
+            curr_win = gbest_history[-5:]
+            delta = abs(np.mean(curr_win) - np.mean(prev_win))
+            if delta < tol:
+                estado["flag"] = True
 
-    for idx, var in enumerate(var_names):
-        history_particles[var].append(x[:, idx].copy())
-        history_gbest[var].append(xgbest[idx])
+        print(f"[iter {k-1}] gbest={gbest_value:.4f} | L/D≈{LD_best:.2f} (gbest) | xgbest={xgbest}")
+        ld_history.append(LD_best)
+        estado["k"] = k + 1
 
-    if k >= itermax:
-        flag = True
+        # Fim da geração: estado completo em disco
+        save_checkpoint(CHECKPOINT_FILE, estado)
 
-    if len(gbest_history) >= 10:
-        prev_win = gbest_history[-10:-5]
-        curr_win = gbest_history[-5:]
-        delta = abs(np.mean(curr_win) - np.mean(prev_win))
-        if delta < tol:
-            flag = True
+    xgbest = enxame.xgbest
 
-    print(f"[iter {k-1}] gbest={gbest_value:.4f} | L/D≈{LD_best:.2f} (gbest) | xgbest={xgbest}")
-    ld_history.append(LD_best)
-    k += 1
 
+    # ============================================================
+    # 5) GRÁFICOS
+    # ============================================================
 
-# ============================================================
-# 5) GRÁFICOS
-# ============================================================
+    plt.figure(figsize=(7,5))
+    plt.plot(gbest_history, 'b-o')
+    plt.xlabel("Iteração")
+    plt.ylabel("fobj (mínimo)")
+    plt.title("Convergência da Função Objetivo")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, "convergencia_fobj.png"))
+    plt.close()
 
-plt.figure(figsize=(7,5))
-plt.plot(gbest_history, 'b-o')
-plt.xlabel("Iteração")
-plt.ylabel("fobj (mínimo)")
-plt.title("Convergência da Função Objetivo")
-plt.grid(True)
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, "convergencia_fobj.png"))
-plt.close()
+    for i, var in enumerate(var_names):
 
-for i, var in enumerate(var_names):
+        plt.figure(figsize=(8,4))
 
-    plt.figure(figsize=(8,4))
+        for it, vals in enumerate(history_particles[var]):
+            plt.scatter([it+1]*len(vals), vals, color='blue', alpha=0.4, s=30)
 
-    for it, vals in enumerate(history_particles[var]):
-        plt.scatter([it+1]*len(vals), vals, color='blue', alpha=0.4, s=30)
+        plt.plot(history_gbest[var], 'r-', lw=1.5, label="gbest")
 
-    plt.plot(history_gbest[var], 'r-', lw=1.5, label="gbest")
+        plt.xlabel("Iteração")
+        plt.ylabel(var)
+        plt.title(f"Evolução da variável: {var}")
+        plt.legend()
+        plt.grid(True)
+        plt.tight_layout()
+        plt.savefig(os.path.join(output_dir, f"dispersao_{var}.png"))
+        plt.close()
 
+    plt.figure(figsize=(7,5))
+    plt.plot(ld_history, 'g-o')
     plt.xlabel("Iteração")
-    plt.ylabel(var)
-    plt.title(f"Evolução da variável: {var}")
-    plt.legend()
+    plt.ylabel("L/D (melhor)")
+    plt.title("Convergência Física (L/D)")
     plt.grid(True)
     plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, f"dispersao_{var}.png"))
+    plt.savefig(os.path.join(output_dir, "convergencia_LD_best.png"))
     plt.close()
 
-plt.figure(figsize=(7,5))
-plt.plot(ld_history, 'g-o')
-plt.xlabel("Iteração")
-plt.ylabel("L/D (melhor)")
-plt.title("Convergência Física (L/D)")
-plt.grid(True)
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, "convergencia_LD_best.png"))
-plt.close()
-
-print(f"\n✅ Gráficos salvos em: {os.path.abspath(output_dir)}")
-
+    print(f"\n✅ Gráficos salvos em: {os.path.abspath(output_dir)}")
 
-# ============================================================
-# 6) RESULTADOS FINAIS EM TXT
-# ============================================================
 
-result_file = os.path.join(output_dir, "resultado_final.txt")
+    # ============================================================
+    # 6) RESULTADOS FINAIS EM TXT
+    # ============================================================
 
-f_best, data = FCN(xgbest)
-cl_best = data["CL"]
-cd_best = data["CD_total"]
-ld_best = data["LD"]
-L_best = data["L"]
+    result_file = os.path.join(output_dir, "resultado_final.txt")
 
-W_lbf = 1800 * 2.20462      # peso em lbf
-LW_ratio = (L_best / W_lbf) * 100
-CL_ideal = cl_best * (W_lbf / L_best)
+    # Resultado final sempre no nível de produção
+    fobj, dados = evaluator.evaluate([xgbest], fidelity=HIGH_FIDELITY)
+    f_best, data = fobj[0], dados[0]
+    cl_best = data["CL"]
+    cd_best = data["CD_total"]
+    ld_best = data["LD"]
+    L_best = data["L"]
 
-with open(result_file, "w", encoding="utf-8") as f:
+    W_lbf = 1800 * 2.20462      # peso em lbf
+    LW_ratio = (L_best / W_lbf) * 100
+    CL_ideal = cl_best * (W_lbf / L_best)
 
-    f.write("=============================================\n")
-    f.write("   RESULTADOS FINAIS DA OTIMIZAÇÃO PSO\n")
-    f.write("=============================================\n\n")
+    with open(result_file, "w", encoding="utf-8") as f:
 
-    f.write(f"Melhor L/D encontrado.............: {ld_best:.4f}\n")
-    f.write(f"CL................................: {cl_best:.4f}\n")
-    f.write(f"CD................................: {cd_best:.4f}\n")
-    f.write(f"L/W...............................: {LW_ratio:.2f}%\n")
-    f.write(f"CL ideal para L=W.................: {CL_ideal:.4f}\n\n")
+        f.write("=============================================\n")
+        f.write("   RESULTADOS FINAIS DA OTIMIZAÇÃO PSO\n")
+        f.write("=============================================\n\n")
 
-    f.write("Variáveis ótimas:\n")
-    for name, value in zip(var_names, xgbest):
-        f.write(f"  {name:<10} = {value:.5f}\n")
+        f.write(f"Melhor L/D encontrado.............: {ld_best:.4f}\n")
+        f.write(f"CL................................: {cl_best:.4f}\n")
+        f.write(f"CD................................: {cd_best:.4f}\n")
+        f.write(f"L/W...............................: {LW_ratio:.2f}%\n")
+        f.write(f"CL ideal para L=W.................: {CL_ideal:.4f}\n\n")
 
-print(f"\n✅ Resultado final salvo em: {result_file}")
+        f.write("Variáveis ótimas:\n")
+        for name, value in zip(var_names, xgbest):
+            f.write(f"  {name:<10} = {value:.5f}\n")
 
+    print(f"\n✅ Resultado final salvo em: {result_file}")
 
-# ============================================================
-# 7) SALVA GEOMETRIA FINAL
-# ============================================================
 
-print("\n[save-best] Salvando cessna_best.vsp3...")
+    # ============================================================
+    # 7) SALVA GEOMETRIA FINAL
+    # ============================================================
 
-vsp.ClearVSPModel()
-vsp.ReadVSPFile(VSP3_FILE)
+    print("\n[save-best] Salvando cessna_best.vsp3...")
 
-AR, span, taper, sweep, twist = xgbest
-croot = 2 * span / (AR * (1 + taper))
-ctip  = taper * croot
+    # Texto do modelo base com a XSec_1 do xgbest (sem recarregar o modelo)
+    best_file = os.path.join(output_dir, "cessna_best.vsp3")
+    get_vsp3_template(VSP3_FILE).write(best_file, xgbest)
 
-wing_id = vsp.FindGeoms()[0]   # automático
+    print(f"[save-best] Arquivo salvo em: {best_file}")
 
-vsp.SetParmVal(wing_id, "Span", "XSec_1", span/2)
-vsp.SetParmVal(wing_id, "Root_Chord", "XSec_1", croot)
-vsp.SetParmVal(wing_id, "Tip_Chord", "XSec_1", ctip)
-vsp.SetParmVal(wing_id, "Taper", "XSec_1", taper)
-vsp.SetParmVal(wing_id, "Sweep", "XSec_1", sweep)
-vsp.SetParmVal(wing_id, "Twist", "XSec_1", twist)
+    evaluator.close()
 
-vsp.Update()
-best_file = os.path.join(output_dir, "cessna_best.vsp3")
-vsp.WriteVSPFile(best_file)
 
-print(f"[save-best] Arquivo salvo em: {best_file}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PSO da asa do Cessna 210 (v15)")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"continua a partir de {CHECKPOINT_FILE}")
+    args = parser.parse_args()
+    main(resume=args.resume)
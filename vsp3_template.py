@@ -0,0 +1,187 @@
+# ============================================================
+# vsp3_template.py
+# ------------------------------------------------------------
+# Geração do .vsp3 de cada avaliação a partir do cessna210.vsp3,
+# sem vsp.WriteVSPFile() (que serializa o modelo inteiro).
+#
+#   - o .vsp3 base é lido e analisado (ElementTree) uma vez por
+#     processo; a árvore localiza a asa, a XSec_1 e os IDs dos parms
+#     que mudam
+#   - o texto original é cortado nos atributos Value="..." desses
+#     parms: gerar um arquivo é só juntar os pedaços fixos com os
+#     valores novos formatados como o OpenVSP grava (%.18e). Todo o
+#     resto do arquivo sai byte a byte igual ao original
+#   - além dos seis parâmetros do PSO (Span, Root_Chord, Tip_Chord,
+#     Taper, Sweep, Twist) são atualizados os parms da mesma seção que
+#     o OpenVSP pode usar como drivers (Area, Aspect, Avg_Chord,
+#     ProjectedSpan, Sec_Sweep) e os totais da asa (TotalSpan,
+#     TotalArea, ...), para que a seção seja coerente qualquer que seja
+#     o grupo de drivers salvo no arquivo
+#   - valores derivados que o OpenVSP recalcula no Update (BBox, MAC,
+#     ângulos de blending) ficam com os valores do modelo base
+#
+#   tpl = get_vsp3_template("cessna210.vsp3")
+#   tpl.write("cessna_updated.vsp3", x)          # x = [AR, span, taper, sweep, twist]
+#   tpl.write_many(["p0.vsp3", "p1.vsp3"], X)     # geração inteira
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import math
+import re
+import xml.etree.ElementTree as ET
+
+from planform import planform_from_x, XSEC_PARMS
+
+# Parms da seção derivados da planta (drivers alternativos)
+SECTION_DERIVED = ("Area", "Aspect", "Avg_Chord", "ProjectedSpan", "Sec_Sweep")
+# Totais da asa (grupo WingGeom)
+WING_TOTALS = ("TotalSpan", "TotalProjectedSpan", "TotalArea", "TotalChord", "TotalAR")
+
+
+def format_value(v):
+    """Formato dos valores de parm no .vsp3 (igual ao OpenVSP)."""
+    return f"{float(v):.18e}"
+
+
+class VSP3Template:
+    """
+    .vsp3 base em memória, com os valores da XSec_1 editáveis.
+
+    vsp3_file  : modelo base
+    xsec_index : seção da asa alterada pelo PSO (1 → XSec_1)
+    """
+
+    def __init__(self, vsp3_file, xsec_index=1):
+        self.vsp3_file = vsp3_file
+        self.xsec_index = xsec_index
+
+        with open(vsp3_file, "r", encoding="utf-8", newline="") as f:
+            texto = f.read()
+        raiz = ET.fromstring(texto)
+
+        asa = None
+        for geom in raiz.iter("Geom"):
+            tipo = geom.find("GeomBase/TypeName")
+            if tipo is not None and tipo.text == "Wing":
+                asa = geom
+                break
+        if asa is None:
+            raise RuntimeError(f"Nenhuma asa encontrada em {vsp3_file}")
+
+        secoes = asa.findall("WingGeom/XSecSurf/XSec")
+        if len(secoes) <= xsec_index:
+            raise RuntimeError(f"{vsp3_file}: asa sem XSec_{xsec_index}")
+        secao = secoes[xsec_index].find("ParmContainer/XSec")
+        totais = asa.find("ParmContainer/WingGeom")
+
+        # Posição da raiz da asa (XForm da Geom), usada no morphing da malha
+        xform = asa.find("ParmContainer/XForm")
+        self.origin = tuple(
+            float(xform.find(f"{eixo}_Location").get("Value"))
+            if xform is not None and xform.find(f"{eixo}_Location") is not None else 0.0
+            for eixo in "XYZ")
+
+        # nome → valor no modelo base (e o ID do parm, para cortar o texto)
+        self.base = {}
+        ids = {}
+        for grupo, nomes in ((secao, XSEC_PARMS + SECTION_DERIVED +
+                              ("Dihedral", "Sweep_Location", "Sec_Sweep_Location",
+                               "Twist_Location")),
+                             (totais, WING_TOTALS)):
+            for nome in nomes:
+                el = grupo.find(nome)
+                if el is None:
+                    continue
+                ids[nome] = el.get("ID")
+                self.base[nome] = float(el.get("Value"))
+
+        faltando = [n for n in XSEC_PARMS if n not in ids]
+        if faltando:
+            raise RuntimeError(f"{vsp3_file}: XSec_{xsec_index} sem {faltando}")
+
+        # Fator de simetria dos totais (2 para asa espelhada)
+        self._fator = (self.base["TotalArea"] / self.base["Area"]
+                       if "TotalArea" in self.base and self.base.get("Area") else 2.0)
+
+        # Corta o texto nos valores editáveis (IDs de parm são únicos)
+        self.nomes = [n for n in XSEC_PARMS + SECTION_DERIVED + WING_TOTALS if n in ids]
+        posicoes = []
+        for nome in self.nomes:
+            m = re.search(r'Value="([^"]*)" ID="%s"' % re.escape(ids[nome]), texto)
+            if m is None:
+                raise RuntimeError(f"{vsp3_file}: parm {nome} ({ids[nome]}) não localizado")
+            posicoes.append((m.start(1), m.end(1), nome))
+        posicoes.sort()
+
+        self._pedacos = []
+        self._ordem = []
+        fim = 0
+        for ini, f, nome in posicoes:
+            self._pedacos.append(texto[fim:ini])
+            self._ordem.append(nome)
+            fim = f
+        self._pedacos.append(texto[fim:])
+
+    # ------------------------------------------------------------
+    def values(self, x):
+        """Vetor do PSO → valores de todos os parms editáveis."""
+        v, croot, ctip = planform_from_x(x)
+        span = v["Span"]
+        b = self.base
+
+        v["Avg_Chord"] = 0.5 * (croot + ctip)
+        v["Area"] = span * v["Avg_Chord"]
+        v["Aspect"] = span / v["Avg_Chord"]
+        v["ProjectedSpan"] = span * math.cos(math.radians(b.get("Dihedral", 0.0)))
+
+        # Enflechamento na Sec_Sweep_Location a partir do Sweep na Sweep_Location
+        dloc = b.get("Sec_Sweep_Location", 1.0) - b.get("Sweep_Location", 0.0)
+        v["Sec_Sweep"] = math.degrees(math.atan(
+            math.tan(math.radians(v["Sweep"])) - dloc * (croot - ctip) / span))
+
+        # Totais: a parte das outras seções fica como no modelo base
+        k = self._fator
+        if "TotalSpan" in b:
+            v["TotalSpan"] = b["TotalSpan"] + k * (span - b["Span"])
+        if "TotalProjectedSpan" in b:
+            v["TotalProjectedSpan"] = b["TotalProjectedSpan"] + k * (
+                v["ProjectedSpan"] - b.get("ProjectedSpan", b["Span"]))
+        if "TotalArea" in b:
+            v["TotalArea"] = b["TotalArea"] + k * (v["Area"] - b["Area"])
+        if "TotalArea" in v and "TotalSpan" in v:
+            v["TotalChord"] = v["TotalArea"] / v["TotalSpan"]
+            v["TotalAR"] = v["TotalSpan"] ** 2 / v["TotalArea"]
+        return v
+
+    def render(self, x=None, valores=None):
+        """Texto do .vsp3 para o projeto x (ou valores já calculados)."""
+        if valores is None:
+            valores = self.base if x is None else self.values(x)
+        partes = [self._pedacos[0]]
+        for nome, pedaco in zip(self._ordem, self._pedacos[1:]):
+            partes.append(format_value(valores[nome]))
+            partes.append(pedaco)
+        return "".join(partes)
+
+    def write(self, path, x):
+        """Grava o .vsp3 do projeto x em path."""
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(self.render(x))
+        return path
+
+    def write_many(self, paths, X):
+        """Grava um .vsp3 por linha de X (p.ex. uma geração inteira)."""
+        for path, x in zip(paths, X):
+            self.write(path, x)
+        return list(paths)
+
+
+_TEMPLATES = {}
+
+
+def get_vsp3_template(path):
+    """Template em cache por processo."""
+    if path not in _TEMPLATES:
+        _TEMPLATES[path] = VSP3Template(path)
+    return _TEMPLATES[path]
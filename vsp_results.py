@@ -0,0 +1,123 @@
+# ============================================================
+# vsp_results.py
+# ------------------------------------------------------------
+# Resultados do VSPAERO pelo gerenciador de resultados do OpenVSP
+# (ID devolvido pelo ExecAnalysis), sem reler .history do disco.
+#
+#   res_id = vsp.ExecAnalysis("VSPAEROSweep")
+#   rows = sweep_last_rows(res_id)     # None → usar o parser de arquivo
+#   rows["CLtot"], rows["CDi"]         # um valor por caso da varredura
+#
+#   - o ID do ExecAnalysis aponta para um resultado "wrapper" cujo
+#     "ResultsVec" lista os resultados filhos: um "VSPAERO_History" por
+#     caso (arrays por iteração de esteira) e o "VSPAERO_Polar"
+#   - a última iteração de cada caso vira uma linha de um array
+#     estruturado com os mesmos campos do vspaero_results
+#     (AoA, CLtot, CDo, CDi, CDtot, L/D), então quem usa
+#     history_case_last_rows() troca de fonte sem mudar nada
+#   - os nomes das colunas mudam entre versões do OpenVSP ("Alpha" ou
+#     "AoA", "CL" ou "CLtot"); sem uma coluna obrigatória a função
+#     devolve None e o chamador volta para o arquivo
+#   - os resultados lidos são apagados do gerenciador (senão acumulam
+#     na memória a cada solve de uma otimização longa)
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import numpy as np
+from openvsp import openvsp as vsp
+
+HISTORY_RESULT = "VSPAERO_History"
+POLAR_RESULT = "VSPAERO_Polar"
+
+# Campo do registro → nomes aceitos no gerenciador de resultados
+_ALIASES = {
+    "AoA": ("AoA", "Alpha"),
+    "CLtot": ("CLtot", "CL"),
+    "CDo": ("CDo",),
+    "CDi": ("CDi",),
+    "CDtot": ("CDtot", "CD"),
+    "L/D": ("L/D", "LoD", "L_D"),
+}
+RESULT_COLUMNS = tuple(_ALIASES)
+_RESULT_DTYPE = np.dtype([(c, np.float64) for c in RESULT_COLUMNS])
+
+_avisado = [False]           # aviso de fallback impresso uma vez por processo
+
+
+def _child_ids(res_id):
+    """IDs dos resultados filhos do wrapper (ou o próprio ID)."""
+    try:
+        ids = list(vsp.GetStringResults(res_id, "ResultsVec"))
+    except Exception:
+        ids = []
+    return ids or [res_id]
+
+
+def _columns(rid):
+    """Arrays das colunas de um resultado, ou None se faltar alguma."""
+    disponiveis = set(vsp.GetAllDataNames(rid))
+    cols = {}
+    for campo, nomes in _ALIASES.items():
+        nome = next((n for n in nomes if n in disponiveis), None)
+        if nome is not None:
+            cols[campo] = np.asarray(vsp.GetDoubleResults(rid, nome), dtype=np.float64)
+
+    if "L/D" not in cols and "CLtot" in cols and "CDtot" in cols:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cols["L/D"] = cols["CLtot"] / cols["CDtot"]
+    if any(c not in cols or not len(cols[c]) for c in RESULT_COLUMNS):
+        return None
+    return cols
+
+
+def delete_results(res_id):
+    """Apaga o wrapper e os resultados filhos do gerenciador."""
+    for rid in _child_ids(res_id) + [res_id]:
+        try:
+            vsp.DeleteResult(rid)
+        except Exception:
+            pass
+
+
+def sweep_last_rows(res_id, delete=True):
+    """
+    Última iteração de cada caso da varredura, direto do gerenciador de
+    resultados: array estruturado (n_casos,) com RESULT_COLUMNS.
+
+    Usa os "VSPAERO_History" (um por caso); sem eles, as linhas do
+    "VSPAERO_Polar". None se nenhum dos dois estiver disponível ou
+    completo — o chamador deve ler o .history.
+    """
+    if not res_id:
+        return None
+    try:
+        ids = _child_ids(res_id)
+        nomes = {rid: vsp.GetResultsName(rid) for rid in ids}
+
+        linhas = []
+        for rid in (r for r in ids if nomes[r] == HISTORY_RESULT):
+            cols = _columns(rid)
+            if cols is None:
+                linhas = []
+                break
+            linhas.append(tuple(float(cols[c][-1]) for c in RESULT_COLUMNS))
+
+        if not linhas:
+            for rid in (r for r in ids if nomes[r] == POLAR_RESULT):
+                cols = _columns(rid)
+                if cols is not None:
+                    linhas = list(zip(*(cols[c] for c in RESULT_COLUMNS)))
+                    break
+
+        if not linhas:
+            return None
+        return np.array(linhas, dtype=_RESULT_DTYPE)
+    except Exception as e:
+        if not _avisado[0]:
+            print(f"[results] gerenciador de resultados indisponível ({e}); lendo arquivo")
+            _avisado[0] = True
+        return None
+    finally:
+        if delete:
+            delete_results(res_id)
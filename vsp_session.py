@@ -0,0 +1,172 @@
+# ============================================================
+# vsp_session.py
+# ------------------------------------------------------------
+# Sessão persistente do modelo OpenVSP usada pelo FCN.
+#
+# Em vez de ClearVSPModel() + ReadVSPFile() a cada avaliação,
+# o modelo base é carregado UMA vez por processo. A sessão guarda:
+#   - o ID da asa principal
+#   - os handles (parm IDs) dos seis parâmetros da XSec_1
+#   - um snapshot dos valores originais desses parâmetros
+#   - os nomes de entrada das análises já consultadas
+#   - os handles da tesselagem da asa (SectTess_U da XSec_1 e Tess_W),
+#     alterada pelos níveis de fidelidade do FCN
+#
+# Entre avaliações apenas os seis parâmetros da XSec_1 são
+# restaurados (snapshot/restore) antes de aplicar o novo vetor x.
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import os
+from openvsp import openvsp as vsp
+
+# XSEC_PARMS e planform_from_x ficam em planform.py (sem OpenVSP)
+from planform import XSEC_PARMS, planform_from_x
+
+
+class VSPModelSession:
+    """
+    Modelo OpenVSP carregado uma única vez, com handles em cache.
+
+    Uso típico (dentro do FCN):
+        sessao = get_session(VSP3_FILE)
+        sessao.restore()
+        croot, ctip = sessao.apply(x)
+    """
+
+    def __init__(self, vsp3_file, xsec_group="XSec_1"):
+        self.vsp3_file = vsp3_file
+        self.xsec_group = xsec_group
+
+        self.wing_id = None
+        self.parm_ids = {}
+        self.snapshot_vals = {}
+        self._area_id = None
+        self._span_id = None
+        self._input_names = {}
+        self.tess_ids = {}
+        self.tess_base = {}
+        self._tess_atual = {}
+        self.n_loads = 0
+
+        self.load()
+
+    # ------------------------------------------------------------
+    # Carregamento do modelo base (feito uma vez)
+    # ------------------------------------------------------------
+    def load(self):
+        """Lê o .vsp3 base, localiza a asa e resolve os parm IDs."""
+        vsp.ClearVSPModel()
+        vsp.ReadVSPFile(self.vsp3_file)
+
+        self.wing_id = None
+        for gid in vsp.FindGeoms():
+            if vsp.GetGeomTypeName(gid) == "Wing":
+                self.wing_id = gid
+                break
+
+        if self.wing_id is None:
+            raise RuntimeError("ERRO: Nenhuma asa encontrada no modelo!")
+
+        self.parm_ids = {
+            nome: vsp.GetParm(self.wing_id, nome, self.xsec_group)
+            for nome in XSEC_PARMS
+        }
+        self._area_id = vsp.GetParm(self.wing_id, "TotalArea", "WingGeom")
+        self._span_id = vsp.GetParm(self.wing_id, "TotalSpan", "WingGeom")
+        self._input_names = {}
+
+        # Tesselagem da asa: U da seção (SectTess_U) e W (Tess_W, grupo Shape)
+        ids = {"Tess_U": vsp.GetParm(self.wing_id, "SectTess_U", self.xsec_group),
+               "Tess_W": vsp.GetParm(self.wing_id, "Tess_W", "Shape")}
+        self.tess_ids = {nome: pid for nome, pid in ids.items() if pid}
+        self.tess_base = {nome: vsp.GetParmVal(pid) for nome, pid in self.tess_ids.items()}
+        self._tess_atual = dict(self.tess_base)
+
+        self.snapshot()
+        self.n_loads += 1
+
+        print(f"[session] Modelo base carregado ({os.path.basename(self.vsp3_file)}), "
+              f"Wing ID = {self.wing_id}")
+
+    # ------------------------------------------------------------
+    # Snapshot / restore dos seis parâmetros da XSec_1
+    # ------------------------------------------------------------
+    def snapshot(self):
+        """Guarda os valores atuais dos parâmetros da XSec_1."""
+        self.snapshot_vals = {
+            nome: vsp.GetParmVal(pid) for nome, pid in self.parm_ids.items()
+        }
+        return dict(self.snapshot_vals)
+
+    def restore(self, update=True):
+        """
+        Volta os parâmetros da XSec_1 aos valores do snapshot.
+        update=False quando um apply() vem logo em seguida (o Update do
+        apply vale pelos dois).
+        """
+        self._set_values(self.snapshot_vals, update)
+
+    def apply(self, x):
+        """Aplica o vetor do PSO na asa. Retorna (croot, ctip)."""
+        valores, croot, ctip = planform_from_x(x)
+        self._set_values(valores)
+        return croot, ctip
+
+    def set_tessellation(self, tess_u=None, tess_w=None):
+        """
+        Tesselagem da asa (None → valor do modelo base). Só grava os parms
+        que mudam e não chama Update: vale a partir do próximo apply().
+        """
+        for nome, v in (("Tess_U", tess_u), ("Tess_W", tess_w)):
+            if nome not in self.tess_ids:
+                continue
+            alvo = self.tess_base[nome] if v is None else int(v)
+            if alvo != self._tess_atual[nome]:
+                vsp.SetParmVal(self.tess_ids[nome], alvo)
+                self._tess_atual[nome] = alvo
+
+    def _set_values(self, valores, update=True):
+        for nome in XSEC_PARMS:
+            vsp.SetParmVal(self.parm_ids[nome], valores[nome])
+        if update:
+            vsp.Update()
+
+    # ------------------------------------------------------------
+    # Consultas em cache
+    # ------------------------------------------------------------
+    def wing_area(self):
+        """TotalArea da asa [ft²]."""
+        return vsp.GetParmVal(self._area_id)
+
+    def wing_span(self):
+        """TotalSpan da asa [ft]."""
+        return vsp.GetParmVal(self._span_id)
+
+    def analysis_inputs(self, analysis_id):
+        """Nomes de entrada de uma análise (consultado só na 1ª vez)."""
+        if analysis_id not in self._input_names:
+            try:
+                nomes = vsp.GetAnalysisInputNames(analysis_id)
+            except Exception:
+                nomes = []
+            self._input_names[analysis_id] = set(nomes)
+        return self._input_names[analysis_id]
+
+
+# ============================================================
+# Sessão única por processo
+# ============================================================
+_SESSIONS = {}
+
+
+def get_session(vsp3_file):
+    """Retorna a sessão do processo para o arquivo dado (cria na 1ª chamada)."""
+    sessao = _SESSIONS.get(vsp3_file)
+    if sessao is None:
+        # OpenVSP mantém um único modelo por processo: descarta sessões antigas
+        _SESSIONS.clear()
+        sessao = VSPModelSession(vsp3_file)
+        _SESSIONS[vsp3_file] = sessao
+    return sessao
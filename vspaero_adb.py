@@ -0,0 +1,285 @@
+# ============================================================
+# vspaero_adb.py
+# ------------------------------------------------------------
+# Leitura do .adb (banco de dados binário da solução do VSPAERO)
+# via mmap, sem carregar o arquivo na memória.
+#
+#   - o .adb.cases (texto, uma linha "Mach AoA Beta  Case: N" por
+#     caso) é o índice dos casos
+#   - o cabeçalho fixo é decodificado na abertura (valores de
+#     referência, número de nós/triângulos, superfícies)
+#   - cada caso é um bloco de tamanho fixo com a geometria do caso
+#     (triângulos e nós, incluindo a esteira, que se alinha ao
+#     escoamento, e os níveis grossos do multigrid) seguida da solução:
+#       Mach, alfa, beta, limites de Cp da escala   5 float32
+#       Gamma por loop                              n_loops × 2 float64
+#       velocidades (loops e arestas)               (n_loops + n_edges) × 3 float64
+#       Cp, Cp não-estacionário, Gamma por tri      n_tris × 3 float32
+#       esteira e dados dos cortes (resto do bloco)
+#   - os arrays devolvidos são views np.frombuffer sobre o mmap:
+#     só as páginas tocadas são lidas do disco, e o RSS não cresce
+#     com o tamanho do arquivo
+#
+#   with AdbFile("cessna210.adb") as adb:
+#       adb.n_cases, adb.header["Sref"]
+#       adb.condition(4)        # Mach, AoA, Beta, CpMin, CpMax do caso 5
+#       adb.nodes(4)            # (n_nodes, 3) float32
+#       adb.tris(4)["surf_id"]  # triângulos do caso 5
+#       adb.loop_data(4)        # (n_loops, 2) float64
+#       adb.cp(4)               # Cp por triângulo do caso 5 (view)
+#
+# Layout conferido nos .adb deste repositório (cessna210, mach_sweep),
+# gravados pelo VSPAERO com ADB_FILE_ID em regime estacionário. O
+# layout da solução muda entre versões do VSPAERO: outro id é recusado
+# na abertura, e cp() confere se o bloco de Cp cabe no caso e se a
+# esteira tem Cp nulo antes de devolver a view (RuntimeError se não).
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# Identificador gravado no início de todo .adb
+ADB_FILE_ID = -123789453
+
+# Cabeçalho fixo: id, tipo de modelo, simetria, não-estacionário,
+# 4 contagens, Sref, Cref, Bref, Xcg, Ycg, Zcg
+_CABECALHO = struct.Struct("<4i4i6f")
+_NOME_LEN = 100
+# Superfície: id, nome (char[100]), componente
+_SUPERFICIE = struct.Struct(f"<i{_NOME_LEN}si")
+
+# Triângulo: 3 nós (base 1), tipo de superfície (1 = asa, 0 = esteira),
+# id da superfície, grupo, área
+TRI_DTYPE = np.dtype([("nodes", "<i4", (3,)), ("surf_type", "<i4"),
+                      ("surf_id", "<i4"), ("group", "<i4"), ("area", "<f4")])
+
+# Cabeçalho da solução de cada caso: Mach, alfa, beta (rad), CpMin, CpMax
+_CONDICAO = struct.Struct("<5f")
+
+# Solução por triângulo: Cp, Cp não-estacionário e Gamma (a esteira
+# tem Cp nulo e só carrega o Gamma)
+TRI_SOLUTION_DTYPE = np.dtype([("Cp", "<f4"), ("Cp_unsteady", "<f4"), ("Gamma", "<f4")])
+
+
+def read_adb_cases(path):
+    """Lê o .adb.cases → lista de (Mach, AoA, Beta) em graus."""
+    casos = []
+    with open(path, "r") as f:
+        for ln in f:
+            partes = ln.split()
+            if len(partes) < 3 or "Case:" not in partes:
+                continue
+            casos.append(tuple(float(p) for p in partes[:3]))
+    return casos
+
+
+class AdbFile:
+    """
+    .adb mapeado em memória (somente leitura).
+
+    path       : arquivo .adb
+    cases_path : índice de casos (padrão: path + ".cases")
+
+    Os arrays devolvidos apontam para o mmap: copie (np.array(...)) o
+    que precisar depois de fechar o arquivo.
+    """
+
+    def __init__(self, path, cases_path=None):
+        self.path = path
+        self.casos = read_adb_cases(cases_path or path + ".cases")
+        if not self.casos:
+            raise RuntimeError(f"Nenhum caso em {cases_path or path + '.cases'}")
+
+        self._f = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._f.close()
+            raise RuntimeError(f"{path} está vazio")
+        self._offsets = {}          # caso → offset do cabeçalho da solução
+        self._offsets_cp = {}       # caso → offset do bloco de Cp (conferido)
+
+        self.header = self._le_cabecalho()
+        self.n_cases = len(self.casos)
+
+        resto = len(self._mm) - self._inicio
+        if resto <= 0 or resto % self.n_cases:
+            self.close()
+            raise RuntimeError(f"{path}: {resto} bytes de dados não se dividem "
+                               f"em {self.n_cases} casos iguais")
+        self._bloco = resto // self.n_cases
+
+    # ------------------------------------------------------------
+    # Cabeçalho
+    # ------------------------------------------------------------
+    def _le_cabecalho(self):
+        valores = _CABECALHO.unpack_from(self._mm, 0)
+        file_id, modelo, simetria, nao_estacionario = valores[:4]
+        if file_id != ADB_FILE_ID:
+            self.close()
+            raise RuntimeError(f"{self.path}: id {file_id} não é o do .adb suportado "
+                               f"({ADB_FILE_ID}); outra versão do VSPAERO ou outro arquivo")
+
+        contagens = valores[4:8]
+        sref, cref, bref, xcg, ycg, zcg = valores[8:14]
+
+        pos = _CABECALHO.size
+        n_surf, = struct.unpack_from("<i", self._mm, pos)
+        pos += 4
+        superficies = []
+        for _ in range(n_surf):
+            sid, nome, comp = _SUPERFICIE.unpack_from(self._mm, pos)
+            nome = nome.split(b"\0", 1)[0].decode("latin-1")
+            superficies.append((sid, nome, comp))
+            pos += _SUPERFICIE.size
+        self._inicio = pos
+
+        return {
+            "model_type": modelo,
+            "symmetry": simetria,
+            "unsteady": nao_estacionario,
+            "n_loops": contagens[0],
+            "n_nodes": contagens[1],
+            "n_tris": contagens[2],
+            "n_edges": contagens[3],
+            "Sref": sref, "Cref": cref, "Bref": bref,
+            "Xcg": xcg, "Ycg": ycg, "Zcg": zcg,
+            "surfaces": superficies,
+        }
+
+    # ------------------------------------------------------------
+    # Acesso por caso (índice base 0, na ordem do .adb.cases)
+    # ------------------------------------------------------------
+    def _base(self, i):
+        if not 0 <= i < self.n_cases:
+            raise IndexError(f"caso {i} fora de 0..{self.n_cases - 1}")
+        return self._inicio + i * self._bloco
+
+    def _offset_solucao(self, i):
+        """Offset do cabeçalho da solução do caso i (Mach, alfa, beta, ...)."""
+        if i in self._offsets:
+            return self._offsets[i]
+
+        mach, aoa, beta = self.casos[i]
+        base = self._base(i)
+        fim = base + self._bloco
+        # A geometria do caso vem antes: começa a busca depois dela
+        pos = base + self.header["n_tris"] * TRI_DTYPE.itemsize + self.header["n_nodes"] * 12
+        alvo = struct.pack("<f", mach)
+
+        while True:
+            pos = self._mm.find(alvo, pos, fim)
+            if pos < 0:
+                raise RuntimeError(f"{self.path}: solução do caso {i + 1} "
+                                   f"(Mach {mach}, AoA {aoa}) não encontrada")
+            if pos % 4 == base % 4:
+                _, a, b, cpmin, cpmax = _CONDICAO.unpack_from(self._mm, pos)
+                if (abs(a - np.radians(aoa)) < 1e-5 and abs(b - np.radians(beta)) < 1e-5
+                        and cpmin < 0.0 < cpmax):
+                    self._offsets[i] = pos
+                    return pos
+            pos += 1
+
+    def tris(self, i):
+        """Triângulos do caso i (array estruturado TRI_DTYPE, view)."""
+        return np.frombuffer(self._mm, dtype=TRI_DTYPE, count=self.header["n_tris"],
+                             offset=self._base(i))
+
+    def nodes(self, i):
+        """Coordenadas dos nós do caso i, (n_nodes, 3) float32 (view)."""
+        n = self.header["n_nodes"]
+        pos = self._base(i) + self.header["n_tris"] * TRI_DTYPE.itemsize
+        return np.frombuffer(self._mm, dtype="<f4", count=3 * n, offset=pos).reshape(n, 3)
+
+    def condition(self, i):
+        """Mach, AoA e Beta (graus) e os limites de Cp (vácuo, estagnação)."""
+        mach, a, b, cpmin, cpmax = _CONDICAO.unpack_from(self._mm, self._offset_solucao(i))
+        return {"Mach": mach, "AoA": float(np.degrees(a)), "Beta": float(np.degrees(b)),
+                "CpMin": cpmin, "CpMax": cpmax}
+
+    def solution(self, i):
+        """Dados da solução do caso i após o cabeçalho, em float64 (view, bruto)."""
+        pos = self._offset_solucao(i) + _CONDICAO.size
+        fim = self._base(i) + self._bloco
+        return np.frombuffer(self._mm, dtype="<f8", count=(fim - pos) // 8, offset=pos)
+
+    def loop_data(self, i):
+        """Primeiro bloco da solução: (n_loops, 2) float64, Gamma de cada loop."""
+        n = self.header["n_loops"]
+        return self.solution(i)[:2 * n].reshape(n, 2)
+
+    def _offset_cp(self, i):
+        """Offset do bloco de solução por triângulo do caso i, conferido."""
+        if i in self._offsets_cp:
+            return self._offsets_cp[i]
+
+        h = self.header
+        if h["unsteady"]:
+            raise RuntimeError(f"{self.path}: .adb não-estacionário; layout de Cp "
+                               f"conferido só para casos estacionários")
+        pos = (self._offset_solucao(i) + _CONDICAO.size + 16 * h["n_loops"]
+               + 24 * (h["n_loops"] + h["n_edges"]))
+        fim = self._base(i) + self._bloco
+        if pos + h["n_tris"] * TRI_SOLUTION_DTYPE.itemsize > fim:
+            raise RuntimeError(f"{self.path}: bloco de Cp do caso {i + 1} passa do fim do "
+                               f"caso; layout de outra versão do VSPAERO")
+        sol = np.frombuffer(self._mm, dtype=TRI_SOLUTION_DTYPE, count=h["n_tris"], offset=pos)
+        esteira = self.tris(i)["surf_type"] == 0
+        if np.any(sol["Cp"][esteira] != 0.0) or not np.all(np.isfinite(sol["Cp"])):
+            raise RuntimeError(f"{self.path}: bloco de Cp do caso {i + 1} não confere "
+                               f"(Cp na esteira ou não finito); layout de outra versão do VSPAERO")
+        self._offsets_cp[i] = pos
+        return pos
+
+    def tri_solution(self, i):
+        """Solução por triângulo do caso i (array estruturado TRI_SOLUTION_DTYPE, view)."""
+        return np.frombuffer(self._mm, dtype=TRI_SOLUTION_DTYPE, count=self.header["n_tris"],
+                             offset=self._offset_cp(i))
+
+    def cp(self, i):
+        """Cp por triângulo do caso i, (n_tris,) float32 (view; zero na esteira)."""
+        return self.tri_solution(i)["Cp"]
+
+    def find_case(self, aoa, mach=None, beta=0.0):
+        """Índice do caso com o AoA (e Mach) pedido, pelo .adb.cases."""
+        for i, (m, a, b) in enumerate(self.casos):
+            if abs(a - aoa) < 1e-6 and abs(b - beta) < 1e-6 and (mach is None or abs(m - mach) < 1e-6):
+                return i
+        raise KeyError(f"caso AoA={aoa} Mach={mach} Beta={beta} não está em {self.path}")
+
+    # ------------------------------------------------------------
+    def close(self):
+        """Fecha o mmap. Views ainda vivas mantêm o mapeamento aberto."""
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass
+            self._mm = None
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def scan_adb(paths, fn):
+    """
+    Aplica fn(AdbFile) a cada .adb da lista, abrindo um de cada vez.
+    Retorna {path: resultado}. fn deve devolver valores copiados (não
+    views), para que cada mapeamento seja liberado antes do próximo.
+    """
+    resultados = {}
+    for p in paths:
+        if os.path.getsize(p) == 0:
+            continue
+        with AdbFile(p) as adb:
+            resultados[p] = fn(adb)
+    return resultados
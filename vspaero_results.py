@@ -0,0 +1,275 @@
+# ============================================================
+# vspaero_results.py
+# ------------------------------------------------------------
+# Leitura dos arquivos de resultado do VSPAERO (.history, .polar,
+# .lod) pelo nome das colunas.
+#
+#   - o cabeçalho (linha que começa por "Iter" no .history, por
+#     "Beta" no .polar) é lido uma vez e dá o nome de cada coluna;
+#     nomes de duas palavras ("L2 Residual", "Max Residual") viram
+#     um só ("L2_Residual", "Max_Residual")
+#   - as linhas de dados são carregadas numa passada só, direto para
+#     um array estruturado NumPy (campos = nomes das colunas)
+#   - .history com vários casos (blocos "Solver Case:") → um array
+#     por caso
+#   - modo "última linha": lê o arquivo de trás para frente, só o
+#     necessário para achar o último cabeçalho e a última linha
+#
+#   casos = read_history("cessna210.history")
+#   casos[0]["CLtot"]                  # CLtot a cada iteração do caso 1
+#   history_case_last_rows(path)["CDi"]  # CDi convergido de cada caso
+#   read_last_row(path)["CLtot"]       # último CLtot do arquivo
+#
+# .lod (carregamento ao longo da envergadura): read_lod() devolve, por
+# caso, os parâmetros do cabeçalho (Sref_, AoA_, ...) e um array por
+# VortexSheet (superfície); lod_metrics() tira dessas faixas o momento
+# fletor na raiz, a posição do pico de Cl e o CDi integrado nas faixas
+# (comparação com o CDi de Trefftz do .history). A eficiência de
+# envergadura das faixas (E_span_lod) é só diagnóstico: a do FCN usa o
+# CDi do .history.
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import os
+
+import numpy as np
+
+# Primeira coluna do cabeçalho de cada tipo de arquivo
+HISTORY_FIRST = "Iter"
+POLAR_FIRST = "Beta"
+LOD_FIRST = "Iter"
+
+# Colunas cujo nome ocupa duas palavras no cabeçalho
+_NOMES_COMPOSTOS = {("L2", "Residual"): "L2_Residual",
+                    ("Max", "Residual"): "Max_Residual"}
+
+
+def parse_header(tokens):
+    """Tokens da linha de cabeçalho → lista de nomes de coluna."""
+    nomes = []
+    i = 0
+    while i < len(tokens):
+        par = tuple(tokens[i:i + 2])
+        if par in _NOMES_COMPOSTOS:
+            nomes.append(_NOMES_COMPOSTOS[par])
+            i += 2
+        else:
+            nomes.append(tokens[i])
+            i += 1
+    return nomes
+
+
+def _is_case_marker(tokens):
+    return len(tokens) > 1 and tokens[0] == "Solver" and tokens[1] == "Case:"
+
+
+def _to_struct(linhas, nomes):
+    """Lista de listas de floats → array estruturado (um campo por coluna)."""
+    dtype = np.dtype([(n, np.float64) for n in nomes])
+    if not linhas:
+        return np.zeros(0, dtype=dtype)
+    a = np.ascontiguousarray(np.array(linhas, dtype=np.float64))
+    return a.view(dtype).reshape(len(linhas))
+
+
+def read_blocks(path, first_col):
+    """
+    Leitura completa: um array estruturado por bloco. Um bloco novo
+    começa a cada "Solver Case:"; arquivos sem esse marcador (.polar)
+    têm um bloco só.
+    """
+    blocos = []
+    nomes = None
+    atual = None
+
+    with open(path, "r") as f:
+        for ln in f:
+            partes = ln.split()
+            if not partes:
+                continue
+            if _is_case_marker(partes):
+                atual = []
+                blocos.append(atual)
+                continue
+            if partes[0] == first_col:
+                if nomes is None:
+                    nomes = parse_header(partes)
+                if atual is None:
+                    atual = []
+                    blocos.append(atual)
+                continue
+            if nomes is None or atual is None or len(partes) != len(nomes):
+                continue
+            try:
+                atual.append([float(p) for p in partes])
+            except ValueError:
+                continue
+
+    if nomes is None:
+        raise RuntimeError(f"Cabeçalho '{first_col} ...' não encontrado em {path}")
+    return [_to_struct(b, nomes) for b in blocos]
+
+
+def read_history(path):
+    """Um array estruturado por "Solver Case" (todas as iterações)."""
+    casos = read_blocks(path, HISTORY_FIRST)
+    if not any(len(c) for c in casos):
+        raise RuntimeError(f"Nenhum caso encontrado em {path}")
+    return casos
+
+
+def read_polar(path):
+    """Array estruturado com uma linha por caso do .polar."""
+    return np.concatenate(read_blocks(path, POLAR_FIRST))
+
+
+def history_case_last_rows(path):
+    """Última iteração de esteira de cada caso, como array (n_casos,)."""
+    return np.concatenate([c[-1:] for c in read_history(path)])
+
+
+def read_last_row(path, first_col=HISTORY_FIRST, chunk=64 * 1024):
+    """
+    Última linha de dados do arquivo, lendo de trás para frente em
+    blocos de 'chunk' bytes até encontrar o último cabeçalho.
+    Retorna um registro (np.void) com os campos do cabeçalho.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        fim = f.tell()
+        pos = fim
+        while True:
+            pos = max(0, pos - chunk)
+            f.seek(pos)
+            texto = f.read(fim - pos)
+            linhas = texto.decode("latin-1").splitlines()
+            if pos > 0:
+                linhas = linhas[1:]       # primeira linha pode estar cortada
+
+            ultimo = None
+            for ln in reversed(linhas):
+                partes = ln.split()
+                if not partes:
+                    continue
+                if partes[0] == first_col:
+                    nomes = parse_header(partes)
+                    if ultimo is None or len(ultimo) != len(nomes):
+                        raise RuntimeError(f"Nenhuma linha de dados após o último "
+                                           f"cabeçalho em {path}")
+                    return _to_struct([[float(p) for p in ultimo]], nomes)[0]
+                if ultimo is None:
+                    try:
+                        [float(p) for p in partes]
+                        ultimo = partes
+                    except ValueError:
+                        pass
+
+            if pos == 0:
+                raise RuntimeError(f"Nenhuma linha de dados após '{first_col} ...' em {path}")
+
+
+# ============================================================
+# .lod
+# ============================================================
+def read_lod(path):
+    """
+    Lê o .lod. Retorna uma lista (um item por caso) de dicionários:
+        {"params": {"Sref_": ..., "AoA_": ..., ...},
+         "sheets": {1: array estruturado das faixas, 2: ...}}
+    """
+    casos = []
+    nomes = None
+    atual = None
+    linhas = []
+
+    def fecha():
+        if atual is None:
+            return
+        dados = _to_struct(linhas, nomes) if nomes else None
+        if dados is not None and len(dados):
+            ids = dados["VortexSheet"].astype(int)
+            atual["sheets"] = {int(k): dados[ids == k] for k in np.unique(ids)}
+        casos.append(atual)
+
+    with open(path, "r") as f:
+        for ln in f:
+            partes = ln.split()
+            if not partes:
+                continue
+            if partes[0] == "#" and len(partes) > 1 and partes[1] == "Name":
+                fecha()
+                atual, linhas = {"params": {}, "sheets": {}}, []
+                continue
+            if partes[0] == LOD_FIRST:
+                if nomes is None:
+                    nomes = parse_header(partes)
+                continue
+            if atual is None:
+                continue
+            if nomes is not None and len(partes) == len(nomes):
+                try:
+                    linhas.append([float(p) for p in partes])
+                    continue
+                except ValueError:
+                    pass
+            if len(partes) >= 2 and not linhas:
+                try:
+                    atual["params"][partes[0]] = float(partes[1])
+                except ValueError:
+                    pass
+    fecha()
+
+    if not casos:
+        raise RuntimeError(f"Nenhum caso encontrado em {path}")
+    return casos
+
+
+def lod_metrics(caso, sref=None, bref=None, symmetric=False):
+    """
+    Métricas de um caso do .lod (faixas de todas as superfícies):
+
+      CL_lod    : sum(Cl dArea) / Sref
+      CDi_lod   : sum(Cdi dArea) / Sref (integração na superfície)
+      E_span_lod: CL_lod² / (pi AR CDi_lod), com o CDi das faixas (não o
+                  de Trefftz)
+      CRBM      : momento fletor na raiz / (q Sref Bref), média das duas
+                  semi-asas, em torno de y = 0
+      Y_ClMax   : |y| da faixa com maior Cl local
+      Eta_ClMax : Y_ClMax / (Bref/2)
+
+    Sref e Bref padrão: os do cabeçalho do caso (Sref_, Bref_).
+    symmetric: solve de meia asa (só as faixas de y >= 0 no .lod); as
+    integrais usam metade de Sref.
+    """
+    sref = sref or caso["params"]["Sref_"]
+    bref = bref or caso["params"]["Bref_"]
+    faixas = np.concatenate(list(caso["sheets"].values()))
+    s_int = 0.5 * sref if symmetric else sref
+
+    y = faixas["Yavg"]
+    dA = faixas["dArea"]
+    cl = faixas["Cl"]
+
+    cl_lod = float(np.sum(cl * dA) / s_int)
+    cdi_lod = float(np.sum(faixas["Cdi"] * dA) / s_int)
+    ar = bref ** 2 / sref
+    e_span = cl_lod ** 2 / (np.pi * ar * cdi_lod) if cdi_lod > 0.0 else np.nan
+
+    # Momento de cada semi-asa em torno da linha de simetria
+    momento = cl * dA * np.abs(y)
+    lados = [momento[y > 0.0].sum(), momento[y < 0.0].sum()]
+    lados = [m for m in lados if m != 0.0] or [0.0]
+    crbm = float(np.mean(lados) / (sref * bref))
+
+    i = int(np.argmax(cl))
+    y_max = float(abs(y[i]))
+
+    return {
+        "CL_lod": cl_lod,
+        "CDi_lod": cdi_lod,
+        "E_span_lod": float(e_span),
+        "CRBM": crbm,
+        "Y_ClMax": y_max,
+        "Eta_ClMax": y_max / (0.5 * bref),
+    }
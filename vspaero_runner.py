@@ -0,0 +1,260 @@
+# ============================================================
+# vspaero_runner.py
+# ------------------------------------------------------------
+# Backend que roda o executável vspaero como subprocesso, em vez
+# de vsp.ExecAnalysis("VSPAEROSweep") dentro do interpretador.
+#
+#   - o arquivo de caso (<stem>.vspaero) é gerado a partir de um
+#     template (cessna210.vspaero: Sref, Cref, Mach, AoA, NumWakeNodes,
+#     WakeIters, ...) trocando só as chaves pedidas
+#   - o solver roda com "-omp NCPU"; código de saída, tempo de parede
+#     e log (<stem>.vspaero.log) ficam registrados no SolveResult
+#   - vários solves podem rodar ao mesmo tempo com asyncio, com um
+#     limite de concorrência (solve_many / run_many)
+#   - timeout com kill do processo, o que a API não permite
+#   - parada antecipada: um monitor (history_monitor.py) lê o .history
+#     durante o solve e o processo é morto quando os coeficientes do
+#     último caso convergem
+#
+# A geometria (<stem>.vspgeom) vem do VSPAEROComputeGeometry ou, com
+# GEOMETRY_MODE="morph" no FCN, da malha base deformada (vspgeom_morph.py).
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import asyncio
+import numbers
+import os
+import shutil
+import subprocess
+import time
+
+# Executável do VSPAERO (variável de ambiente VSPAERO_EXE tem prioridade)
+VSPAERO_EXE = os.environ.get(
+    "VSPAERO_EXE",
+    shutil.which("vspaero") or r"C:\VSP\OpenVSP\OpenVSP-3.45.2-win64\vspaero.exe",
+)
+
+
+# ============================================================
+# Template do arquivo de caso .vspaero
+# ============================================================
+class CaseTemplate:
+    """
+    Arquivo .vspaero lido uma vez e mantido em memória.
+
+    Linhas "Chave = valor" viram entradas editáveis; as demais linhas
+    (p.ex. a tabela das QuadTrees) são copiadas sem alteração.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.linhas = []          # ("kv", chave, valor) ou ("raw", texto)
+        with open(path, "r") as f:
+            for ln in f:
+                ln = ln.rstrip("\r\n")
+                if "=" in ln:
+                    chave, valor = ln.split("=", 1)
+                    self.linhas.append(("kv", chave.strip(), valor.strip()))
+                else:
+                    self.linhas.append(("raw", ln))
+
+    def keys(self):
+        return [l[1] for l in self.linhas if l[0] == "kv"]
+
+    def get(self, chave):
+        for l in self.linhas:
+            if l[0] == "kv" and l[1] == chave:
+                return l[2]
+        return None
+
+    def render(self, **valores):
+        """Texto do arquivo de caso com as chaves de 'valores' substituídas."""
+        faltando = set(valores) - set(self.keys())
+        if faltando:
+            raise KeyError(f"Chaves ausentes no template {self.path}: {sorted(faltando)}")
+
+        saida = []
+        for l in self.linhas:
+            if l[0] == "kv":
+                valor = valores.get(l[1], l[2])
+                saida.append(f"{l[1]} = {_format_value(valor)} ")
+            else:
+                saida.append(l[1])
+        return "\n".join(saida) + "\n"
+
+    def write(self, path, **valores):
+        with open(path, "w") as f:
+            f.write(self.render(**valores))
+        return path
+
+
+def _format_value(valor):
+    """Formata como o OpenVSP: floats com 6 casas, listas separadas por vírgula."""
+    if isinstance(valor, str):
+        return valor
+    if isinstance(valor, (list, tuple)) or hasattr(valor, "__len__"):
+        return ", ".join(_format_value(v) for v in valor)
+    if isinstance(valor, numbers.Integral):
+        return str(valor)
+    return f"{float(valor):f}"
+
+
+_TEMPLATES = {}
+
+
+def get_template(path):
+    """Template em cache por processo."""
+    if path not in _TEMPLATES:
+        _TEMPLATES[path] = CaseTemplate(path)
+    return _TEMPLATES[path]
+
+
+# ============================================================
+# Execução do solver
+# ============================================================
+class SolveResult:
+    """Resultado de uma execução do vspaero."""
+
+    def __init__(self, stem, run_dir, cmd, returncode, wall_time, timed_out=False,
+                 stopped_early=False):
+        self.stem = stem
+        self.run_dir = run_dir
+        self.cmd = cmd
+        self.returncode = returncode
+        self.wall_time = wall_time
+        self.timed_out = timed_out
+        self.stopped_early = stopped_early   # morto pelo monitor após convergir
+
+    @property
+    def ok(self):
+        return (self.returncode == 0 or self.stopped_early) and not self.timed_out
+
+    @property
+    def history(self):
+        return os.path.join(self.run_dir, self.stem + ".history")
+
+    @property
+    def log(self):
+        return os.path.join(self.run_dir, self.stem + ".vspaero.log")
+
+    def check(self):
+        """Lança RuntimeError se o solver falhou ou estourou o tempo."""
+        if self.timed_out:
+            raise RuntimeError(f"vspaero excedeu o tempo ({self.wall_time:.1f} s): {self.stem}")
+        if not self.ok:
+            raise RuntimeError(f"vspaero terminou com código {self.returncode} "
+                               f"({self.stem}); ver {self.log}")
+        return self
+
+    def __repr__(self):
+        return (f"SolveResult({self.stem!r}, rc={self.returncode}, "
+                f"t={self.wall_time:.2f}s, timeout={self.timed_out}, "
+                f"parada={self.stopped_early})")
+
+
+def build_command(stem, ncpu=4, exe=None, extra_args=()):
+    """Linha de comando do vspaero para o caso <stem> (sem extensão)."""
+    return [exe or VSPAERO_EXE, "-omp", str(int(ncpu)), *extra_args, stem]
+
+
+def run_vspaero(stem, run_dir, ncpu=4, timeout=None, exe=None, extra_args=(),
+                monitor=None, poll_s=0.05):
+    """
+    Roda o vspaero de forma síncrona. Retorna SolveResult.
+
+    monitor: chamável sem argumentos consultado a cada poll_s segundos
+    enquanto o solver roda; se retornar True o processo é morto e o
+    resultado marcado como stopped_early.
+    """
+    cmd = build_command(stem, ncpu, exe, extra_args)
+    log_path = os.path.join(run_dir, stem + ".vspaero.log")
+
+    if monitor is not None:
+        return _run_monitored(stem, run_dir, cmd, log_path, timeout, monitor, poll_s)
+
+    t0 = time.perf_counter()
+    with open(log_path, "w") as log:
+        try:
+            proc = subprocess.run(cmd, cwd=run_dir, stdout=log,
+                                  stderr=subprocess.STDOUT, timeout=timeout)
+            rc, timed_out = proc.returncode, False
+        except subprocess.TimeoutExpired:
+            # subprocess.run já matou o processo
+            rc, timed_out = None, True
+    return SolveResult(stem, run_dir, cmd, rc, time.perf_counter() - t0, timed_out)
+
+
+def _run_monitored(stem, run_dir, cmd, log_path, timeout, monitor, poll_s):
+    """run_vspaero com Popen: espera o processo consultando o monitor."""
+    t0 = time.perf_counter()
+    rc, timed_out, parou = None, False, False
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen(cmd, cwd=run_dir, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            while True:
+                try:
+                    rc = proc.wait(timeout=poll_s)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                if monitor():
+                    parou = True
+                    break
+                if timeout is not None and time.perf_counter() - t0 > timeout:
+                    timed_out = True
+                    break
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+    return SolveResult(stem, run_dir, cmd, rc, time.perf_counter() - t0,
+                       timed_out, stopped_early=parou)
+
+
+async def run_vspaero_async(stem, run_dir, ncpu=4, timeout=None, exe=None, extra_args=()):
+    """Versão assíncrona: o processo é morto se passar de 'timeout'."""
+    cmd = build_command(stem, ncpu, exe, extra_args)
+    log_path = os.path.join(run_dir, stem + ".vspaero.log")
+
+    t0 = time.perf_counter()
+    with open(log_path, "w") as log:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, cwd=run_dir, stdout=log, stderr=asyncio.subprocess.STDOUT)
+        try:
+            rc = await asyncio.wait_for(proc.wait(), timeout)
+            timed_out = False
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            rc, timed_out = None, True
+        except asyncio.CancelledError:
+            proc.kill()
+            await proc.wait()
+            raise
+    return SolveResult(stem, run_dir, cmd, rc, time.perf_counter() - t0, timed_out)
+
+
+async def run_many(jobs, max_concurrent=4, ncpu=4, timeout=None, exe=None):
+    """
+    Roda vários casos ao mesmo tempo, no máximo 'max_concurrent' por vez.
+    jobs: lista de (stem, run_dir). Retorna SolveResults na mesma ordem.
+    """
+    sem = asyncio.Semaphore(max_concurrent)
+
+    async def um(stem, run_dir):
+        async with sem:
+            return await run_vspaero_async(stem, run_dir, ncpu, timeout, exe)
+
+    return await asyncio.gather(*(um(stem, d) for stem, d in jobs))
+
+
+def solve_many(jobs, max_concurrent=4, ncpu=4, timeout=None, exe=None):
+    """Atalho síncrono para run_many."""
+    return asyncio.run(run_many(jobs, max_concurrent, ncpu, timeout, exe))
+
+
+def write_case(template_path, run_dir, stem, **valores):
+    """Gera <run_dir>/<stem>.vspaero a partir do template."""
+    return get_template(template_path).write(
+        os.path.join(run_dir, stem + ".vspaero"), **valores)
@@ -0,0 +1,213 @@
+# ============================================================
+# vspaero_slices.py
+# ------------------------------------------------------------
+# Leitura em fluxo das saídas de pressão em texto do VSPAERO:
+#
+#   .cuts                  definição dos cortes ("y 0.000000", ...)
+#   .slc                   Cp nos cortes: blocos "BLOCK Cut_k_at_Y:..."
+#                          com linhas "x y z Cp", um bloco por
+#                          (caso, corte)
+#   .case.N.quad.M.dat     levantamento fora do corpo (quadtree) do
+#                          caso N no quadrante M: nós "id x y z u v w Cp"
+#                          seguidos dos quadriláteros "id n1 n2 n3 n4"
+#
+#   - os parsers são geradores: um bloco (ou um arquivo .quad.dat)
+#     por vez, já em float32, sem manter o arquivo inteiro na memória
+#   - o .slc escreve cada ponto do corte duas vezes seguidas;
+#     as repetições consecutivas são removidas
+#   - export_npz() grava tudo num único .npz compactado, escrevendo
+#     cada array assim que é lido
+#
+#   for caso, corte, cond, xyzcp in iter_slc("cessna210.slc"):
+#       ...                               # xyzcp: (n, 4) float32
+#   export_npz("pressoes.npz", ["artefatos/cessna_w123_00017_best"])
+#   np.load("pressoes.npz")["cessna210/slc/case1/cut1"]
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import glob
+import os
+import re
+import zipfile
+
+import numpy as np
+
+QUAD_NODE_FIELDS = ("x", "y", "z", "u", "v", "w", "Cp")
+
+_RE_CORTE = re.compile(r"BLOCK\s+Cut_(\d+)_at_")
+_RE_QUAD = re.compile(r"\.case\.(-?\d+)\.quad\.(\d+)\.dat$")
+
+
+def dedupe_rows(a):
+    """Remove linhas iguais à anterior (repetições consecutivas)."""
+    if len(a) < 2:
+        return a
+    manter = np.ones(len(a), dtype=bool)
+    manter[1:] = np.any(a[1:] != a[:-1], axis=1)
+    return a[manter]
+
+
+def read_cuts(path):
+    """Lê o .cuts → lista de (eixo, posição)."""
+    cortes = []
+    with open(path, "r") as f:
+        n = int(f.readline().split()[0])
+        for _ in range(n):
+            eixo, valor = f.readline().split()[:2]
+            cortes.append((eixo, float(valor)))
+    return cortes
+
+
+def _condicao(partes):
+    """'Case: 1 ... Mach: 0.3 ... Alpha: 0.0 ... Beta: 0.0 ...' → dict."""
+    cond = {}
+    for i, p in enumerate(partes[:-1]):
+        if p.endswith(":") and p[:-1] in ("Case", "Mach", "Alpha", "Beta") and p[:-1] not in cond:
+            try:
+                cond[p[:-1]] = float(partes[i + 1])
+            except ValueError:
+                pass
+    return cond
+
+
+def iter_slc(path, dedupe=True):
+    """
+    Gera (caso, corte, condição, array (n, 4) float32 [x, y, z, Cp]) para
+    cada bloco do .slc, na ordem do arquivo.
+    """
+    corte = None
+    cond = {}
+    linhas = []
+
+    def bloco():
+        a = np.array(linhas, dtype=np.float32).reshape(-1, 4)
+        return (int(cond.get("Case", 0)), corte, dict(cond),
+                dedupe_rows(a) if dedupe else a)
+
+    with open(path, "r") as f:
+        for ln in f:
+            partes = ln.split()
+            if not partes:
+                continue
+            if partes[0] == "BLOCK":
+                if corte is not None:
+                    yield bloco()
+                m = _RE_CORTE.match(ln.strip())
+                corte = int(m.group(1)) if m else (corte or 0) + 1
+                cond, linhas = {}, []
+                continue
+            if partes[0] == "Case:":
+                cond = _condicao(partes)
+                continue
+            if corte is None or len(partes) != 4:
+                continue
+            try:
+                linhas.append([float(p) for p in partes])
+            except ValueError:
+                continue                  # cabeçalho "x y z Cp"
+    if corte is not None:
+        yield bloco()
+
+
+def read_quad_dat(path):
+    """
+    Lê um .case.N.quad.M.dat:
+        {"header": 4 valores da 1ª linha,
+         "nodes": (n_nós, 7) float32 [x y z u v w Cp],
+         "quads": (n_quads, 4) int32 (nós base 1)}
+    """
+    with open(path, "r") as f:
+        cabecalho = np.array(f.readline().split(), dtype=np.float32)
+        n_nos, n_quads = (int(v) for v in f.readline().split()[:2])
+        nos = np.loadtxt(f, dtype=np.float32, max_rows=n_nos, ndmin=2)
+        quads = np.loadtxt(f, dtype=np.int32, max_rows=n_quads, ndmin=2)
+    return {"header": cabecalho, "nodes": nos[:, 1:], "quads": quads[:, 1:]}
+
+
+def iter_quad(run_dir, stem):
+    """Gera (caso, quadrante, dados) para cada stem.case.N.quad.M.dat de run_dir."""
+    arquivos = []
+    for p in glob.glob(os.path.join(run_dir, glob.escape(stem) + ".case.*.quad.*.dat")):
+        m = _RE_QUAD.search(p)
+        if m:
+            arquivos.append((int(m.group(1)), int(m.group(2)), p))
+    for caso, quad, p in sorted(arquivos):
+        yield caso, quad, read_quad_dat(p)
+
+
+# ============================================================
+# Exportação para .npz
+# ============================================================
+class _NpzWriter:
+    """Escreve arrays um a um num .npz compactado (formato do np.savez)."""
+
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def add(self, nome, a):
+        with self._zip.open(nome + ".npy", "w", force_zip64=True) as f:
+            np.lib.format.write_array(f, np.asanyarray(a), allow_pickle=False)
+
+    def close(self):
+        self._zip.close()
+
+
+def _stems(run_dir):
+    """Stems com saídas de pressão em run_dir (pelo .slc, .cuts ou quad .dat)."""
+    stems = set()
+    for nome in os.listdir(run_dir):
+        m = _RE_QUAD.search(nome)
+        if m:
+            stems.add(nome[:m.start()])
+        elif nome.endswith((".slc", ".cuts")):
+            stems.add(os.path.splitext(nome)[0])
+    return sorted(stems)
+
+
+def export_npz(out_path, run_dirs, dedupe=True):
+    """
+    Converte as saídas de pressão de cada pasta de run_dirs para um
+    único .npz compactado. Chaves:
+
+        <pasta>/<stem>/cuts                 (n_cortes,) posição dos cortes
+        <pasta>/<stem>/slc/caseN/cutK       (n, 4) x y z Cp
+        <pasta>/<stem>/slc/conditions       (n_casos, 4) caso Mach Alpha Beta
+        <pasta>/<stem>/quad/caseN/quadM/nodes|quads|header
+
+    <pasta> é o nome da pasta (omitido quando há uma pasta só).
+    Retorna o número de arrays gravados.
+    """
+    run_dirs = [run_dirs] if isinstance(run_dirs, str) else list(run_dirs)
+    w = _NpzWriter(out_path)
+    n = 0
+    try:
+        for run_dir in run_dirs:
+            pasta = os.path.basename(os.path.normpath(run_dir))
+            for stem in _stems(run_dir):
+                base = f"{stem}" if len(run_dirs) == 1 else f"{pasta}/{stem}"
+                p = os.path.join(run_dir, stem)
+
+                if os.path.exists(p + ".cuts"):
+                    w.add(f"{base}/cuts", np.array([v for _, v in read_cuts(p + ".cuts")],
+                                                   dtype=np.float32))
+                    n += 1
+
+                if os.path.exists(p + ".slc"):
+                    conds = {}
+                    for caso, corte, cond, a in iter_slc(p + ".slc", dedupe=dedupe):
+                        w.add(f"{base}/slc/case{caso}/cut{corte}", a)
+                        conds[caso] = [caso, cond.get("Mach", np.nan),
+                                       cond.get("Alpha", np.nan), cond.get("Beta", np.nan)]
+                        n += 1
+                    w.add(f"{base}/slc/conditions",
+                          np.array([conds[c] for c in sorted(conds)], dtype=np.float32).reshape(-1, 4))
+                    n += 1
+
+                for caso, quad, dados in iter_quad(run_dir, stem):
+                    for campo, a in dados.items():
+                        w.add(f"{base}/quad/case{caso}/quad{quad}/{campo}", a)
+                        n += 1
+    finally:
+        w.close()
+    return n
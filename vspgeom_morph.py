@@ -0,0 +1,367 @@
+# ============================================================
+# vspgeom_morph.py
+# ------------------------------------------------------------
+# Morphing direto da malha do VSPAERO (.vspgeom) para as variáveis
+# de planta do PSO, sem regenerar a geometria no OpenVSP
+# (VSPAEROComputeGeometry).
+#
+#   - o cessna210.vspgeom é lido uma vez por processo: só o bloco de
+#     coordenadas dos nós muda com o projeto; conectividade, tags e
+#     coordenadas paramétricas (u, v) são copiadas como texto
+#   - o painel do OpenVSP é regrado: um nó na estação eta é
+#       P(eta) = (1 - eta) * R + eta * T
+#     com R e T os pontos de mesma posição no perfil da raiz e da ponta.
+#     Os perfis da raiz e da ponta são diferentes (espessura, arqueamento),
+#     então cada nó guarda os dois pontos, em coordenadas normalizadas
+#     pela corda da sua seção:
+#       eta       = |y| / Span              (posição na semi-envergadura)
+#       xi, zeta  = (x - x_BA, z - z_raiz) / corda, na raiz e na ponta
+#     R e T saem do ajuste linear em eta de cada linha de nós da malha
+#     base (mesma posição no perfil em todas as estações internas)
+#   - o projeto x reconstrói os nós com NumPy vetorizado: esticamento
+#     em y, cordas da raiz e da ponta, enflechamento (Sweep na
+#     Sweep_Location) e torção do perfil da ponta em torno da
+#     Twist_Location; os nós internos saem da combinação linear acima
+#   - a tesselagem (número de estações e pontos por perfil) não muda,
+#     então a ordem dos nós é a mesma da malha regenerada e as duas
+#     podem ser comparadas nó a nó (compare_meshes)
+#
+#   morph = get_morph("cessna210.vspgeom", "cessna210.vsp3")
+#   morph.write_geometry(run_dir, "cessna_updated", x)   # .vspgeom + .vkey + .csf
+#   compare_meshes(morph.nodes(x), read_vspgeom_nodes("regenerado.vspgeom"))
+#
+# Precisão contra malhas regeneradas pelo OpenVSP: ~1e-8 ft (o arredondamento
+# do .vspgeom) no mach_sweep (taper 0.75, twist -2) e no cessna_updated.
+#
+# Limitações: asa de um painel (XSec_1) sem diedro. Se as estações
+# internas de um lado não tiverem todas o mesmo número de nós, esse lado
+# volta à escala pela corda local (perfil único entre raiz e ponta), com
+# erro da ordem de c/4 · |Δ(corda/corda base)| · |Δ perfil raiz-ponta|
+# (0.02 ft no mach_sweep); GEOMETRY_MODE="validar" mede o erro.
+#
+# Autor: Gregori da Maia da Silva
+# ============================================================
+
+import os
+import shutil
+
+import numpy as np
+
+from planform import planform_from_x
+from vsp3_template import get_vsp3_template
+
+# Formato das coordenadas no .vspgeom (igual ao OpenVSP)
+_FMT_NO = "%16.10g %16.10g %16.10g\n"
+
+
+def read_vspgeom(path):
+    """
+    Lê um .vspgeom → (cabeçalho, nós (n, 3) float64, resto do arquivo).
+    Cabeçalho e resto são o texto original (conectividade, tags, u/v).
+    """
+    with open(path, "r", newline="") as f:
+        cabecalho = [f.readline() for _ in range(3)]
+        if not cabecalho[0].lower().startswith("# vspgeom"):
+            raise RuntimeError(f"{path} não é um .vspgeom")
+        n_nos = int(cabecalho[2].split()[0])
+        linhas = [f.readline() for _ in range(n_nos)]
+        resto = f.read()
+    nos = np.array([ln.split()[:3] for ln in linhas], dtype=np.float64)
+    if nos.shape != (n_nos, 3):
+        raise RuntimeError(f"{path}: bloco de nós incompleto")
+    return "".join(cabecalho), nos, resto
+
+
+def read_vspgeom_nodes(path):
+    """Só as coordenadas dos nós de um .vspgeom, (n, 3) float64."""
+    return read_vspgeom(path)[1]
+
+
+def write_vkey(src, dst, vspgeom_path):
+    """Copia um .vkey trocando o caminho do .vspgeom (2ª linha)."""
+    with open(src, "r", newline="") as f:
+        linhas = f.readlines()
+    if len(linhas) > 1:
+        fim = linhas[1][len(linhas[1].rstrip("\r\n")):]
+        linhas[1] = os.path.abspath(vspgeom_path) + fim
+    with open(dst, "w", newline="") as f:
+        f.writelines(linhas)
+
+
+def _troca_primeiro(ln, novo):
+    """Troca o primeiro campo de uma linha, mantendo o resto do texto."""
+    campo = ln.split(None, 1)[0]
+    return str(novo) + ln[ln.index(campo) + len(campo):]
+
+
+def half_mesh(cabecalho, nos, resto, y0=0.0, tol=1e-9):
+    """
+    Meia malha (y >= y0) para o solve com simetria no plano x-z.
+
+    Mantém os nós com y >= y0 - tol e as faces com todos os nós
+    mantidos; renumera nós e faces em todas as seções do arquivo
+    (faces, u/v, faces de origem, bordos de fuga das esteiras e
+    triangulação com u/v).
+    Retorna (cabeçalho, máscara dos nós mantidos, resto), no formato de
+    read_vspgeom().
+    """
+    manter = nos[:, 1] >= y0 - tol
+    novo_no = np.cumsum(manter)                  # número novo (base 1) dos nós mantidos
+
+    linhas = resto.splitlines()
+    nf = int(linhas[0].split()[0])
+    faces, uv, tags = linhas[1:1 + nf], linhas[1 + nf:1 + 2 * nf], linhas[1 + 2 * nf:1 + 3 * nf]
+    i = 1 + 3 * nf
+
+    # Esteiras: "n tipo" + n nós do bordo de fuga, 10 por linha
+    esteiras = []
+    for _ in range(int(linhas[i].split()[0])):
+        i += 1
+        campos = linhas[i].split()
+        n, tipo, ids = int(campos[0]), campos[1], campos[2:]
+        while len(ids) < n:
+            i += 1
+            ids += linhas[i].split()
+        esteiras.append((tipo, [int(v) for v in ids]))
+    i += 1
+    tri, tri_uv, fim = linhas[i:i + nf], linhas[i + nf:i + 2 * nf], linhas[i + 2 * nf:]
+
+    novas = {}                                   # face antiga (base 1) → nova
+    saida_faces = []
+    for k, ln in enumerate(faces):
+        ids = [int(v) for v in ln.split()]
+        if all(manter[j - 1] for j in ids[1:]):
+            novas[k + 1] = len(novas) + 1
+            saida_faces.append(" ".join([str(ids[0])] + [str(novo_no[j - 1]) for j in ids[1:]]))
+
+    def por_face(bloco, nos_a_partir=None):
+        saida = []
+        for ln in bloco:
+            campos = ln.split()
+            face = int(campos[0])
+            if face not in novas:
+                continue
+            if nos_a_partir is None:
+                saida.append(_troca_primeiro(ln, novas[face]))
+            else:
+                c = nos_a_partir
+                saida.append(" ".join([str(novas[face])] + campos[1:c] +
+                                      [str(novo_no[int(v) - 1]) for v in campos[c:]]))
+        return saida
+
+    # u/v por face ("parte tag u1 v1 ...") na ordem das faces, sem número
+    saida = [str(len(novas))] + saida_faces
+    saida += [ln for k, ln in enumerate(uv) if k + 1 in novas]
+    # "face face_de_origem": as duas colunas são números de face
+    for ln in tags:
+        a, b = (int(v) for v in ln.split()[:2])
+        if a in novas:
+            saida.append(f"{novas[a]} {novas.get(b, b)}")
+
+    saida.append(str(len(esteiras)))
+    for tipo, ids in esteiras:
+        ids = [str(novo_no[j - 1]) for j in ids if manter[j - 1]]
+        campos = [str(len(ids)), tipo] + ids
+        saida.append(" ".join(campos[:12]))
+        saida += [" ".join(ids[k:k + 10]) for k in range(10, len(ids), 10)]
+
+    saida += por_face(tri, nos_a_partir=2) + por_face(tri_uv) + fim
+
+    ln3 = cabecalho.splitlines(keepends=True)
+    campos = ln3[2].split()
+    ln3[2] = " ".join([str(int(manter.sum())), str(len(novas))] + campos[2:]) + "\n"
+    return "".join(ln3), manter, "\n".join(saida) + "\n"
+
+
+def write_half_vspgeom(src, dst, y0=0.0):
+    """
+    Grava em dst a meia malha (y >= y0) do .vspgeom src. dst pode ser o
+    próprio src: o arquivo é trocado (os.replace), sem gravar por cima de
+    um link para o cache de geometria.
+    """
+    cabecalho, nos, resto = read_vspgeom(src)
+    cabecalho, manter, resto = half_mesh(cabecalho, nos, resto, y0)
+    tmp = dst + ".tmp"
+    with open(tmp, "w", newline="") as f:
+        f.write(cabecalho + "".join(_FMT_NO % tuple(p) for p in nos[manter].tolist()) + resto)
+    os.replace(tmp, dst)
+    return dst
+
+
+def compare_meshes(a, b):
+    """
+    Diferença nó a nó entre duas malhas com a mesma numeração:
+        {"n", "max", "rms", "no_max"} (distâncias em unidades do modelo)
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if a.shape != b.shape:
+        raise ValueError(f"malhas com tamanhos diferentes: {a.shape} x {b.shape}")
+    d = np.linalg.norm(a - b, axis=1)
+    return {"n": len(d), "max": float(d.max()), "rms": float(np.sqrt(np.mean(d ** 2))),
+            "no_max": int(d.argmax()) + 1}
+
+
+class VSPGeomMorph:
+    """
+    Malha base do VSPAERO em memória, deformável pelo vetor do PSO.
+
+    vspgeom_file : malha da asa base (gerada pelo VSPAEROComputeGeometry)
+    vsp3_file    : modelo que gerou a malha (planta e posição da asa)
+    """
+
+    def __init__(self, vspgeom_file, vsp3_file):
+        self.vspgeom_file = vspgeom_file
+        self._cabecalho, self.base_nodes, self._resto = read_vspgeom(vspgeom_file)
+
+        tpl = get_vsp3_template(vsp3_file)
+        b = tpl.base
+        if abs(b.get("Dihedral", 0.0)) > 1e-9:
+            raise RuntimeError(f"{vsp3_file}: morphing da malha supõe asa sem diedro")
+        self.origin = tpl.origin
+        self.sweep_loc = b.get("Sweep_Location", 0.0)
+        self.twist_loc = b.get("Twist_Location", 0.25)
+        self._base = b
+
+        # Coordenadas do painel base de cada nó e o lado
+        x0, y0, z0 = self.origin
+        x, y, z = self.base_nodes.T
+        dy = y - y0
+        self._lado = np.where(dy < 0.0, -1.0, 1.0)
+        self._eta = np.clip(np.abs(dy) / b["Span"], 0.0, 1.0)
+        self._raiz, self._ponta = self._perfis(x, z)
+        self._meia = None             # topologia da meia malha (half_mesh), sob demanda
+
+    # ------------------------------------------------------------
+    def _bordos(self, span, croot, ctip, sweep):
+        """Bordo de ataque na raiz e na ponta."""
+        x0 = self.origin[0]
+        return x0, x0 + self.sweep_loc * (croot - ctip) + span * np.tan(np.radians(sweep))
+
+    def _gira(self, xi, zeta, twist):
+        """
+        Torção twist (graus, positiva cabrando) de pontos (xi, zeta) de um
+        perfil normalizado, em torno da Twist_Location (twist escalar ou
+        um valor por ponto).
+        """
+        if np.all(np.asarray(twist) == 0.0):
+            return xi, zeta
+        t = np.radians(twist)
+        dx = xi - self.twist_loc
+        return (self.twist_loc + dx * np.cos(t) + zeta * np.sin(t),
+                -dx * np.sin(t) + zeta * np.cos(t))
+
+    def _perfis(self, x, z):
+        """
+        Pontos (xi, zeta) da raiz e da ponta de cada nó da malha base.
+        Nós internos: ajuste linear em eta da linha de nós de mesma posição
+        no perfil; nós da raiz e da ponta (e o fechamento da ponta): o
+        próprio nó.
+        """
+        b = self._base
+        z0 = self.origin[2]
+        xle_r, xle_t = self._bordos(b["Span"], b["Root_Chord"], b["Tip_Chord"], b["Sweep"])
+
+        # Estações internas: mesma ordem dos nós ao longo do perfil
+        pr_x, pr_z = x.copy(), z.copy()           # ponto da raiz
+        pt_x, pt_z = x.copy(), z.copy()           # ponto da ponta (com a torção base)
+        eta = np.round(self._eta, 9)
+        com_linha = np.zeros(len(x), dtype=bool)
+        for lado in (-1.0, 1.0):
+            internos = np.flatnonzero((self._lado == lado) & (eta > 0.0) & (eta < 1.0))
+            estacoes = {}
+            for i in internos:
+                estacoes.setdefault(eta[i], []).append(i)
+            if len(estacoes) < 2 or len({len(v) for v in estacoes.values()}) != 1:
+                # Sem linhas de nós: perfil único escalado pela corda local
+                continue
+            e = np.array(sorted(estacoes))
+            linhas = np.array([estacoes[k] for k in e])          # (estações, nós do perfil)
+            A = np.column_stack((1.0 - e, e))
+            cx = np.linalg.lstsq(A, x[linhas], rcond=None)[0]
+            cz = np.linalg.lstsq(A, z[linhas], rcond=None)[0]
+            pr_x[linhas], pt_x[linhas] = cx[0], cx[1]
+            pr_z[linhas], pt_z[linhas] = cz[0], cz[1]
+            com_linha[linhas] = True
+
+        # Nós sem linha fora da raiz/ponta: corda e bordo de ataque locais
+        sem_linha = ~com_linha & (eta > 0.0) & (eta < 1.0)
+        c = b["Root_Chord"] + (b["Tip_Chord"] - b["Root_Chord"]) * self._eta
+        xle = xle_r + (xle_t - xle_r) * self._eta
+        xi_loc, zeta_loc = (x - xle) / c, (z - z0) / c
+
+        raiz = np.vstack(((pr_x - xle_r) / b["Root_Chord"], (pr_z - z0) / b["Root_Chord"]))
+        ponta = np.vstack(self._gira((pt_x - xle_t) / b["Tip_Chord"],
+                                     (pt_z - z0) / b["Tip_Chord"], -b["Twist"]))
+        ponta_loc = np.vstack(self._gira(xi_loc, zeta_loc, -b["Twist"] * self._eta))
+        raiz[:, sem_linha] = ponta[:, sem_linha] = ponta_loc[:, sem_linha]
+        self._local = sem_linha
+        return raiz, ponta
+
+    # ------------------------------------------------------------
+    def nodes(self, x):
+        """Nós da malha para o projeto x = [AR, span, taper, sweep, twist]."""
+        v, croot, ctip = planform_from_x(x)
+        x0, y0, z0 = self.origin
+        eta = self._eta
+
+        xle_r, xle_t = self._bordos(v["Span"], croot, ctip, v["Sweep"])
+        xi_t, zeta_t = self._gira(*self._ponta, v["Twist"])
+        xn = (1.0 - eta) * (xle_r + self._raiz[0] * croot) + eta * (xle_t + xi_t * ctip)
+        zn = z0 + (1.0 - eta) * self._raiz[1] * croot + eta * zeta_t * ctip
+
+        if self._local.any():
+            # Perfil único: corda local e torção interpolada
+            k = self._local
+            c = croot + (ctip - croot) * eta[k]
+            xi, zeta = self._gira(*self._raiz[:, k], v["Twist"] * eta[k])
+            xn[k] = xle_r + (xle_t - xle_r) * eta[k] + xi * c
+            zn[k] = z0 + zeta * c
+
+        yn = y0 + self._lado * eta * v["Span"]
+        return np.column_stack((xn, yn, zn))
+
+    def render(self, x, half=False):
+        """Texto do .vspgeom do projeto x (half → só a semi-asa y >= 0)."""
+        nos = self.nodes(x)
+        cabecalho, resto = self._cabecalho, self._resto
+        if half:
+            if self._meia is None:
+                self._meia = half_mesh(self._cabecalho, self.base_nodes, self._resto,
+                                       self.origin[1])
+            cabecalho, manter, resto = self._meia
+            nos = nos[manter]
+        return cabecalho + "".join(_FMT_NO % tuple(p) for p in nos.tolist()) + resto
+
+    def write(self, path, x, half=False):
+        """Grava o .vspgeom do projeto x em path."""
+        with open(path, "w", newline="") as f:
+            f.write(self.render(x, half))
+        return path
+
+    def write_geometry(self, run_dir, stem, x, half=False):
+        """
+        Arquivos de geometria que o VSPAERO lê para <stem>: o .vspgeom
+        deformado, o .vkey da malha base (com o caminho do novo .vspgeom)
+        e o .csf (superfícies de controle), copiado sem mudanças.
+        """
+        destino = os.path.join(run_dir, stem + ".vspgeom")
+        self.write(destino, x, half)
+
+        base = os.path.splitext(self.vspgeom_file)[0]
+        if os.path.exists(base + ".vkey"):
+            write_vkey(base + ".vkey", os.path.join(run_dir, stem + ".vkey"), destino)
+        if os.path.exists(base + ".csf"):
+            shutil.copyfile(base + ".csf", os.path.join(run_dir, stem + ".csf"))
+        return destino
+
+
+_MORPHS = {}
+
+
+def get_morph(vspgeom_file, vsp3_file):
+    """Malha base em cache por processo."""
+    chave = (vspgeom_file, vsp3_file)
+    if chave not in _MORPHS:
+        _MORPHS[chave] = VSPGeomMorph(vspgeom_file, vsp3_file)
+    return _MORPHS[chave]